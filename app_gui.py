@@ -953,7 +953,7 @@ MEDUSA = {{
             import datetime
             run_id = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
 
-            cmd = [sys.executable, "-u", "main.py", "--entities", ",".join(entities), "--run-id", run_id]
+            cmd = [sys.executable, "-u", "main.py", "--entities", ",".join(entities), "--run-id", run_id, "--control-stdin"]
             if self.init_done:
                 cmd += ["--skip-init-log"]
             if limit > 0:
@@ -1031,6 +1031,7 @@ MEDUSA = {{
 
             self._proc = subprocess.Popen(
                 cmd,
+                stdin=subprocess.PIPE,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
                 text=True,
@@ -1061,24 +1062,37 @@ MEDUSA = {{
         finally:
             self._q.put(None)
 
+    def _send_control(self, command):
+        """Gửi lệnh pause / resume / stop tới main.py qua stdin (xem --control-stdin)."""
+        if not self._proc or self._proc.poll() is not None or self._proc.stdin is None:
+            return False
+        try:
+            self._proc.stdin.write(command + "\n")
+            self._proc.stdin.flush()
+            return True
+        except Exception as e:
+            self._log(f"Warning: Could not send '{command}' to migration process: {e}\n")
+            return False
+
+    def _terminate_if_running(self):
+        if self._proc and self._proc.poll() is None:
+            self._log("\n[STOP] Process did not stop in time, terminating...\n")
+            try:
+                self._proc.terminate()
+            except Exception:
+                pass
+
     def _stop(self):
         if not self._proc or self._proc.poll() is not None:
             return
-        self._log("\n[STOP] Stopping process (creating signal)...\n")
-        
-        # Create stop signal file
-        try:
-            with open(".stop_signal", "w") as f:
-                f.write("stop")
-        except Exception as e:
-            self._log(f"Warning: Could not create stop signal file: {e}\n")
+        self._log("\n[STOP] Stopping process (finishing in-flight requests)...\n")
+
+        if self._send_control("stop"):
+            # Dừng êm: worker ngừng gửi request mới; quá hạn thì mới terminate
+            self.after(15000, self._terminate_if_running)
+        else:
+            self._terminate_if_running()
 
-        try:
-            self._proc.terminate()
-        except Exception:
-            pass
-        
-        toggle_pause_signal(active=False) # Ensure pause is cleared on stop
         self.pause_btn.config(text="Pause", state=tk.DISABLED)
 
     def _pause_resume(self):
@@ -1086,12 +1100,12 @@ MEDUSA = {{
         current_text = self.pause_btn.cget("text")
         if current_text == "Pause":
             # Enable pause
-            toggle_pause_signal(active=True)
+            self._send_control("pause")
             self.pause_btn.config(text="Resume")
             self._log("\n[PAUSE] Pausing migration process...\n")
         else:
             # Resume
-            toggle_pause_signal(active=False)
+            self._send_control("resume")
             self.pause_btn.config(text="Pause")
             self._log("\n[RESUME] Resuming migration process...\n")
 
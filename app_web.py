@@ -24,11 +24,16 @@ from migrators.product_migrator import migrate_products
 from migrators.category_migrator import migrate_categories
 from migrators.customer_migrator import migrate_customers
 from migrators.order_migrator import migrate_orders
+from migrators.id_map import DEFAULT_ID_MAP_PATH, close_id_maps
+from migrators.checkpoint import new_run_id, close_checkpoints
+from migrators.payload_export import close_payload_writers
+from migrators.phases import run_parallel_phases
 from migrators.utils import (
-    log_info, log_error, get_timestamp,
-    check_stop_signal, clean_stop_signal,
-    toggle_pause_signal, STOP_SIGNAL_FILE
+    log_info, log_error, get_timestamp, log_connection_report,
+    check_stop_signal, clean_stop_signal, request_stop,
+    toggle_pause_signal
 )
+from connectors.control import MigrationStopped
 import config
 import re
 
@@ -204,15 +209,29 @@ def run_migration_task(config_data):
     # Set stdout to our socket emitter
     original_stdout = sys.stdout
     sys.stdout = StreamToSocket()
+    magento = medusa = None
 
     try:
         migration_state['running'] = True
 
         # Prepare args
+        resume = (config_data.get('resume') or '').strip() or None
+        dry_run = config_data.get('dry_run', False)
         args = Args(
             limit=int(config_data.get('limit', 0)),
-            dry_run=config_data.get('dry_run', False),
+            dry_run=dry_run,
+            resume=resume,
+            run_id=resume or (None if dry_run else new_run_id()),
             max_workers=int(config_data.get('max_workers', 10)),
+            extract_fanout=int(config_data.get('extract_fanout', 4)),
+            product_batch_size=int(config_data.get('product_batch_size', 0)),
+            id_map=config_data.get('id_map', DEFAULT_ID_MAP_PATH),
+            inventory_batch_size=int(config_data.get('inventory_batch_size', 200)),
+            inventory_workers=int(config_data.get('inventory_workers', 2)),
+            pagination=config_data.get('pagination', 'offset'),
+            parallel_phases=config_data.get('parallel_phases', False),
+            engine=config_data.get('engine', 'threads'),
+            max_in_flight=int(config_data.get('max_in_flight', 500)),
             product_ids=config_data.get('product_ids'),
             category_ids=config_data.get('category_ids'),
             order_ids=config_data.get('order_ids'),
@@ -234,43 +253,65 @@ def run_migration_task(config_data):
         magento = MagentoConnector(
             base_url=_sanitize_url(config_data['magento']['base_url']),
             token=migration_state['magento_token'],
-            verify_ssl=args.verify_ssl
+            verify_ssl=args.verify_ssl,
+            pool_size=int(config_data.get('magento_pool_size') or args.max_workers),
+            rate_limit=float(config_data.get('magento_rate_limit') or 0),
         )
 
         medusa = MedusaConnector(
             base_url=_sanitize_url(config_data['medusa']['base_url']),
-            api_token=migration_state['medusa_token']
+            api_token=migration_state['medusa_token'],
+            pool_size=int(config_data.get('medusa_pool_size') or args.max_workers),
+            rate_limit=float(config_data.get('medusa_rate_limit') or 0),
         )
 
         print(f"🚀 Starting Migration [Limit: {args.limit}, Dry-run: {args.dry_run}]")
+        if args.resume:
+            print(f"♻️  Resuming run {args.run_id}")
+        elif args.run_id:
+            print(f"🆔 Run ID: {args.run_id} (enter it in 'Resume run ID' to continue this run later)")
 
         mg_to_medusa_map = {}
 
-        if 'categories' in selected_entities and not migration_state.get('stop_requested'):
-            mg_to_medusa_map = migrate_categories(magento, medusa, args)
+        if args.parallel_phases:
+            run_parallel_phases(magento, medusa, args, set(selected_entities), migration_state)
+        else:
+            if 'categories' in selected_entities and not migration_state.get('stop_requested'):
+                mg_to_medusa_map = migrate_categories(magento, medusa, args)
 
-        if 'customers' in selected_entities and not migration_state.get('stop_requested'):
-            migrate_customers(magento, medusa, args)
+            if 'customers' in selected_entities and not migration_state.get('stop_requested'):
+                migrate_customers(magento, medusa, args)
 
-        if 'products' in selected_entities and not migration_state.get('stop_requested'):
-            migrate_products(magento, medusa, args, mg_to_medusa_map=mg_to_medusa_map)
+            if 'products' in selected_entities and not migration_state.get('stop_requested'):
+                migrate_products(magento, medusa, args, mg_to_medusa_map=mg_to_medusa_map)
 
-        if 'orders' in selected_entities and not migration_state.get('stop_requested'):
-            migrate_orders(magento, medusa, args, migration_state)
+            if 'orders' in selected_entities and not migration_state.get('stop_requested'):
+                migrate_orders(magento, medusa, args, migration_state)
 
         print("Migration process finished.")
         socketio.emit('status_update', {'running': False, 'paused': False, 'message': 'Completed'})
 
+    except MigrationStopped:
+        print("Migration stopped.")
+        socketio.emit('status_update', {'running': False, 'paused': False, 'message': 'Stopped'})
     except Exception as e:
         print(f"Migration failed: {e}")
         import traceback
         traceback.print_exc(file=sys.stdout)
         socketio.emit('status_update', {'running': False, 'paused': False, 'error': str(e)})
     finally:
+        # Run lỗi hoặc bị dừng cũng phải báo cáo và đóng connection pool (như main.py)
+        for name, connector in (("Magento", magento), ("Medusa", medusa)):
+            if connector is not None:
+                log_connection_report(name, connector)
+                connector.close()
         migration_state['running'] = False
         migration_state['stop_requested'] = False
         migration_state['paused'] = False
         toggle_pause_signal(active=False) # Ensure pause is cleared
+        close_id_maps()
+        close_checkpoints()
+        close_payload_writers()
         sys.stdout = original_stdout
 
 @app.route('/api/start', methods=['POST'])
@@ -300,14 +341,9 @@ def stop_migration():
     if migration_state['running']:
         migration_state['stop_requested'] = True
         migration_state['paused'] = False
-        toggle_pause_signal(active=False) 
-        # Mirror with file signal for migrators
-        try:
-            with open(STOP_SIGNAL_FILE, 'w') as f:
-                f.write('stop')
-        except Exception as e:
-            print(f"Error creating stop signal file: {e}")
-            
+        # Worker nhận lệnh ngay trước request kế tiếp (không qua file signal)
+        request_stop()
+
         socketio.emit('status_update', {'running': True, 'paused': False, 'message': 'Stopping...'})
         return jsonify({'success': True, 'paused': False, 'message': 'Stop requested...'})
     return jsonify({'success': False, 'error': 'Not running'})
@@ -0,0 +1,176 @@
+import asyncio
+import time
+
+try:
+    import aiohttp
+except ImportError:  # aiohttp chỉ cần khi chạy với --engine async
+    aiohttp = None
+
+from .base_connector import BaseConnector, build_response
+from .rate_limiter import parse_retry_after, THROTTLE_STATUSES
+from .retry import RETRYABLE_STATUSES
+from .control import migration_control
+from .cassette import active_cassette
+from .magento_connector import MagentoConnector
+from .medusa_connector import MedusaConnector
+
+class AsyncBaseConnector(BaseConnector):
+    """
+    Phiên bản asyncio của BaseConnector (aiohttp).
+    Các subclass kế thừa endpoint của connector đồng bộ: mọi method gọi self._request
+    sẽ trả về coroutine, nên chỉ cần `await`.
+    Limiter theo host dùng chung với connector đồng bộ: concurrency chỉ được nâng lên pool_size
+    trong lúc connector async còn mở, aclose() trả lại giá trị cũ.
+    """
+    _grow_limiter = False
+
+    def __init__(self, base_url, headers=None, max_retries=5, backoff_factor=1, verify_ssl=True, pool_size=100, rate_limit=0):
+        if aiohttp is None:
+            raise RuntimeError("aiohttp is required for the async engine (pip install aiohttp)")
+        super().__init__(base_url, headers, max_retries=max_retries, backoff_factor=backoff_factor,
+                         verify_ssl=verify_ssl, pool_size=pool_size, rate_limit=rate_limit)
+        self._client = None
+        self._connections_opened = 0
+        self._previous_capacity = self.rate_limiter.ensure_capacity(self.pool_size)
+
+    @classmethod
+    def from_connector(cls, connector: BaseConnector, pool_size=None):
+        """Tạo connector async dùng lại base_url/headers (token) của một connector đồng bộ."""
+        obj = cls.__new__(cls)
+        AsyncBaseConnector.__init__(
+            obj,
+            connector.base_url,
+            dict(connector.headers),
+            max_retries=connector.max_retries,
+            backoff_factor=connector.backoff_factor,
+            verify_ssl=connector.verify_ssl,
+            pool_size=pool_size or connector.pool_size,
+            rate_limit=connector.rate_limit,
+        )
+        return obj
+
+    async def _on_connection_created(self, session, ctx, params):
+        self._connections_opened += 1
+
+    def _client_session(self):
+        if self._client is None:
+            trace = aiohttp.TraceConfig()
+            trace.on_connection_create_end.append(self._on_connection_created)
+            tcp_kwargs = {"limit": self.pool_size}
+            if not self.verify_ssl:
+                tcp_kwargs["ssl"] = False
+            self._client = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(**tcp_kwargs),
+                trace_configs=[trace],
+            )
+        return self._client
+
+    async def _request(self, method, endpoint, **kwargs):
+        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        headers = kwargs.pop("headers", None) or self.headers
+        params = kwargs.pop("params", None)
+        if params:
+            params = {k: str(v) for k, v in params.items() if v is not None}
+        for attempt in range(1, self.max_retries + 1):
+            await migration_control.checkpoint_async()
+            self._request_count += 1
+            probe = await self.circuit_breaker.before_request_async()
+            await self.rate_limiter.acquire_async()
+            started = time.monotonic()
+            status_code = None
+            try:
+                response = await self._send_async(method, url, headers, params, kwargs)
+                status_code = response.status_code
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                self.rate_limiter.release(None)
+                self.circuit_breaker.record_failure()
+                if not self.retry_policy.should_retry(method, headers, attempt):
+                    raise
+                wait = self.retry_policy.backoff(attempt)
+                print(f"Connection error on {method} {url}: {e}. Retrying in {wait:.1f}s...")
+                await asyncio.sleep(wait)
+                continue
+            except BaseException:
+                self.rate_limiter.release(None)
+                if probe:
+                    self.circuit_breaker.release_probe()
+                raise
+            self.rate_limiter.release(status_code, time.monotonic() - started)
+
+            retry_after = parse_retry_after(response.headers.get("Retry-After")) if status_code in THROTTLE_STATUSES else None
+            if status_code == 429:
+                wait = retry_after if retry_after is not None else self.backoff_factor * attempt
+                print(f"Rate limit hit. Retrying in {wait}s...")
+                # 429 không nói gì về sức khoẻ host: trả lượt thăm dò cho request kế tiếp
+                if probe:
+                    self.circuit_breaker.release_probe()
+                self.rate_limiter.penalize(wait)
+                continue
+            if status_code in RETRYABLE_STATUSES:
+                self.circuit_breaker.record_failure()
+                self.rate_limiter.penalize(retry_after)
+                if self.retry_policy.should_retry(method, headers, attempt, status_code):
+                    wait = self.retry_policy.backoff(attempt, retry_after)
+                    print(f"Server error HTTP {status_code} on {method} {url}. Retrying in {wait:.1f}s...")
+                    await asyncio.sleep(wait)
+                    continue
+            else:
+                self.circuit_breaker.record_success()
+            response.raise_for_status()
+            return response.json()
+        raise Exception(f"Failed after {self.max_retries} attempts: {url}")
+
+    async def _send_async(self, method, url, headers, params, kwargs):
+        cassette = active_cassette()
+        if cassette is not None and cassette.replaying:
+            await asyncio.sleep(cassette.latency())
+            return build_response(url, *cassette.lookup(method, url, params, kwargs.get("json")))
+        async with self._client_session().request(method, url, headers=headers, params=params, **kwargs) as r:
+            body = await r.read()
+            response = build_response(str(r.url), r.status, r.reason, dict(r.headers), body)
+        if cassette is not None:
+            cassette.record(method, url, params, kwargs.get("json"), response)
+        return response
+
+    def connection_stats(self):
+        stats = super().connection_stats()
+        stats["connections_opened"] = self._connections_opened
+        stats["connections_reused"] = max(0, stats["requests"] - self._connections_opened)
+        stats["reuse_ratio"] = (stats["connections_reused"] / stats["requests"]) if stats["requests"] else 0.0
+        return stats
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+        if self._previous_capacity is not None:
+            self.rate_limiter.restore_capacity(self._previous_capacity)
+            self._previous_capacity = None
+
+class AsyncMagentoConnector(MagentoConnector, AsyncBaseConnector):
+    async def get_order_invoices(self, order_id):
+        endpoint = f"rest/V1/orders/{order_id}/invoices"
+        try:
+            return await self._request("GET", endpoint)
+        except Exception:
+            return {"items": []}
+
+    async def get_order_payments(self, order_id):
+        endpoint = f"rest/V1/orders/{order_id}/payment"
+        try:
+            return await self._request("GET", endpoint)
+        except Exception:
+            return {}
+
+class AsyncMedusaConnector(MedusaConnector, AsyncBaseConnector):
+    async def capture_payment(self, order_id):
+        return None
+
+    async def get_inventory_item_by_sku(self, sku):
+        if not sku:
+            return None
+        res = await self.list_inventory_items(params={"sku": sku})
+        items = res.get("inventory_items", []) or res.get("data", [])
+        if items:
+            return items[0]
+        return None
@@ -1,25 +1,143 @@
 import requests
+import threading
 import time
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from .rate_limiter import get_rate_limiter, parse_retry_after, THROTTLE_STATUSES
+from .retry import RetryPolicy, get_circuit_breaker, RETRYABLE_STATUSES
+from .control import migration_control
+from .cassette import active_cassette
+
+def build_response(url, status_code, reason, headers, body):
+    """Dựng requests.Response từ dữ liệu thô để mọi nguồn response dùng chung raise_for_status()/json()."""
+    response = requests.Response()
+    response.url = url
+    response.status_code = status_code
+    response.reason = reason
+    response.headers = CaseInsensitiveDict(headers or {})
+    response._content = body or b""
+    response.encoding = "utf-8"
+    return response
 
 class BaseConnector:
-    def __init__(self, base_url, headers=None, max_retries=3, backoff_factor=1, verify_ssl=True):
+    # Connector đồng bộ nâng vĩnh viễn concurrency của limiter theo pool_size
+    _grow_limiter = True
+
+    def __init__(self, base_url, headers=None, max_retries=5, backoff_factor=1, verify_ssl=True, pool_size=10, rate_limit=0):
         self.base_url = base_url.rstrip('/')
         self.headers = headers or {}
         self.max_retries = max_retries
         self.backoff_factor = backoff_factor
         self.verify_ssl = verify_ssl
+        self.pool_size = max(1, int(pool_size or 1))
+        self.rate_limit = rate_limit
+        # Limiter dùng chung theo host: mọi connector/worker tới cùng host cùng chậm lại khi bị throttle
+        self.rate_limiter = get_rate_limiter(self.base_url, rate=rate_limit, max_concurrency=self.pool_size,
+                                             grow=self._grow_limiter)
+        self.retry_policy = RetryPolicy(max_attempts=max_retries, backoff_base=0.5 * backoff_factor)
+        self.circuit_breaker = get_circuit_breaker(self.base_url)
+
+        # Một adapter (urllib3 PoolManager) dùng chung cho mọi thread -> keep-alive được tái sử dụng.
+        # pool_block=True: thread chờ connection rảnh thay vì mở connection tạm rồi bỏ đi.
+        self._adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size, pool_block=True)
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._request_count = 0
+
+    def _session(self):
+        """Session riêng cho từng thread, tất cả mount cùng một connection pool."""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("http://", self._adapter)
+            session.mount("https://", self._adapter)
+            self._local.session = session
+        return session
 
     def _request(self, method, endpoint, **kwargs):
         url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        headers = kwargs.pop("headers", None) or self.headers
         for attempt in range(1, self.max_retries + 1):
-            headers = kwargs.pop("headers", self.headers)
-            response = requests.request(method, url, verify=self.verify_ssl, headers=headers, **kwargs)
-            if response.status_code == 429:
-                wait = self.backoff_factor * attempt
+            # Pause chặn tại đây, stop huỷ request trước khi gửi
+            migration_control.checkpoint()
+            with self._stats_lock:
+                self._request_count += 1
+            probe = self.circuit_breaker.before_request()
+            self.rate_limiter.acquire()
+            started = time.monotonic()
+            status_code = None
+            try:
+                response = self._send(method, url, headers, kwargs)
+                status_code = response.status_code
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self.rate_limiter.release(None)
+                self.circuit_breaker.record_failure()
+                if not self.retry_policy.should_retry(method, headers, attempt):
+                    raise
+                wait = self.retry_policy.backoff(attempt)
+                print(f"Connection error on {method} {url}: {e}. Retrying in {wait:.1f}s...")
+                migration_control.sleep(wait)
+                continue
+            except BaseException:
+                self.rate_limiter.release(None)
+                if probe:
+                    self.circuit_breaker.release_probe()
+                raise
+            self.rate_limiter.release(status_code, time.monotonic() - started)
+
+            retry_after = parse_retry_after(response.headers.get("Retry-After")) if status_code in THROTTLE_STATUSES else None
+            if status_code == 429:
+                wait = retry_after if retry_after is not None else self.backoff_factor * attempt
                 print(f"Rate limit hit. Retrying in {wait}s...")
-                time.sleep(wait)
+                # 429 không nói gì về sức khoẻ host: trả lượt thăm dò cho request kế tiếp
+                if probe:
+                    self.circuit_breaker.release_probe()
+                # Chờ nằm trong limiter để các worker khác cũng dừng dispatch
+                self.rate_limiter.penalize(wait)
                 continue
+            if status_code in RETRYABLE_STATUSES:
+                self.circuit_breaker.record_failure()
+                self.rate_limiter.penalize(retry_after)
+                if self.retry_policy.should_retry(method, headers, attempt, status_code):
+                    wait = self.retry_policy.backoff(attempt, retry_after)
+                    print(f"Server error HTTP {status_code} on {method} {url}. Retrying in {wait:.1f}s...")
+                    migration_control.sleep(wait)
+                    continue
+            else:
+                self.circuit_breaker.record_success()
             response.raise_for_status()
             return response.json()
         raise Exception(f"Failed after {self.max_retries} attempts: {url}")
 
+    def _send(self, method, url, headers, kwargs):
+        """Gửi một request; khi có cassette thì replay từ file hoặc ghi lại response thật."""
+        cassette = active_cassette()
+        if cassette is not None and cassette.replaying:
+            time.sleep(cassette.latency())
+            return build_response(url, *cassette.lookup(method, url, kwargs.get("params"), kwargs.get("json")))
+        response = self._session().request(method, url, verify=self.verify_ssl, headers=headers, **kwargs)
+        if cassette is not None:
+            cassette.record(method, url, kwargs.get("params"), kwargs.get("json"), response)
+        return response
+
+    def connection_stats(self):
+        """Số request đã gửi và số TCP/TLS connection thực sự được mở trong pool."""
+        opened = 0
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                opened += getattr(pool, "num_connections", 0)
+        requests_sent = self._request_count
+        reused = max(0, requests_sent - opened)
+        return {
+            "requests": requests_sent,
+            "connections_opened": opened,
+            "connections_reused": reused,
+            "reuse_ratio": (reused / requests_sent) if requests_sent else 0.0,
+            "pool_size": self.pool_size,
+            "limiter": self.rate_limiter.stats(),
+        }
+
+    def close(self):
+        self._adapter.close()
@@ -0,0 +1,149 @@
+import gzip
+import hashlib
+import json
+import random
+import threading
+from collections import deque
+
+# Header giữ lại trong cassette (đủ cho retry / throttle / json())
+_KEPT_HEADERS = ("content-type", "retry-after")
+
+class CassetteMiss(Exception):
+    """Replay gặp request không có trong cassette."""
+
+def _body_digest(body):
+    if body is None:
+        return ""
+    raw = json.dumps(body, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+def _request_key(method, url, params, body):
+    query = "&".join(f"{k}={v}" for k, v in sorted((params or {}).items()) if v is not None)
+    path = f"{method.upper()} {url}" + (f"?{query}" if query else "")
+    return path, _body_digest(body)
+
+class _Sequence:
+    """Các exchange cùng k theo thứ tự ghi; exchange đã phát (khớp theo (k, d) hay theo k) không phát lại."""
+    def __init__(self):
+        self.entries = []
+        self.consumed = []
+        self.next = 0  # vị trí exchange chưa phát đầu tiên
+
+    def append(self, entry):
+        self.entries.append(entry)
+        self.consumed.append(False)
+        return len(self.entries) - 1
+
+    def take(self, exact=None):
+        """
+        Exchange kế tiếp: exchange chưa phát đầu tiên cùng digest (`exact`: deque vị trí), nếu đã phát hết
+        thì lặp lại cái cuối cùng digest; không có digest khớp thì lấy exchange chưa phát đầu tiên của k.
+        """
+        if exact:
+            while len(exact) > 1 and self.consumed[exact[0]]:
+                exact.popleft()
+            index = exact[0]
+        elif self.next < len(self.entries):
+            index = self.next
+        else:
+            index = len(self.entries) - 1
+        self.consumed[index] = True
+        while self.next < len(self.entries) and self.consumed[self.next]:
+            self.next += 1
+        return self.entries[index]
+
+class Cassette:
+    """
+    Ghi lại / phát lại toàn bộ traffic HTTP của connector (Magento và Medusa) để chạy migration offline.
+    File là JSONL nén gzip, mỗi dòng một exchange {k: method + URL + query, d: digest body, s, r, h, b}.
+    - record: mọi response thật (kể cả 429 / 5xx giữa các lần retry) được append theo thứ tự hoàn thành.
+    - replay: request được khớp theo (k, d); nếu body khác (ví dụ payload đổi do transformer đổi)
+      thì khớp theo k. Mỗi k có một chuỗi exchange theo thứ tự ghi, mỗi exchange chỉ được phát một lần
+      dù khớp theo (k, d) hay theo k (vd. 429 rồi 200 của cùng request được phát lại đúng thứ tự);
+      hết thì lặp lại cái cuối.
+      latency_ms (+ jitter_ms ngẫu nhiên) mô phỏng độ trễ mạng cho mỗi request.
+    """
+    def __init__(self, path, mode="replay", latency_ms=0, jitter_ms=0, seed=0):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.latency_ms = float(latency_ms or 0)
+        self.jitter_ms = float(jitter_ms or 0)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        # k -> _Sequence (exchange theo thứ tự ghi + cờ đã phát); (k, d) -> deque vị trí trong chuỗi của k
+        self._by_path = {}
+        self._exact = {}
+        self._fh = None
+        if mode == "record":
+            self._fh = gzip.open(path, "wt", encoding="utf-8")
+        else:
+            self._load()
+
+    @property
+    def replaying(self):
+        return self.mode == "replay"
+
+    def _load(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as fh:
+            for line in fh:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                index = self._by_path.setdefault(entry["k"], _Sequence()).append(entry)
+                self._exact.setdefault((entry["k"], entry["d"]), deque()).append(index)
+
+    def record(self, method, url, params, body, response):
+        headers = {k: v for k, v in response.headers.items() if k.lower() in _KEPT_HEADERS}
+        path, digest = _request_key(method, url, params, body)
+        line = json.dumps({
+            "k": path, "d": digest,
+            "s": response.status_code, "r": response.reason, "h": headers,
+            "b": response.content.decode("utf-8", errors="replace"),
+        }, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._fh.write(line + "\n")
+            self.recorded += 1
+
+    def latency(self):
+        """Độ trễ mô phỏng (giây) cho một request replay."""
+        if not self.latency_ms and not self.jitter_ms:
+            return 0.0
+        with self._lock:
+            jitter = self._random.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0
+        return (self.latency_ms + jitter) / 1000.0
+
+    def lookup(self, method, url, params, body):
+        """Exchange kế tiếp cho request: (status_code, reason, headers, body bytes) để dựng bằng build_response()."""
+        path, digest = _request_key(method, url, params, body)
+        with self._lock:
+            sequence = self._by_path.get(path)
+            if sequence is None:
+                self.misses += 1
+                raise CassetteMiss(f"No recorded response for {path}")
+            entry = sequence.take(self._exact.get((path, digest)))
+            self.replayed += 1
+        return entry["s"], entry["r"], entry["h"], entry["b"].encode("utf-8")
+
+    def stats(self):
+        return {"mode": self.mode, "path": self.path, "recorded": self.recorded, "replayed": self.replayed, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+_active = None
+
+def use_cassette(cassette):
+    """Bật cassette cho mọi connector trong process (None = tắt)."""
+    global _active
+    _active = cassette
+
+def active_cassette():
+    return _active
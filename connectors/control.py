@@ -0,0 +1,128 @@
+import asyncio
+import os
+import threading
+
+class MigrationStopped(Exception):
+    """Request bị huỷ vì migration đã nhận lệnh dừng."""
+
+class MigrationControl:
+    """
+    Control plane pause / stop trong process, dùng chung cho mọi worker.
+    Web app, GUI (qua stdin của subprocess) và CLI (Ctrl+C) gọi trực tiếp pause() / resume() / stop();
+    connector gọi checkpoint() trước mỗi request: khi pause thì chờ trên Condition (resume có hiệu lực
+    ngay, không poll), khi stop thì raise MigrationStopped nên request tiếp theo không được gửi đi.
+    """
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._stopped = threading.Event()
+        self._paused = False
+
+    def pause(self):
+        with self._cond:
+            if self._paused or self._stopped.is_set():
+                return
+            self._paused = True
+
+    def resume(self):
+        with self._cond:
+            if not self._paused:
+                return
+            self._paused = False
+            self._cond.notify_all()
+
+    def stop(self):
+        with self._cond:
+            if self._stopped.is_set():
+                return
+            self._stopped.set()
+            self._paused = False
+            self._cond.notify_all()
+
+    def reset(self):
+        """Xoá trạng thái pause / stop trước một lần chạy mới."""
+        with self._cond:
+            self._stopped.clear()
+            self._paused = False
+            self._cond.notify_all()
+
+    def is_stopped(self):
+        return self._stopped.is_set()
+
+    def is_paused(self):
+        return self._paused
+
+    def wait_if_paused(self, timeout=None):
+        """Chặn trong lúc pause. Trả về True nếu đã (hoặc vừa) bị stop."""
+        if not self._paused:
+            return self._stopped.is_set()
+        with self._cond:
+            self._cond.wait_for(lambda: not self._paused or self._stopped.is_set(), timeout=timeout)
+        return self._stopped.is_set()
+
+    def checkpoint(self):
+        """Gọi trước mỗi network call: chờ khi pause, raise MigrationStopped khi stop."""
+        if self.wait_if_paused():
+            raise MigrationStopped("Migration stopped")
+
+    async def checkpoint_async(self):
+        if self._paused:
+            await asyncio.to_thread(self.wait_if_paused)
+        if self._stopped.is_set():
+            raise MigrationStopped("Migration stopped")
+
+    def sleep(self, seconds):
+        """time.sleep() bị cắt ngang khi stop (dùng cho backoff giữa các lần retry)."""
+        self._stopped.wait(max(0.0, seconds))
+
+migration_control = MigrationControl()
+
+class FileSignalAdapter:
+    """
+    Adapter tương thích cho file `.stop_signal` / `.pause_signal` (tool / script cũ tạo file).
+    Một thread nền poll file và chuyển thành lệnh trên MigrationControl; worker không đụng tới filesystem.
+    """
+    def __init__(self, control, stop_file, pause_file, interval=0.5):
+        self.control = control
+        self.stop_file = stop_file
+        self.pause_file = pause_file
+        self.interval = interval
+        self._closed = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name="file-signal-adapter", daemon=True)
+            self._thread.start()
+        return self
+
+    def _watch(self):
+        was_paused = False
+        while not self._closed.wait(self.interval):
+            if os.path.exists(self.stop_file):
+                self.control.stop()
+            paused = os.path.exists(self.pause_file)
+            if paused and not was_paused:
+                self.control.pause()
+            elif was_paused and not paused:
+                self.control.resume()
+            was_paused = paused
+
+    def close(self):
+        self._closed.set()
+
+def listen_stdin(control, stream):
+    """
+    Đọc lệnh 'pause' / 'resume' / 'stop' (mỗi dòng một lệnh) từ `stream` trên thread nền.
+    GUI chạy main.py dưới dạng subprocess và điều khiển qua stdin.
+    """
+    commands = {"pause": control.pause, "resume": control.resume, "stop": control.stop}
+
+    def _listen():
+        for line in stream:
+            command = commands.get(line.strip().lower())
+            if command:
+                command()
+
+    thread = threading.Thread(target=_listen, name="control-stdin", daemon=True)
+    thread.start()
+    return thread
@@ -1,24 +1,50 @@
+from urllib.parse import quote
+
 from .base_connector import BaseConnector
 
 class MagentoConnector(BaseConnector):
-    def __init__(self, base_url, token, verify_ssl=False):
+    def __init__(self, base_url, token, verify_ssl=False, pool_size=10, rate_limit=0):
         headers = {
             "Authorization": f"Bearer {token}",
             "Content-Type": "application/json"
         }
-        super().__init__(base_url, headers, verify_ssl=verify_ssl)
+        super().__init__(base_url, headers, verify_ssl=verify_ssl, pool_size=pool_size, rate_limit=rate_limit)
 
-    def get_products(self, page=1, page_size=100, ids=None, fields=None):
-        endpoint = f"rest/V1/products?searchCriteria[currentPage]={page}&searchCriteria[pageSize]={page_size}"
-        if ids:
-            ids_val = ",".join(str(i) for i in ids)
-            endpoint += f"&searchCriteria[filterGroups][0][filters][0][field]=entity_id" \
-                        f"&searchCriteria[filterGroups][0][filters][0][value]={ids_val}" \
-                        f"&searchCriteria[filterGroups][0][filters][0][condition_type]=in"
-        
+    @staticmethod
+    def _search_endpoint(path, page, page_size, filter_groups=(), after_id=None, fields=None):
+        """
+        Dựng URL searchCriteria. filter_groups: list các group, mỗi group là list (field, value, condition);
+        các filter trong một group được OR, các group với nhau được AND.
+        after_id != None: keyset pagination (entity_id > after_id, sắp xếp entity_id tăng dần, luôn đọc
+        currentPage=1) nên chi phí mỗi trang không tăng theo độ sâu như OFFSET.
+        """
+        groups = [g for g in filter_groups if g]
+        if after_id is not None:
+            page = 1
+            groups.append([("entity_id", int(after_id), "gt")])
+        endpoint = f"{path}?searchCriteria[currentPage]={page}&searchCriteria[pageSize]={page_size}"
+        for g, filters in enumerate(groups):
+            for f, (field, value, condition) in enumerate(filters):
+                prefix = f"&searchCriteria[filterGroups][{g}][filters][{f}]"
+                endpoint += f"{prefix}[field]={field}" \
+                            f"{prefix}[value]={quote(str(value), safe=',')}" \
+                            f"{prefix}[condition_type]={condition}"
+        if after_id is not None:
+            endpoint += "&searchCriteria[sortOrders][0][field]=entity_id" \
+                        "&searchCriteria[sortOrders][0][direction]=ASC"
         if fields:
             endpoint += f"&fields={fields}"
+        return endpoint
 
+    @staticmethod
+    def _in_filter(field, ids):
+        return (field, ",".join(str(i) for i in ids), "in")
+
+    def get_products(self, page=1, page_size=100, ids=None, fields=None, after_id=None):
+        groups = []
+        if ids:
+            groups.append([self._in_filter("entity_id", ids)])
+        endpoint = self._search_endpoint("rest/V1/products", page, page_size, groups, after_id, fields)
         return self._request("GET", endpoint)
 
     def get_categories(self, page=1, page_size=100, fields=None):
@@ -36,17 +62,30 @@ class MagentoConnector(BaseConnector):
             params["depth"] = depth
         return self._request("GET", endpoint, params=params or None)
 
-    def get_customers(self, page=1, page_size=100):
-        endpoint = f"rest/V1/customers/search?searchCriteria[currentPage]={page}&searchCriteria[pageSize]={page_size}"
+    def get_customers(self, page=1, page_size=100, ids=None, fields=None, after_id=None):
+        groups = []
+        if ids:
+            groups.append([self._in_filter("entity_id", ids)])
+        endpoint = self._search_endpoint("rest/V1/customers/search", page, page_size, groups, after_id, fields)
         return self._request("GET", endpoint)
 
-    def get_orders(self, page=1, page_size=50, updated_at_from=None):
-        endpoint = f"rest/V1/orders?searchCriteria[currentPage]={page}&searchCriteria[pageSize]={page_size}"
+    def get_orders(self, page=1, page_size=50, updated_at_from=None, ids=None, fields=None, after_id=None):
+        groups = []
         if updated_at_from:
             # Delta migration: filter by updated_at
-            endpoint += f"&searchCriteria[filterGroups][0][filters][0][field]=updated_at" \
-                        f"&searchCriteria[filterGroups][0][filters][0][value]={updated_at_from}" \
-                        f"&searchCriteria[filterGroups][0][filters][0][condition_type]=gteq"
+            groups.append([("updated_at", updated_at_from, "gteq")])
+        if ids:
+            # --order-ids nhận cả entity_id lẫn increment_id: OR trong cùng một filter group
+            groups.append([self._in_filter("entity_id", ids), self._in_filter("increment_id", ids)])
+        endpoint = self._search_endpoint("rest/V1/orders", page, page_size, groups, after_id, fields)
+        return self._request("GET", endpoint)
+
+    def get_invoices(self, page=1, page_size=100, order_ids=None, fields=None):
+        """Tìm invoices của nhiều order trong một request (order_id in (...))"""
+        groups = []
+        if order_ids:
+            groups.append([self._in_filter("order_id", order_ids)])
+        endpoint = self._search_endpoint("rest/V1/invoices", page, page_size, groups, fields=fields)
         return self._request("GET", endpoint)
 
     def get_order_invoices(self, order_id):
@@ -2,12 +2,12 @@ import requests
 from .base_connector import BaseConnector
 
 class MedusaConnector(BaseConnector):
-    def __init__(self, base_url, api_token):
+    def __init__(self, base_url, api_token, pool_size=10, rate_limit=0):
         headers = {
             "Authorization": f"Bearer {api_token}",
             "Content-Type": "application/json"
         }
-        super().__init__(base_url, headers)
+        super().__init__(base_url, headers, pool_size=pool_size, rate_limit=rate_limit)
 
     def _headers_with_idempotency(self, idempotency_key=None):
         if not idempotency_key:
@@ -21,11 +21,25 @@ class MedusaConnector(BaseConnector):
         headers = self._headers_with_idempotency(idempotency_key)
         return self._request("POST", endpoint, json=product, headers=headers)
 
+    def batch_products(self, create=None, update=None, delete=None, idempotency_key=None):
+        """Tạo/cập nhật/xóa nhiều product trong một workflow (Medusa v2 admin/products/batch)"""
+        endpoint = "admin/products/batch"
+        payload = {"create": create or [], "update": update or [], "delete": delete or []}
+        headers = self._headers_with_idempotency(idempotency_key)
+        return self._request("POST", endpoint, json=payload, headers=headers)
+
     def create_customer(self, customer, idempotency_key=None):
         endpoint = "admin/customers"
         headers = self._headers_with_idempotency(idempotency_key)
         return self._request("POST", endpoint, json=customer, headers=headers)
 
+    def list_customers(self, limit=50, offset=0, fields=None):
+        endpoint = "admin/customers"
+        params = {"limit": limit, "offset": offset}
+        if fields:
+            params["fields"] = fields
+        return self._request("GET", endpoint, params=params)
+
     def create_product_category(self, category, idempotency_key=None):
         endpoint = "admin/product-categories"
         headers = self._headers_with_idempotency(idempotency_key)
@@ -127,18 +141,25 @@ class MedusaConnector(BaseConnector):
         }
         return self._request("POST", endpoint, json=payload)
 
+    def batch_inventory_location_levels(self, create=None, update=None, delete=None):
+        """Ghi location level của nhiều inventory item trong một request"""
+        endpoint = "admin/inventory-items/location-levels/batch"
+        payload = {"create": create or [], "update": update or [], "delete": delete or []}
+        return self._request("POST", endpoint, json=payload)
+
     def link_variant_to_inventory_item(self, product_id, variant_id, inventory_item_id, quantity=1):
+        return self.link_variants_to_inventory_items(product_id, [
+            {
+                "variant_id": variant_id,
+                "inventory_item_id": inventory_item_id,
+                "required_quantity": quantity
+            }
+        ])
+
+    def link_variants_to_inventory_items(self, product_id, links):
         # Medusa v2 uses a batch endpoint for product variants inventory items
         endpoint = f"admin/products/{product_id}/variants/inventory-items/batch"
-        payload = {
-            "create": [
-                {
-                    "variant_id": variant_id,
-                    "inventory_item_id": inventory_item_id,
-                    "required_quantity": quantity
-                }
-            ]
-        }
+        payload = {"create": links}
         return self._request("POST", endpoint, json=payload)
 
     def get_stock_locations(self, limit=50, offset=0):
@@ -0,0 +1,183 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+THROTTLE_STATUSES = (429, 503)
+
+def parse_retry_after(value):
+    """Retry-After có thể là số giây hoặc HTTP-date. Trả về số giây (float) hoặc None."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+class AdaptiveRateLimiter:
+    """
+    Limiter dùng chung cho mọi worker gọi tới cùng một host:
+    - Token bucket giới hạn số request/giây (rate=0 nghĩa là không giới hạn).
+    - Giới hạn concurrency điều chỉnh theo AIMD: tăng cộng dần khi request thành công,
+      giảm nhân khi gặp 429/503 hoặc latency vượt ngưỡng so với baseline.
+    - Retry-After chặn dispatch của *tất cả* worker tới host cho đến hết thời gian chờ.
+    """
+    def __init__(self, rate=0, max_concurrency=10, min_concurrency=1, decrease_factor=0.5,
+                 latency_factor=3.0, decrease_cooldown=1.0):
+        self._cond = threading.Condition()
+        self.max_rate = float(rate or 0)
+        self.rate = self.max_rate
+        self._tokens = max(1.0, self.max_rate)
+        self._last_refill = time.monotonic()
+
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.min_concurrency = max(1, int(min_concurrency))
+        self.limit = float(self.max_concurrency)
+        self.decrease_factor = decrease_factor
+        self.latency_factor = latency_factor
+        self.decrease_cooldown = decrease_cooldown
+
+        self._in_flight = 0
+        self._blocked_until = 0.0
+        self._last_decrease = 0.0
+        self._baseline_latency = None
+        self._ewma_latency = None
+        self.throttled = 0
+
+    def ensure_capacity(self, max_concurrency):
+        """Nâng max_concurrency lên ít nhất `max_concurrency`; trả về giá trị cũ để restore_capacity()."""
+        with self._cond:
+            previous = self.max_concurrency
+            if max_concurrency > self.max_concurrency:
+                self.max_concurrency = int(max_concurrency)
+                self.limit = max(self.limit, float(self.max_concurrency))
+                self._cond.notify_all()
+            return previous
+
+    def restore_capacity(self, max_concurrency):
+        """Trả max_concurrency về giá trị trước ensure_capacity() (khi pool lớn hơn, vd. engine async, kết thúc)."""
+        with self._cond:
+            self.max_concurrency = max(1, int(max_concurrency))
+            self.limit = min(self.limit, float(self.max_concurrency))
+            self._cond.notify_all()
+
+    def _refill(self, now):
+        if self.rate <= 0:
+            return
+        burst = max(1.0, self.rate)
+        self._tokens = min(burst, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def _try_acquire(self, now):
+        """Trả về 0 nếu lấy được slot, ngược lại số giây nên chờ trước khi thử lại."""
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        if self._in_flight >= max(self.min_concurrency, int(self.limit)):
+            return 0.05
+        if self.rate > 0:
+            self._refill(now)
+            if self._tokens < 1:
+                return (1 - self._tokens) / self.rate
+            self._tokens -= 1
+        self._in_flight += 1
+        return 0
+
+    def acquire(self):
+        with self._cond:
+            while True:
+                wait = self._try_acquire(time.monotonic())
+                if wait == 0:
+                    return
+                self._cond.wait(timeout=wait)
+
+    async def acquire_async(self):
+        while True:
+            with self._cond:
+                wait = self._try_acquire(time.monotonic())
+            if wait == 0:
+                return
+            await asyncio.sleep(wait)
+
+    def release(self, status_code=None, latency=None):
+        with self._cond:
+            self._in_flight = max(0, self._in_flight - 1)
+            if status_code in THROTTLE_STATUSES:
+                self.throttled += 1
+                self._decrease()
+            elif status_code is not None and status_code < 500:
+                if latency is not None and self._is_slow(latency):
+                    self._decrease()
+                else:
+                    self._increase()
+            self._cond.notify_all()
+
+    def penalize(self, seconds):
+        """Chặn toàn bộ dispatch tới host trong `seconds` giây (Retry-After)."""
+        if not seconds or seconds <= 0:
+            return
+        with self._cond:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def _is_slow(self, latency):
+        if self._baseline_latency is None or latency < self._baseline_latency:
+            self._baseline_latency = latency
+        self._ewma_latency = latency if self._ewma_latency is None else 0.8 * self._ewma_latency + 0.2 * latency
+        return self._ewma_latency > self._baseline_latency * self.latency_factor and self._ewma_latency > 0.05
+
+    def _increase(self):
+        # Additive increase: ~+1 slot sau mỗi "cửa sổ" request thành công
+        self.limit = min(float(self.max_concurrency), self.limit + 1.0 / max(1.0, self.limit))
+        if self.max_rate > 0:
+            self.rate = min(self.max_rate, self.rate + 1.0 / max(1.0, self.rate))
+
+    def _decrease(self):
+        # Multiplicative decrease, tối đa một lần mỗi cooldown để một loạt 429 đồng thời không đánh sập limit
+        now = time.monotonic()
+        if now - self._last_decrease < self.decrease_cooldown:
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.min_concurrency), self.limit * self.decrease_factor)
+        if self.max_rate > 0:
+            self.rate = max(1.0, self.rate * self.decrease_factor)
+        # Baseline latency có thể đã cũ: bắt đầu đo lại
+        self._baseline_latency = self._ewma_latency
+
+    def stats(self):
+        with self._cond:
+            return {
+                "concurrency_limit": int(self.limit),
+                "max_concurrency": self.max_concurrency,
+                "rate": self.rate,
+                "throttled": self.throttled,
+            }
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(base_url, rate=0, max_concurrency=10, grow=True):
+    """
+    Limiter dùng chung theo host (netloc) của base_url.
+    grow=False: không nâng max_concurrency của limiter đã có (caller tự ensure_capacity / restore_capacity).
+    """
+    host = urlparse(base_url).netloc or base_url
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            limiter = AdaptiveRateLimiter(rate=rate, max_concurrency=max_concurrency)
+            _limiters[host] = limiter
+            return limiter
+    if grow:
+        limiter.ensure_capacity(max_concurrency)
+    return limiter
@@ -0,0 +1,153 @@
+import asyncio
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+RETRYABLE_STATUSES = (500, 502, 503, 504)
+
+class CircuitOpenError(Exception):
+    pass
+
+class RetryPolicy:
+    """
+    Retry với exponential backoff + full jitter cho lỗi 5xx / lỗi kết nối.
+    Chỉ retry request idempotent: GET/HEAD/OPTIONS/PUT/DELETE hoặc POST có Idempotency-Key.
+    """
+    def __init__(self, max_attempts=5, backoff_base=0.5, backoff_cap=30.0):
+        self.max_attempts = max(1, int(max_attempts))
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+    def is_idempotent(self, method, headers=None):
+        if method.upper() in IDEMPOTENT_METHODS:
+            return True
+        return any(k.lower() == "idempotency-key" for k in (headers or {}))
+
+    def should_retry(self, method, headers, attempt, status_code=None):
+        """status_code=None nghĩa là lỗi kết nối (reset, timeout...)."""
+        if attempt >= self.max_attempts:
+            return False
+        if status_code is not None and status_code not in RETRYABLE_STATUSES:
+            return False
+        return self.is_idempotent(method, headers)
+
+    def backoff(self, attempt, retry_after=None):
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** (attempt - 1))))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+class CircuitBreaker:
+    """
+    Circuit breaker theo host. Sau `failure_threshold` lỗi 5xx/kết nối liên tiếp, mạch mở:
+    mọi dispatch tới host bị tạm dừng trong `reset_timeout` giây, sau đó một request thăm dò
+    (half-open) được gửi đi. Thành công -> đóng mạch; thất bại -> mở lại với thời gian chờ gấp đôi.
+    Caller chờ tối đa `max_wait` giây rồi nhận CircuitOpenError.
+    before_request() trả về True cho request thăm dò; request đó phải kết thúc bằng
+    record_success / record_failure, hoặc release_probe nếu không kết luận được (429, exception khác).
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=5.0, max_reset_timeout=60.0, max_wait=300.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.max_wait = max_wait
+        self.state = self.CLOSED
+        self.opened = 0
+        self._failures = 0
+        self._open_until = 0.0
+        self._probe_in_flight = False
+        self._cond = threading.Condition()
+
+    def _try_enter(self, now):
+        """0 = được dispatch, ngược lại số giây nên chờ."""
+        if self.state == self.CLOSED:
+            return 0
+        if self.state == self.OPEN:
+            if now < self._open_until:
+                return self._open_until - now
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+        if not self._probe_in_flight:
+            self._probe_in_flight = True
+            return 0
+        return 0.1
+
+    def before_request(self):
+        deadline = time.monotonic() + self.max_wait
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                wait = self._try_enter(now)
+                if wait == 0:
+                    return self.state == self.HALF_OPEN
+                if now + wait > deadline:
+                    raise CircuitOpenError(f"Circuit open for {self.name}: host unavailable")
+                self._cond.wait(timeout=wait)
+
+    async def before_request_async(self):
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            with self._cond:
+                now = time.monotonic()
+                wait = self._try_enter(now)
+                probe = self.state == self.HALF_OPEN
+            if wait == 0:
+                return probe
+            if now + wait > deadline:
+                raise CircuitOpenError(f"Circuit open for {self.name}: host unavailable")
+            await asyncio.sleep(wait)
+
+    def record_success(self):
+        with self._cond:
+            if self.state != self.CLOSED:
+                print(f"Circuit closed for {self.name}: host recovered.")
+            self.state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+            self.reset_timeout = self.base_reset_timeout
+            self._cond.notify_all()
+
+    def release_probe(self):
+        """Request thăm dò kết thúc mà không biết host sống hay chết: cho request kế tiếp thăm dò lại."""
+        with self._cond:
+            if self.state == self.HALF_OPEN:
+                self._probe_in_flight = False
+                self._cond.notify_all()
+
+    def record_failure(self):
+        with self._cond:
+            self._failures += 1
+            if self.state == self.HALF_OPEN:
+                self.reset_timeout = min(self.max_reset_timeout, self.reset_timeout * 2)
+                self._open()
+            elif self.state == self.CLOSED and self._failures >= self.failure_threshold:
+                self._open()
+            self._cond.notify_all()
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened += 1
+        self._probe_in_flight = False
+        self._open_until = time.monotonic() + self.reset_timeout
+        print(f"Circuit OPEN for {self.name} after {self._failures} consecutive failures. Pausing dispatch for {self.reset_timeout:.0f}s...")
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def get_circuit_breaker(base_url):
+    """Circuit breaker dùng chung theo host (netloc) của base_url."""
+    host = urlparse(base_url).netloc or base_url
+    with _breakers_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = CircuitBreaker(host)
+            _breakers[host] = breaker
+        return breaker
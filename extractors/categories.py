@@ -1,3 +1,9 @@
+from extractors.pagination import iter_pages
+from transformers.category_transformer import MAGENTO_FIELDS
+
+PAGE_SIZE = 100
+
+
 def extract_categories(magento_connector, args):
     def _flatten_tree(node: dict):
         out = [node]
@@ -5,22 +11,18 @@ def extract_categories(magento_connector, args):
             out.extend(_flatten_tree(child))
         return out
 
-    page = 1
     all_categories = []
 
-    while True:
-        if args.category_strategy == "tree":
-            result = magento_connector.get_category_tree()
-            if "children_data" in result:
-                all_categories.extend(_flatten_tree(result))
-            break
-        else:
-            result = magento_connector.get_categories(page=page)
-            items = result.get("items")
-            if not items:
-                break
-            all_categories.extend(items)
-            page += 1
+    if args.category_strategy == "tree":
+        result = magento_connector.get_category_tree()
+        if "children_data" in result:
+            all_categories.extend(_flatten_tree(result))
+    else:
+        all_categories.extend(iter_pages(
+            lambda page: magento_connector.get_categories(page=page, page_size=PAGE_SIZE, fields=MAGENTO_FIELDS),
+            PAGE_SIZE,
+            fanout=getattr(args, "extract_fanout", 4),
+        ))
 
     filtered = []
     for c in all_categories:
@@ -29,5 +31,3 @@ def extract_categories(magento_connector, args):
         filtered.append(c)
 
     return filtered
-
-
@@ -1,22 +1,68 @@
-def extract_orders(magento_connector, updated_at_from=None):
+from extractors.pagination import iter_pages, iter_keyset, iter_id_chunks, ID_CHUNK_CHARS
+from transformers.order_transformer import MAGENTO_FIELDS
+from transformers.invoice_payment_transformer import MAGENTO_INVOICE_FIELDS
+
+PAGE_SIZE = 50
+INVOICE_PAGE_SIZE = 100
+
+
+def iter_orders(magento_connector, updated_at_from=None, ids=None, fanout=4, fields=MAGENTO_FIELDS, cursor=False, start_after=0):
     """
-    Extract orders from Magento
+    Yield orders from Magento page by page
     Args:
         magento_connector: MagentoConnector instance
         updated_at_from: Optional datetime string for delta migration (format: YYYY-MM-DD HH:mm:ss)
+        ids: Optional entity_id / increment_id list, filtered server-side in URL-safe chunks fetched in parallel
+        fanout: Number of pages fetched concurrently after the first one
+        fields: Magento field projection (defaults to the fields transform_order reads; None = full documents)
+        cursor: Page by entity_id (keyset) instead of currentPage; flat cost per page on deep listings
+        start_after: Keyset only - resume after this entity_id (saved checkpoint cursor)
     """
-    page = 1
-    all_orders = []
+    def _iter(chunk):
+        if cursor:
+            return iter_keyset(
+                lambda after_id: magento_connector.get_orders(page_size=PAGE_SIZE, updated_at_from=updated_at_from,
+                                                              ids=chunk, fields=fields, after_id=after_id),
+                PAGE_SIZE,
+                start_after=start_after,
+            )
+        return iter_pages(
+            lambda page: magento_connector.get_orders(page=page, page_size=PAGE_SIZE, updated_at_from=updated_at_from,
+                                                      ids=chunk, fields=fields),
+            PAGE_SIZE,
+            fanout=fanout,
+        )
+
+    if ids:
+        # Mỗi chunk xuất hiện hai lần trong URL (entity_id OR increment_id)
+        return iter_id_chunks(_iter, ids, fanout=fanout, max_chars=ID_CHUNK_CHARS // 2)
+    return _iter(None)
 
-    while True:
-        result = magento_connector.get_orders(page=page, updated_at_from=updated_at_from)
-        items = result.get("items", [])
-        if not items:
-            break
-        all_orders.extend(items)
-        page += 1
 
-    return all_orders
+def extract_orders(magento_connector, updated_at_from=None, ids=None, fanout=4, fields=MAGENTO_FIELDS, cursor=False):
+    """Extract all orders from Magento into a list (see iter_orders for streaming)"""
+    return list(iter_orders(magento_connector, updated_at_from=updated_at_from, ids=ids, fanout=fanout,
+                            fields=fields, cursor=cursor))
+
+
+def iter_invoices(magento_connector, order_ids, fanout=4, fields=MAGENTO_INVOICE_FIELDS):
+    """
+    Yield the invoices of many orders with bulk /V1/invoices searches (order_id in (...)),
+    split into URL-safe chunks fetched in parallel.
+    """
+    def _iter(chunk):
+        return iter_pages(
+            lambda page: magento_connector.get_invoices(page=page, page_size=INVOICE_PAGE_SIZE, order_ids=chunk, fields=fields),
+            INVOICE_PAGE_SIZE,
+            fanout=fanout,
+        )
+
+    return iter_id_chunks(_iter, order_ids, fanout=fanout)
+
+
+def order_payments(order):
+    """Payment embedded in the order document (`payment`), as a list like extract_order_payments."""
+    return _normalize_payments(order.get("payment"))
 
 
 def extract_order_invoices(magento_connector, order_id):
@@ -27,7 +73,10 @@ def extract_order_invoices(magento_connector, order_id):
 
 def extract_order_payments(magento_connector, order_id):
     """Extract payment information for a specific order"""
-    result = magento_connector.get_order_payments(order_id)
+    return _normalize_payments(magento_connector.get_order_payments(order_id))
+
+
+def _normalize_payments(result):
     # Magento payment API có thể trả về object hoặc array
     if isinstance(result, list):
         return result
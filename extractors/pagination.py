@@ -0,0 +1,139 @@
+import itertools
+import math
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Tổng độ dài giá trị `in` mỗi request; giữ URL dưới ~2KB (giới hạn phổ biến của proxy / nginx)
+ID_CHUNK_CHARS = 1500
+
+
+def chunk_ids(ids, max_chars=ID_CHUNK_CHARS):
+    """Split an id list into chunks whose comma-joined value stays under `max_chars`."""
+    chunks, current, length = [], [], 0
+    for value in ids:
+        value = str(value)
+        if current and length + len(value) + 1 > max_chars:
+            chunks.append(current)
+            current, length = [], 0
+        current.append(value)
+        length += len(value) + 1
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def iter_id_chunks(iter_chunk, ids, fanout=4, max_chars=ID_CHUNK_CHARS):
+    """
+    Yield the records matching `ids`, fetched server-side with `in` filters.
+    `iter_chunk(chunk)` iterates the (paginated) listing for one URL-safe chunk of ids;
+    when there are several chunks they are fetched concurrently (at most `fanout` at a
+    time) and yielded in chunk order.
+    """
+    chunks = chunk_ids(ids, max_chars)
+    if len(chunks) <= 1:
+        yield from (iter_chunk(chunks[0]) if chunks else ())
+        return
+
+    fanout = max(1, int(fanout or 1))
+    pending = deque()
+    remaining = iter(chunks)
+    executor = ThreadPoolExecutor(max_workers=fanout)
+    try:
+        for chunk in itertools.islice(remaining, fanout):
+            pending.append(executor.submit(lambda c: list(iter_chunk(c)), chunk))
+        while pending:
+            result = pending.popleft().result()
+            chunk = next(remaining, None)
+            if chunk is not None:
+                pending.append(executor.submit(lambda c: list(iter_chunk(c)), chunk))
+            yield from result
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+def _page_key(items):
+    first = items[0] if items else {}
+    return first.get("id") or first.get("entity_id")
+
+
+def iter_pages(fetch_page, page_size, fanout=4):
+    """
+    Yield records of a Magento searchCriteria listing in deterministic page order.
+
+    Page 1 is fetched first to read `total_count`; the remaining pages are then fetched
+    concurrently (at most `fanout` requests in flight) and the loop stops on the count,
+    so no extra empty-page request is needed and out-of-range pages are never requested.
+    If the response has no `total_count`, falls back to sequential paging until an empty
+    page, stopping early if Magento returns the previous page again.
+    """
+    first = fetch_page(1)
+    items = first.get("items") or []
+    yield from items
+
+    total = first.get("total_count")
+    if total is None:
+        yield from _iter_pages_sequential(fetch_page, items)
+        return
+
+    last_page = math.ceil(int(total) / page_size) if page_size else 1
+    if last_page <= 1 or not items:
+        return
+
+    fanout = max(1, int(fanout or 1))
+    next_page = 2
+    pending = deque()
+    executor = ThreadPoolExecutor(max_workers=fanout)
+    try:
+        while next_page <= last_page and len(pending) < fanout:
+            pending.append(executor.submit(fetch_page, next_page))
+            next_page += 1
+        while pending:
+            result = pending.popleft().result()
+            if next_page <= last_page:
+                pending.append(executor.submit(fetch_page, next_page))
+                next_page += 1
+            yield from (result.get("items") or [])
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+def iter_keyset(fetch_after, page_size, start_after=0):
+    """
+    Yield records using keyset (cursor) pagination: `fetch_after(last_id)` must return the
+    next `page_size` records with entity_id > last_id sorted ascending. Unlike currentPage
+    offsets, the cost of each page stays flat however deep the listing goes, but pages are
+    inherently sequential (each cursor comes from the previous page).
+    `start_after` resumes the listing after a saved cursor.
+    """
+    last_id = int(start_after or 0)
+    while True:
+        items = fetch_after(last_id).get("items") or []
+        yield from items
+        if len(items) < page_size:
+            break
+        next_id = max(int(_page_key([it]) or 0) for it in items)
+        if next_id <= last_id:
+            # Cursor không tiến lên (thiếu id trong projection?) -> dừng để tránh lặp vô hạn
+            break
+        last_id = next_id
+
+
+def _iter_pages_sequential(fetch_page, first_items):
+    prev_key = _page_key(first_items)
+    page = 2
+    while True:
+        items = fetch_page(page).get("items") or []
+        if not items:
+            break
+        key = _page_key(items)
+        if key is not None and key == prev_key:
+            # Một số phiên bản Magento trả lại trang cuối cho page vượt phạm vi
+            break
+        prev_key = key
+        yield from items
+        page += 1
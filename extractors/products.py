@@ -1,12 +1,34 @@
-def extract_products(magento_connector, ids=None):
-    page = 1
-    all_products = []
-    while True:
-        result = magento_connector.get_products(page=page, ids=ids)
-        items = result.get('items', [])
-        if not items:
-            break
-        all_products.extend(items)
-        page += 1
-    return all_products
+from extractors.pagination import iter_pages, iter_keyset, iter_id_chunks
+from transformers.product_transformer import MAGENTO_FIELDS
 
+PAGE_SIZE = 100
+
+
+def iter_products(magento_connector, ids=None, fanout=4, fields=MAGENTO_FIELDS, cursor=False, start_after=0):
+    """
+    Yield products page by page so loading can start after the first page.
+    Only the fields declared by the transformer are requested (fields=None = full documents).
+    cursor=True pages by entity_id (keyset) instead of currentPage, for deep catalogs.
+    start_after resumes a keyset listing after a saved entity_id cursor.
+    ids are filtered server-side, split into URL-safe chunks fetched in parallel.
+    """
+    def _iter(chunk):
+        if cursor:
+            return iter_keyset(
+                lambda after_id: magento_connector.get_products(page_size=PAGE_SIZE, ids=chunk, fields=fields, after_id=after_id),
+                PAGE_SIZE,
+                start_after=start_after,
+            )
+        return iter_pages(
+            lambda page: magento_connector.get_products(page=page, page_size=PAGE_SIZE, ids=chunk, fields=fields),
+            PAGE_SIZE,
+            fanout=fanout,
+        )
+
+    if ids:
+        return iter_id_chunks(_iter, ids, fanout=fanout)
+    return _iter(None)
+
+
+def extract_products(magento_connector, ids=None, fanout=4, fields=MAGENTO_FIELDS, cursor=False):
+    return list(iter_products(magento_connector, ids=ids, fanout=fanout, fields=fields, cursor=cursor))
@@ -0,0 +1,184 @@
+"""
+Micro-benchmark CPU của các transformer trên dữ liệu tổng hợp (loadtest/dataset.py), không cần server.
+
+    python loadtest/bench_transformers.py --records 20000 --repeat 5 --out bench/transformers.json
+    python loadtest/bench_transformers.py --baseline bench/transformers.json   # exit 1 nếu có regression
+
+Mỗi transformer được đo hai cách trên cùng input: gọi từng record (transform_x trong vòng lặp,
+giống migrator gọi theo item) và batch API (transform_xs, phần setup chung tính một lần).
+Input được dựng sẵn trước khi đo; lấy lần chạy nhanh nhất trong --repeat lần để giảm nhiễu.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from dataset import Dataset
+from benchmark import _git_commit
+from transformers.product_transformer import transform_product, transform_products
+from transformers.order_transformer import transform_order, transform_orders
+from transformers.customer_transformer import transform_customer, transform_customers
+from transformers.category_transformer import (
+    transform_category_as_product_category,
+    transform_categories_as_product_categories,
+)
+
+BASE_URL = "https://magento.example.com"
+TRANSFORMERS = ("product", "order", "customer", "category")
+
+def _cases(dataset, records):
+    """name -> (inputs, per_record(inputs), batch(inputs)), cùng tham số như migrator truyền vào."""
+    products = [dataset.product(i) for i in range(1, records + 1)]
+    orders = [dataset.order(i) for i in range(1, records + 1)]
+    customers = [dataset.customer(i) for i in range(1, records + 1)]
+    categories = [dataset.category(i) for i in dataset.category_ids()]
+    categories = (categories * (records // len(categories) + 1))[:records]
+
+    # Một nửa SKU có variant trên Medusa, giống order trỏ tới cả product đã và chưa migrate
+    sku_map = {p["sku"]: f"variant_{i}" for i, p in enumerate(products) if i % 2 == 0}
+    shipping_option = {"id": "so_bench", "name": "Standard Shipping"}
+    parent_ids = {str(c["id"]): f"pcat_{c['id']}" for c in categories}
+    category_links = lambda p: [{"id": f"pcat_{link['category_id']}"} for link in
+                                (p.get("extension_attributes") or {}).get("category_links") or ()]
+
+    return {
+        "product": (
+            products,
+            lambda items: [transform_product(p, BASE_URL, category_links(p), "sc_bench", "sp_bench") for p in items],
+            lambda items: transform_products(items, BASE_URL, category_links, "sc_bench", "sp_bench"),
+        ),
+        "order": (
+            orders,
+            lambda items: [transform_order(o, "reg_bench", sku_map, shipping_option) for o in items],
+            lambda items: transform_orders(items, "reg_bench", sku_map, shipping_option),
+        ),
+        "customer": (
+            customers,
+            lambda items: [transform_customer(c) for c in items],
+            lambda items: transform_customers(items),
+        ),
+        "category": (
+            categories,
+            lambda items: [transform_category_as_product_category(c, parent_ids.get(str(c.get("parent_id")))) for c in items],
+            lambda items: transform_categories_as_product_categories(items, parent_ids),
+        ),
+    }
+
+def _best(fn, inputs, repeat):
+    # Như timeit: tắt GC khi đo để lần chạy đầu không gánh collection của cả input
+    best = None
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn(inputs)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+            gc.collect()
+    finally:
+        if enabled:
+            gc.enable()
+    return best
+
+def _stats(seconds, count):
+    return {"us_per_record": round(seconds / count * 1e6, 3), "records_per_s": round(count / seconds, 1)}
+
+def run(names, records, repeat, seed):
+    dataset = Dataset(products=records, categories=max(10, records // 20), customers=records, orders=records, seed=seed)
+    cases = _cases(dataset, records)
+    results = []
+    for name in names:
+        inputs, per_record, batch = cases[name]
+        # Chạy thử một lần: kiểm tra hai đường ra cùng payload và làm nóng cache
+        if per_record(inputs[:200]) != batch(inputs[:200]):
+            raise AssertionError(f"{name}: batch payloads differ from per-record payloads")
+        single = _best(per_record, inputs, repeat)
+        batched = _best(batch, inputs, repeat)
+        results.append({
+            "transformer": name,
+            "records": len(inputs),
+            "per_record": _stats(single, len(inputs)),
+            "batch": _stats(batched, len(inputs)),
+            "speedup": round(single / batched, 2),
+        })
+    return results
+
+def compare(results, baseline, threshold):
+    """So µs/record của batch API với baseline; trả về list regression."""
+    index = {r["transformer"]: r for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        old = index.get(r["transformer"])
+        if not old:
+            continue
+        new_us, old_us = r["batch"]["us_per_record"], old["batch"]["us_per_record"]
+        r["baseline_us_per_record"] = old_us
+        if old_us and new_us > old_us * (1 + threshold):
+            regressions.append(f"{r['transformer']}: batch us/record {old_us} -> {new_us}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CPU micro-benchmarks of the Magento -> Medusa transformers")
+    parser.add_argument("--transformers", default=",".join(TRANSFORMERS), help=f"Comma separated subset of {','.join(TRANSFORMERS)}")
+    parser.add_argument("--records", type=int, default=10000, help="Synthetic records per transformer (default: 10000)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs; the fastest is reported (default: 5)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the generated dataset")
+    parser.add_argument("--out", default=None, help="Write results JSON to this file (default: stdout)")
+    parser.add_argument("--baseline", default=None, help="Previous results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative slowdown flagged as regression (default: 0.10)")
+    args = parser.parse_args(argv)
+
+    names = [n.strip() for n in args.transformers.split(",") if n.strip()]
+    unknown = set(names) - set(TRANSFORMERS)
+    if unknown:
+        parser.error(f"Unknown transformers: {', '.join(sorted(unknown))}")
+
+    results = run(names, args.records, args.repeat, args.seed)
+    for r in results:
+        print(f"{r['transformer']:<10} n={r['records']:<8} per-record {r['per_record']['us_per_record']:>8.2f}us  "
+              f"batch {r['batch']['us_per_record']:>8.2f}us  ({r['batch']['records_per_s']:.0f} rec/s, x{r['speedup']})",
+              file=sys.stderr)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "records": args.records,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        report["meta"]["baseline_commit"] = baseline.get("meta", {}).get("commit")
+        regressions = compare(results, baseline, args.threshold)
+        report["regressions"] = regressions
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        directory = os.path.dirname(args.out)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as fh:
+            fh.write(output + "\n")
+    else:
+        print(output)
+    for line in regressions:
+        print(f"REGRESSION {line}", file=sys.stderr)
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
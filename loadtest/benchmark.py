@@ -0,0 +1,342 @@
+"""
+Benchmark end-to-end từng migrator trên fake Magento / Medusa (loadtest/fake_*.py).
+
+    python loadtest/benchmark.py --entities products,orders --scales 500,2000 --concurrency 4,16 \\
+        --latency-ms 20 --out bench/HEAD.json
+    python loadtest/benchmark.py ... --baseline bench/main.json   # exit 1 nếu có regression
+
+Mỗi case (entity, scale, concurrency) chạy migrator trong một process spawn riêng, với một fake Medusa
+mới (trạng thái rỗng) và fake Magento có `scale` record mỗi loại. Phần chuẩn bị không tính giờ
+(category cho products, products cho orders) chạy trong process khác để không làm lệch peak RSS.
+Kết quả JSON: records/s, latency p50/p95/p99 mỗi record (thời gian worker xử lý item, record trong
+một batch nhận thời gian của cả batch), peak RSS của process migrator và số request Magento / Medusa
+mỗi record (đếm phía server, gồm cả 429 / 5xx bị retry). meta ghi commit git để so sánh giữa các commit.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import shlex
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from array import array
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+ENTITIES = ("categories", "customers", "products", "orders")
+# Phase chạy trước (không tính giờ) để Medusa có dữ liệu mà entity cần
+SETUP = {"products": ("categories",), "orders": ("products",)}
+# Label BoundedScheduler / async pool của từng migrator
+LABELS = {
+    "categories": ("category tasks",),
+    "customers": ("customer tasks",),
+    "products": ("product tasks", "product batches"),
+    "orders": ("order tasks",),
+}
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _stats(url):
+    with urllib.request.urlopen(f"{url}/__stats", timeout=10) as res:
+        return json.loads(res.read())
+
+class _Server:
+    """fake_magento.py / fake_medusa.py chạy trong subprocess riêng (không tranh GIL với migrator)."""
+    def __init__(self, script, options):
+        port = _free_port()
+        self.url = f"http://127.0.0.1:{port}"
+        self.proc = subprocess.Popen(
+            [sys.executable, os.path.join(HERE, script), "--port", str(port)] + options,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + 15
+        while True:
+            try:
+                _stats(self.url)
+                return
+            except OSError:
+                if self.proc.poll() is not None or time.monotonic() > deadline:
+                    self.close()
+                    raise RuntimeError(f"{script} failed to start")
+                time.sleep(0.05)
+
+    def close(self):
+        if self.proc.poll() is None:
+            self.proc.terminate()
+            self.proc.wait(timeout=10)
+
+def _request_counts(before, after):
+    delta = {k: after.get(k, 0) - before.get(k, 0) for k in after}
+    return {
+        "total": sum(v for k, v in delta.items() if not k.startswith("status:")),
+        "throttled": delta.get("status:429", 0),
+        "errors": sum(v for k, v in delta.items() if k.startswith("status:5")),
+    }
+
+def percentile(values, pct):
+    """Nearest-rank percentile của list đã sắp xếp."""
+    if not values:
+        return None
+    rank = max(1, -(-len(values) * pct // 100))
+    return values[int(rank) - 1]
+
+def _migrator_args(case, entity):
+    import main as cli
+    argv = ["main.py", "--entities", entity, "--max-workers", str(case["concurrency"]), "--id-map", "",
+            "--engine", case["engine"]] + shlex.split(case["migrator_args"])
+    saved = sys.argv
+    sys.argv = argv
+    try:
+        return cli._parse_args()
+    finally:
+        sys.argv = saved
+
+def _run_entity(case, entity, magento, medusa):
+    from migrators.category_migrator import migrate_categories
+    from migrators.customer_migrator import migrate_customers
+    from migrators.product_migrator import migrate_products
+    from migrators.order_migrator import migrate_orders
+    args = _migrator_args(case, entity)
+    if entity == "categories":
+        return migrate_categories(magento, medusa, args)
+    if entity == "customers":
+        return migrate_customers(magento, medusa, args)
+    if entity == "products":
+        return migrate_products(magento, medusa, args)
+    return migrate_orders(magento, medusa, args, migration_state=None)
+
+def _child(case, conn):
+    """Process spawn: chạy một phase (setup hoặc đo) và gửi kết quả qua pipe."""
+    import resource
+    from connectors.magento_connector import MagentoConnector
+    from connectors.medusa_connector import MedusaConnector
+    from migrators.scheduler import add_item_observer
+
+    if not case["verbose"]:
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, 1)
+        os.dup2(devnull, 2)
+    try:
+        magento = MagentoConnector(case["magento_url"], token="benchmark", pool_size=case["concurrency"])
+        medusa = MedusaConnector(case["medusa_url"], api_token="benchmark", pool_size=case["concurrency"])
+        if case["setup"]:
+            for entity in case["setup"]:
+                _run_entity(case, entity, magento, medusa)
+            conn.send({"ok": True})
+            return
+
+        entity = case["entity"]
+        durations = array("d")
+        labels = LABELS[entity]
+
+        def _observe(label, item, seconds):
+            if label in labels:
+                # Record trong một batch chờ cả batch
+                durations.extend([seconds] * (len(item) if isinstance(item, list) else 1))
+
+        magento_before, medusa_before = _stats(case["magento_url"]), _stats(case["medusa_url"])
+        add_item_observer(_observe)
+        started = time.perf_counter()
+        _run_entity(case, entity, magento, medusa)
+        elapsed = time.perf_counter() - started
+        magento_after, medusa_after = _stats(case["magento_url"]), _stats(case["medusa_url"])
+        conn.send({
+            "ok": True,
+            "seconds": elapsed,
+            "durations": sorted(durations),
+            "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            "magento": _request_counts(magento_before, magento_after),
+            "medusa": _request_counts(medusa_before, medusa_after),
+        })
+    except BaseException as e:
+        conn.send({"ok": False, "error": f"{type(e).__name__}: {e}"})
+    finally:
+        conn.close()
+
+def _spawn(case):
+    ctx = multiprocessing.get_context("spawn")
+    parent, child = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_child, args=(case, child))
+    proc.start()
+    child.close()
+    try:
+        result = parent.recv()
+    except EOFError:
+        result = {"ok": False, "error": f"benchmark process exited with code {proc.exitcode}"}
+    proc.join()
+    if not result.get("ok"):
+        raise RuntimeError(result.get("error"))
+    return result
+
+def _summarize(entity, scale, concurrency, engine, runs):
+    """Gộp các lần lặp: lấy lần có throughput trung vị, peak RSS lớn nhất."""
+    for run in runs:
+        run["records"] = len(run["durations"])
+        run["throughput"] = run["records"] / run["seconds"] if run["seconds"] else 0.0
+    runs.sort(key=lambda r: r["throughput"])
+    median = runs[len(runs) // 2]
+    records = median["records"] or 1
+    durations = median["durations"]
+
+    def _ms(value):
+        return round(value * 1000, 3) if value is not None else None
+
+    return {
+        "entity": entity,
+        "scale": scale,
+        "concurrency": concurrency,
+        "engine": engine,
+        "repeats": len(runs),
+        "records": median["records"],
+        "seconds": round(median["seconds"], 3),
+        "throughput": round(median["throughput"], 2),
+        "throughput_runs": [round(r["throughput"], 2) for r in runs],
+        "latency_ms": {
+            "p50": _ms(percentile(durations, 50)),
+            "p95": _ms(percentile(durations, 95)),
+            "p99": _ms(percentile(durations, 99)),
+            "mean": _ms(statistics.fmean(durations)) if durations else None,
+            "max": _ms(durations[-1] if durations else None),
+        },
+        "peak_rss_mb": round(max(r["peak_rss_kb"] for r in runs) / 1024, 1),
+        "requests": {
+            "magento": median["magento"],
+            "medusa": median["medusa"],
+            "magento_per_record": round(median["magento"]["total"] / records, 3),
+            "medusa_per_record": round(median["medusa"]["total"] / records, 3),
+            "per_record": round((median["magento"]["total"] + median["medusa"]["total"]) / records, 3),
+        },
+    }
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "-C", ROOT, "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10)
+        dirty = subprocess.run(["git", "-C", ROOT, "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, timeout=30)
+        return out.stdout.strip() + ("-dirty" if dirty.stdout.strip() else "") if out.returncode == 0 else None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def compare(results, baseline, threshold):
+    """So với baseline theo (entity, scale, concurrency, engine). Trả về list regression."""
+    index = {(r["entity"], r["scale"], r["concurrency"], r["engine"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        base = index.get((r["entity"], r["scale"], r["concurrency"], r["engine"]))
+        if base is None:
+            continue
+        checks = [
+            ("throughput", r["throughput"], base["throughput"], r["throughput"] < base["throughput"] * (1 - threshold)),
+            ("p95_ms", r["latency_ms"]["p95"], base["latency_ms"]["p95"],
+             bool(base["latency_ms"]["p95"]) and (r["latency_ms"]["p95"] or 0) > base["latency_ms"]["p95"] * (1 + threshold)),
+            ("requests_per_record", r["requests"]["per_record"], base["requests"]["per_record"],
+             r["requests"]["per_record"] > base["requests"]["per_record"] * (1 + threshold)),
+        ]
+        r["baseline"] = {name: old for name, _, old, _ in checks}
+        for name, new, old, regressed in checks:
+            if regressed:
+                regressions.append(f"{r['entity']} scale={r['scale']} c={r['concurrency']} {r['engine']}: {name} {old} -> {new}")
+    return regressions
+
+def _int_list(value):
+    return [int(v) for v in value.split(",") if v.strip()]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end migrator throughput benchmark against the fake servers")
+    parser.add_argument("--entities", default=",".join(ENTITIES))
+    parser.add_argument("--scales", type=_int_list, default=[500], help="Records per entity, comma separated (default: 500)")
+    parser.add_argument("--concurrency", type=_int_list, default=[8], help="--max-workers values, comma separated (default: 8)")
+    parser.add_argument("--engine", default="threads", choices=["threads", "async"])
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per case; the median-throughput run is reported")
+    parser.add_argument("--migrator-args", default="", help="Extra main.py flags, e.g. \"--product-batch-size 50\"")
+    parser.add_argument("--latency-ms", type=float, default=5, help="Fake server service time (default: 5)")
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1, help="Seed for fake server jitter / fault injection")
+    parser.add_argument("--out", default=None, help="Write results JSON to this file (default: stdout)")
+    parser.add_argument("--baseline", default=None, help="Previous results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative change flagged as regression (default: 0.10)")
+    parser.add_argument("--verbose", action="store_true", help="Show migrator output")
+    args = parser.parse_args(argv)
+
+    entities = [e.strip() for e in args.entities.split(",") if e.strip()]
+    unknown = set(entities) - set(ENTITIES)
+    if unknown:
+        parser.error(f"Unknown entities: {', '.join(sorted(unknown))}")
+    faults = ["--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms), "--error-rate", str(args.error_rate),
+              "--throttle-rate", str(args.throttle_rate), "--retry-after", "0", "--seed", str(args.seed)]
+
+    results = []
+    for scale in args.scales:
+        magento = _Server("fake_magento.py", faults + ["--products", str(scale), "--categories", str(scale),
+                                                       "--customers", str(scale), "--orders", str(scale)])
+        try:
+            for entity in entities:
+                for concurrency in args.concurrency:
+                    runs = []
+                    for _ in range(max(1, args.repeat)):
+                        medusa = _Server("fake_medusa.py", faults)
+                        case = {"entity": entity, "concurrency": concurrency, "engine": args.engine, "verbose": args.verbose,
+                                "migrator_args": args.migrator_args, "magento_url": magento.url, "medusa_url": medusa.url}
+                        try:
+                            if entity in SETUP:
+                                _spawn(dict(case, setup=SETUP[entity]))
+                            runs.append(_spawn(dict(case, setup=())))
+                        finally:
+                            medusa.close()
+                    result = _summarize(entity, scale, concurrency, args.engine, runs)
+                    results.append(result)
+                    print(f"{entity:<10} scale={scale:<7} c={concurrency:<4} {result['throughput']:>9.1f} rec/s  "
+                          f"p50={result['latency_ms']['p50']}ms p95={result['latency_ms']['p95']}ms p99={result['latency_ms']['p99']}ms  "
+                          f"rss={result['peak_rss_mb']}MB  req/rec={result['requests']['per_record']}", file=sys.stderr)
+        finally:
+            magento.close()
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "engine": args.engine,
+            "migrator_args": args.migrator_args,
+            "server": {"latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms, "error_rate": args.error_rate,
+                       "throttle_rate": args.throttle_rate, "seed": args.seed},
+        },
+        "results": results,
+    }
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        report["meta"]["baseline_commit"] = baseline.get("meta", {}).get("commit")
+        regressions = compare(results, baseline, args.threshold)
+        report["regressions"] = regressions
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        directory = os.path.dirname(args.out)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as fh:
+            fh.write(output + "\n")
+    else:
+        print(output)
+    for line in regressions:
+        print(f"REGRESSION {line}", file=sys.stderr)
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,347 @@
+import random
+from datetime import datetime, timedelta
+
+FIRST_NAMES = ("Anna", "Bao", "Carlos", "Diana", "Emil", "Fatima", "Giang", "Hiro", "Ines", "Jonas", "Khanh", "Lena", "Minh", "Nora", "Oskar", "Priya")
+LAST_NAMES = ("Nguyen", "Tran", "Schmidt", "Garcia", "Rossi", "Novak", "Kowalski", "Dubois", "Jensen", "Silva", "Le", "Pham", "Muller", "Santos")
+CITIES = (("Berlin", "DE", "BE"), ("Paris", "FR", "IDF"), ("Madrid", "ES", "MD"), ("Hanoi", "VN", "HN"), ("Milan", "IT", "MI"), ("Vienna", "AT", "WI"), ("Lisbon", "PT", "LI"))
+ADJECTIVES = ("Classic", "Modern", "Compact", "Deluxe", "Eco", "Vintage", "Smart", "Urban", "Premium", "Portable")
+NOUNS = ("Clock", "Lamp", "Chair", "Backpack", "Kettle", "Speaker", "Jacket", "Sneaker", "Mug", "Desk", "Headphones", "Bottle")
+PAYMENT_METHODS = ("checkmo", "banktransfer", "stripe_payments", "paypal_express")
+ORDER_STATUSES = ("pending", "processing", "complete", "complete", "complete", "canceled")
+
+EPOCH = datetime(2020, 1, 1)
+ROOT_CATEGORY_ID = 1
+DEFAULT_CATEGORY_ID = 2
+
+def _rng(seed, kind, i):
+    # RNG riêng cho từng record: truy cập ngẫu nhiên theo id mà vẫn deterministic
+    return random.Random(f"{seed}:{kind}:{i}")
+
+def _timestamp(rng, days=1500):
+    return (EPOCH + timedelta(seconds=rng.randrange(days * 86400))).strftime("%Y-%m-%d %H:%M:%S")
+
+def _address(rng, firstname, lastname):
+    city, country, region = rng.choice(CITIES)
+    return {
+        "firstname": firstname,
+        "lastname": lastname,
+        "street": [f"{rng.randint(1, 250)} {rng.choice(LAST_NAMES)} Street"] + ([f"Apt {rng.randint(1, 90)}"] if rng.random() < 0.3 else []),
+        "city": city,
+        "region": region,
+        "region_code": region,
+        "postcode": f"{rng.randint(10000, 99999)}",
+        "country_id": country,
+        "telephone": f"+{rng.randint(30, 89)}{rng.randint(100000000, 999999999)}",
+    }
+
+class Dataset:
+    """
+    Dữ liệu Magento tổng hợp, deterministic theo (seed, loại, id): record thứ i luôn giống nhau
+    và sinh được độc lập (O(1) bộ nhớ), nên fake server phân trang được catalog hàng triệu record
+    mà không giữ gì trong RAM.
+    - Category: cây cân bằng dưới "Default Category" (id 2), sâu tối đa category_depth cấp.
+    - Product: simple product, link tới 1-3 category lá, có tồn kho và ảnh.
+    - Customer: 1-4 địa chỉ; order: 1-5 dòng tham chiếu SKU thật, payment nhúng sẵn,
+      phần lớn order có invoice (entity_id invoice = entity_id order).
+    """
+    def __init__(self, products=1000, categories=50, customers=500, orders=1000, category_depth=5, seed=0):
+        self.products = int(products)
+        self.categories = int(categories)
+        self.customers = int(customers)
+        self.orders = int(orders)
+        self.category_depth = max(1, int(category_depth))
+        self.seed = seed
+        self._fanout = self._category_fanout()
+        # Số node ở mỗi cấp (cấp 1 = con trực tiếp của Default Category)
+        self._level_sizes = []
+        remaining, width = self.categories, self._fanout
+        while remaining > 0:
+            size = min(width, remaining)
+            self._level_sizes.append(size)
+            remaining -= size
+            width = size * self._fanout
+        self._leaves = self._leaf_categories()
+
+    def _category_fanout(self):
+        fanout = 2
+        while sum(fanout ** level for level in range(1, self.category_depth + 1)) < self.categories:
+            fanout += 1
+        return fanout
+
+    # --- Categories ---
+
+    def category_ids(self):
+        """Mọi category id (kể cả root 1 và Default Category 2)."""
+        return range(1, self.categories + 3)
+
+    def _category_position(self, k):
+        """Node thứ k (BFS, từ 0) -> (cấp, vị trí trong cấp)."""
+        for depth, size in enumerate(self._level_sizes):
+            if k < size:
+                return depth, k
+            k -= size
+        raise IndexError(k)
+
+    def _category_index(self, depth, offset):
+        return sum(self._level_sizes[:depth]) + offset
+
+    def category_parent(self, category_id):
+        if category_id <= DEFAULT_CATEGORY_ID:
+            return 0 if category_id == ROOT_CATEGORY_ID else ROOT_CATEGORY_ID
+        depth, offset = self._category_position(category_id - 3)
+        if depth == 0:
+            return DEFAULT_CATEGORY_ID
+        return self._category_index(depth - 1, offset // self._fanout) + 3
+
+    def category_children(self, category_id):
+        if category_id == ROOT_CATEGORY_ID:
+            return [DEFAULT_CATEGORY_ID]
+        if category_id == DEFAULT_CATEGORY_ID:
+            return [k + 3 for k in range(self._level_sizes[0])] if self._level_sizes else []
+        depth, offset = self._category_position(category_id - 3)
+        if depth + 1 >= len(self._level_sizes):
+            return []
+        first = offset * self._fanout
+        last = min(first + self._fanout, self._level_sizes[depth + 1])
+        return [self._category_index(depth + 1, o) + 3 for o in range(first, last)]
+
+    def category_level(self, category_id):
+        if category_id <= DEFAULT_CATEGORY_ID:
+            return category_id - 1
+        return self._category_position(category_id - 3)[0] + 2
+
+    def leaf_categories(self):
+        return self._leaves
+
+    def _leaf_categories(self):
+        if not self._level_sizes:
+            return [DEFAULT_CATEGORY_ID]
+        depth = len(self._level_sizes) - 1
+        return [self._category_index(depth, o) + 3 for o in range(self._level_sizes[depth])]
+
+    def category(self, category_id):
+        rng = _rng(self.seed, "category", category_id)
+        path, node = [], category_id
+        while node:
+            path.append(str(node))
+            node = self.category_parent(node)
+        if category_id == ROOT_CATEGORY_ID:
+            name = "Root Catalog"
+        elif category_id == DEFAULT_CATEGORY_ID:
+            name = "Default Category"
+        else:
+            name = f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}s {category_id}"
+        children = self.category_children(category_id)
+        return {
+            "id": category_id,
+            "parent_id": self.category_parent(category_id),
+            "name": name,
+            "is_active": rng.random() > 0.05 or category_id <= DEFAULT_CATEGORY_ID,
+            "position": rng.randint(0, 20),
+            "level": self.category_level(category_id),
+            "children": ",".join(str(c) for c in children),
+            "path": "/".join(reversed(path)),
+            "include_in_menu": True,
+            "description": f"<p>{name}</p>",
+            "created_at": _timestamp(rng),
+            "updated_at": _timestamp(rng),
+        }
+
+    def category_tree(self, category_id=ROOT_CATEGORY_ID, depth=None):
+        node = self.category(category_id)
+        tree = {k: node[k] for k in ("id", "parent_id", "name", "is_active", "position", "level")}
+        tree["product_count"] = 0
+        if depth is None or depth > 0:
+            tree["children_data"] = [
+                self.category_tree(child, None if depth is None else depth - 1)
+                for child in self.category_children(category_id)
+            ]
+        else:
+            tree["children_data"] = []
+        return tree
+
+    # --- Products ---
+
+    def sku(self, product_id):
+        return f"SKU-{product_id:07d}"
+
+    def product(self, product_id):
+        rng = _rng(self.seed, "product", product_id)
+        name = f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {product_id}"
+        leaves = self.leaf_categories()
+        category_ids = sorted({str(rng.choice(leaves)) for _ in range(rng.randint(1, 3))})
+        images = [f"/{chr(97 + rng.randrange(26))}/{chr(97 + rng.randrange(26))}/product-{product_id}-{n}.jpg"
+                  for n in range(rng.randint(0, 3))]
+        created = _timestamp(rng)
+        return {
+            "id": product_id,
+            "sku": self.sku(product_id),
+            "name": name,
+            "attribute_set_id": 4,
+            "price": round(rng.uniform(2, 900), 2),
+            "status": 1 if rng.random() > 0.03 else 2,
+            "visibility": 4,
+            "type_id": "simple",
+            "created_at": created,
+            "updated_at": created,
+            "weight": round(rng.uniform(0.1, 25), 2),
+            "extension_attributes": {
+                "website_ids": [1],
+                "category_links": [{"position": n, "category_id": c} for n, c in enumerate(category_ids)],
+                "stock_item": {"qty": rng.randint(0, 500), "is_in_stock": True},
+            },
+            "product_links": [],
+            "options": [],
+            "media_gallery_entries": [
+                {"id": product_id * 10 + n, "media_type": "image", "label": None, "position": n + 1, "disabled": False,
+                 "types": ["image", "small_image", "thumbnail"] if n == 0 else [], "file": path}
+                for n, path in enumerate(images)
+            ],
+            "tier_prices": [],
+            "custom_attributes": [
+                {"attribute_code": "url_key", "value": name.lower().replace(" ", "-")},
+                {"attribute_code": "meta_title", "value": name},
+                {"attribute_code": "tax_class_id", "value": "2"},
+                {"attribute_code": "category_ids", "value": category_ids},
+                {"attribute_code": "description", "value": f"<p>{name} - {rng.choice(ADJECTIVES).lower()} edition.</p>"},
+            ],
+        }
+
+    # --- Customers ---
+
+    def customer_email(self, customer_id):
+        return f"customer{customer_id}@example.com"
+
+    def customer(self, customer_id):
+        rng = _rng(self.seed, "customer", customer_id)
+        firstname, lastname = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        addresses = []
+        for n in range(rng.randint(1, 4)):
+            address = _address(rng, firstname, lastname)
+            address.update({
+                "id": customer_id * 10 + n,
+                "customer_id": customer_id,
+                "company": f"{lastname} GmbH" if rng.random() < 0.1 else None,
+                "region": {"region_code": address["region_code"], "region": address["region"], "region_id": 0},
+                "default_shipping": n == 0,
+                "default_billing": n == 0,
+            })
+            addresses.append(address)
+        created = _timestamp(rng)
+        return {
+            "id": customer_id,
+            "group_id": 1,
+            "email": self.customer_email(customer_id),
+            "firstname": firstname,
+            "lastname": lastname,
+            "created_at": created,
+            "updated_at": created,
+            "store_id": 1,
+            "website_id": 1,
+            "addresses": addresses,
+        }
+
+    # --- Orders / invoices ---
+
+    def increment_id(self, order_id):
+        return f"{100000000 + order_id}"
+
+    def order(self, order_id):
+        rng = _rng(self.seed, "order", order_id)
+        customer_id = rng.randint(1, max(1, self.customers))
+        customer = _rng(self.seed, "customer", customer_id)
+        firstname, lastname = customer.choice(FIRST_NAMES), customer.choice(LAST_NAMES)
+        items, subtotal = [], 0.0
+        for n in range(rng.randint(1, 5)):
+            product_id = rng.randint(1, max(1, self.products))
+            qty = rng.randint(1, 3)
+            price = round(rng.uniform(2, 900), 2)
+            subtotal += price * qty
+            items.append({
+                "item_id": order_id * 10 + n,
+                "order_id": order_id,
+                "parent_item_id": None,
+                "sku": self.sku(product_id),
+                "name": f"Product {product_id}",
+                "product_id": product_id,
+                "product_type": "simple",
+                "qty_ordered": qty,
+                "price": price,
+                "base_price": price,
+                "row_total": round(price * qty, 2),
+            })
+        shipping = round(rng.choice((0, 4.9, 9.9)), 2)
+        tax = round(subtotal * 0.19, 2)
+        grand_total = round(subtotal + shipping + tax, 2)
+        billing = _address(rng, firstname, lastname)
+        created = _timestamp(rng)
+        status = rng.choice(ORDER_STATUSES)
+        paid = grand_total if status in ("processing", "complete") else 0
+        return {
+            "entity_id": order_id,
+            "increment_id": self.increment_id(order_id),
+            "status": status,
+            "state": status,
+            "customer_id": customer_id,
+            "customer_email": self.customer_email(customer_id),
+            "customer_firstname": firstname,
+            "customer_lastname": lastname,
+            "order_currency_code": "EUR",
+            "base_currency_code": "EUR",
+            "created_at": created,
+            "updated_at": created,
+            "subtotal": round(subtotal, 2),
+            "grand_total": grand_total,
+            "base_grand_total": grand_total,
+            "tax_amount": tax,
+            "base_tax_amount": tax,
+            "shipping_amount": shipping,
+            "base_shipping_amount": shipping,
+            "total_paid": paid,
+            "items": items,
+            "billing_address": dict(billing, address_type="billing", entity_id=order_id * 10, parent_id=order_id),
+            "payment": {
+                "entity_id": order_id,
+                "parent_id": order_id,
+                "method": rng.choice(PAYMENT_METHODS),
+                "last_trans_id": f"txn_{rng.getrandbits(48):012x}" if paid else None,
+                "amount_ordered": grand_total,
+                "amount_paid": paid,
+                "additional_information": ["Check / Money order"],
+            },
+            "extension_attributes": {
+                "shipping_assignments": [{
+                    "shipping": {
+                        "address": dict(billing, address_type="shipping", entity_id=order_id * 10 + 1, parent_id=order_id),
+                        "method": "flatrate_flatrate",
+                    },
+                    "items": items,
+                }],
+            },
+        }
+
+    def has_invoice(self, order_id):
+        return _rng(self.seed, "invoice", order_id).random() < 0.9
+
+    def invoice(self, order_id):
+        """Invoice của order (cùng entity_id), None nếu order chưa xuất hoá đơn."""
+        if not self.has_invoice(order_id):
+            return None
+        order = self.order(order_id)
+        return {
+            "entity_id": order_id,
+            "order_id": order_id,
+            "increment_id": order["increment_id"],
+            "state": 2,
+            "grand_total": order["grand_total"],
+            "base_grand_total": order["base_grand_total"],
+            "subtotal": order["subtotal"],
+            "tax_amount": order["tax_amount"],
+            "shipping_amount": order["shipping_amount"],
+            "created_at": order["created_at"],
+            "updated_at": order["updated_at"],
+            "items": [
+                {"entity_id": it["item_id"], "order_item_id": it["item_id"], "sku": it["sku"], "qty": it["qty_ordered"], "price": it["price"]}
+                for it in order["items"]
+            ],
+        }
@@ -0,0 +1,226 @@
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+
+class Faults:
+    """
+    Lỗi / độ trễ bơm vào mỗi request của fake server.
+    - latency_ms + jitter_ms: thời gian phục vụ (jitter ngẫu nhiên đều trong [0, jitter_ms]).
+    - throttle_rate: tỉ lệ request bị trả 429 kèm Retry-After (giây).
+    - error_rate: tỉ lệ request bị trả error_status (mặc định 503, connector sẽ retry).
+    """
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0, error_status=503, throttle_rate=0.0, retry_after=1, seed=None):
+        self.latency_ms = float(latency_ms or 0)
+        self.jitter_ms = float(jitter_ms or 0)
+        self.error_rate = float(error_rate or 0)
+        self.error_status = int(error_status)
+        self.throttle_rate = float(throttle_rate or 0)
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_args(cls, args):
+        return cls(args.latency_ms, args.jitter_ms, args.error_rate, args.error_status, args.throttle_rate, args.retry_after, args.seed)
+
+    def delay(self):
+        if not self.latency_ms and not self.jitter_ms:
+            return 0.0
+        with self._lock:
+            jitter = self._random.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0
+        return (self.latency_ms + jitter) / 1000.0
+
+    def inject(self):
+        """None nếu request được phục vụ bình thường, ngược lại (status, body, headers) của lỗi bơm vào."""
+        if not self.throttle_rate and not self.error_rate:
+            return None
+        with self._lock:
+            roll = self._random.random()
+        if roll < self.throttle_rate:
+            return 429, {"message": "Too many requests (injected)"}, {"Retry-After": str(self.retry_after)}
+        if roll < self.throttle_rate + self.error_rate:
+            return self.error_status, {"message": "Service unavailable (injected)"}, {}
+        return None
+
+class HttpError(Exception):
+    """Handler raise để trả lỗi HTTP với body JSON {"message", "type"}."""
+    def __init__(self, status, message, error_type="invalid_data"):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.type = error_type
+
+class FakeApp:
+    """
+    Bảng route (method, regex path) -> handler(match, query, body) trả về object JSON hoặc (status, object).
+    POST có header Idempotency-Key thành công được nhớ lại: gửi lại cùng key trả đúng response cũ
+    (như retry sau timeout trên Medusa thật), không tạo bản ghi trùng.
+    """
+    def __init__(self):
+        self._routes = []
+        self._idempotent = {}
+        self._idempotent_lock = threading.Lock()
+
+    def route(self, method, pattern):
+        regex = re.compile("^" + pattern + "$")
+
+        def _register(fn):
+            self._routes.append((method, regex, fn))
+            return fn
+        return _register
+
+    def dispatch(self, method, path, query, body, headers=None):
+        key = (headers or {}).get("Idempotency-Key") if method == "POST" else None
+        if key:
+            with self._idempotent_lock:
+                cached = self._idempotent.get((path, key))
+            if cached is not None:
+                return cached
+        status, result = self._dispatch(method, path, query, body)
+        if key and 200 <= status < 300:
+            with self._idempotent_lock:
+                self._idempotent[(path, key)] = (status, result)
+        return status, result
+
+    def _dispatch(self, method, path, query, body):
+        for route_method, regex, fn in self._routes:
+            if route_method != method:
+                continue
+            match = regex.match(path)
+            if match:
+                result = fn(match, query, body)
+                if isinstance(result, tuple):
+                    return result
+                return 200, result
+        raise HttpError(404, f"Route {method} {path} not found", "not_found")
+
+class FakeServer(ThreadingHTTPServer):
+    """
+    ThreadingHTTPServer cho load test: một thread mỗi connection, keep-alive (HTTP/1.1),
+    backlog lớn. GET /__stats trả về số request theo route / status.
+    """
+    daemon_threads = True
+    request_queue_size = 1024
+    allow_reuse_address = True
+
+    def __init__(self, address, app, faults=None, verbose=False):
+        super().__init__(address, _Handler)
+        self.app = app
+        self.faults = faults or Faults()
+        self.verbose = verbose
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def snapshot(self):
+        with self._stats_lock:
+            return dict(self.stats)
+
+    def start(self):
+        """Chạy serve_forever trên thread nền (dùng khi nhúng vào benchmark)."""
+        thread = threading.Thread(target=self.serve_forever, name=f"fake-server-{self.server_address[1]}", daemon=True)
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Header và body được ghi bằng hai lần send: tắt Nagle để không dính delayed ACK (~40ms) trên keep-alive
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status, obj, headers=None):
+        body = json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, method):
+        parts = urlsplit(self.path)
+        path = parts.path.rstrip("/") or "/"
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        if path == "/__stats" and method == "GET":
+            self._send(200, self.server.snapshot())
+            return
+
+        server = self.server
+        delay = server.faults.delay()
+        if delay:
+            time.sleep(delay)
+        injected = server.faults.inject()
+        if injected is not None:
+            status, obj, headers = injected
+            server.count(f"status:{status}")
+            self._send(status, obj, headers)
+            return
+
+        try:
+            body = json.loads(raw) if raw else None
+            query = parse_qsl(parts.query, keep_blank_values=True)
+            status, obj = server.app.dispatch(method, path, query, body, self.headers)
+        except HttpError as e:
+            status, obj = e.status, {"type": e.type, "message": e.message}
+        except ValueError as e:
+            status, obj = 400, {"type": "invalid_data", "message": str(e)}
+        server.count(f"{method} {_route_label(path)}")
+        server.count(f"status:{status}")
+        self._send(status, obj)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+def _route_label(path):
+    # /rest/V1/orders/123/invoices -> /rest/V1/orders/:id/invoices (gom stats theo route)
+    return "/".join(":id" if re.fullmatch(r"\d+|[a-z]+_[0-9A-Z]{8,}", seg) else seg for seg in path.split("/"))
+
+def add_server_args(parser, default_port):
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=default_port)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Base service time per request (ms)")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Extra random service time, uniform in [0, N] ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with --error-status")
+    parser.add_argument("--error-status", type=int, default=503, help="HTTP status for injected errors (default: 503)")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--retry-after", default="1", help="Retry-After header sent with injected 429s (seconds)")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for latency jitter / fault injection")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+
+def serve(server, name):
+    print(f"{name} listening on {server.url} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(server.snapshot(), indent=2, sort_keys=True))
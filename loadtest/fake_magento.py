@@ -0,0 +1,244 @@
+"""
+Fake Magento 2 REST API cho load test (chỉ stdlib).
+
+    python loadtest/fake_magento.py --products 100000 --orders 50000 --latency-ms 20 --throttle-rate 0.01
+
+Phục vụ các endpoint MagentoConnector gọi (products, categories list/tree, customers/search, orders,
+invoices, orders/:id/invoices, orders/:id/payment, integration/admin/token) từ loadtest/dataset.py:
+record sinh theo id khi được đọc, nên catalog lớn không tốn bộ nhớ.
+searchCriteria hỗ trợ filter theo id (eq / in / gt / gteq / lt / lteq, kể cả increment_id),
+filter khác (vd. updated_at) được so sánh trên record, sortOrders theo entity_id và `fields` projection.
+"""
+import argparse
+import re
+from fake_common import FakeApp, FakeServer, Faults, HttpError, add_server_args, serve
+from dataset import Dataset, ROOT_CATEGORY_ID
+from generate_fixtures import dataset_from_manifest
+
+# Field id dùng cho filter / keyset của từng listing
+_ID_FIELDS = {"entity_id", "id", "order_id"}
+_CRITERIA_KEY = re.compile(r"searchCriteria\[(\w+)\](?:\[(\d+)\]\[(\w+)\](?:\[(\d+)\]\[(\w+)\])?)?")
+
+def parse_criteria(query):
+    """Query string searchCriteria[...] -> {"page", "page_size", "groups": [[(field, value, cond)]], "desc"}."""
+    page, page_size = 1, 20
+    groups, sort_dirs = {}, {}
+    for key, value in query:
+        m = _CRITERIA_KEY.fullmatch(key)
+        if not m:
+            continue
+        name, g, sub, f, attr = m.groups()
+        if name == "currentPage":
+            page = max(1, int(value))
+        elif name == "pageSize":
+            page_size = max(1, int(value))
+        elif name == "filterGroups" and attr:
+            groups.setdefault(int(g), {}).setdefault(int(f), {})[attr] = value
+        elif name == "sortOrders" and sub == "direction":
+            sort_dirs[int(g)] = value.upper()
+    parsed = [
+        [(flt.get("field"), flt.get("value", ""), flt.get("condition_type", "eq")) for _, flt in sorted(filters.items())]
+        for _, filters in sorted(groups.items())
+    ]
+    desc = any(d == "DESC" for d in sort_dirs.values())
+    return {"page": page, "page_size": page_size, "groups": parsed, "desc": desc}
+
+def parse_fields(spec):
+    """Magento `fields` projection "items[id,sku,a[b]],total_count" -> cây {name: subtree | None}."""
+    tree, stack, token = {}, [], ""
+    node = tree
+    for ch in spec or "":
+        if ch in ",[]":
+            if token:
+                node[token] = None
+            if ch == "[":
+                node[token] = {}
+                stack.append(node)
+                node = node[token]
+            elif ch == "]" and stack:
+                node = stack.pop()
+            token = ""
+        else:
+            token += ch
+    if token:
+        node[token] = None
+    return tree
+
+def project(value, tree):
+    if tree is None:
+        return value
+    if isinstance(value, list):
+        return [project(v, tree) for v in value]
+    if isinstance(value, dict):
+        return {k: project(v, tree[k]) for k, v in value.items() if k in tree}
+    return value
+
+def _compare(left, value, cond):
+    if cond == "in":
+        return str(left) in value.split(",")
+    if cond == "nin":
+        return str(left) not in value.split(",")
+    if cond == "like":
+        return value.strip("%") in str(left)
+    if cond in ("gt", "gteq", "lt", "lteq"):
+        try:
+            a, b = float(left), float(value)
+        except (TypeError, ValueError):
+            a, b = str(left), value
+        return {"gt": a > b, "gteq": a >= b, "lt": a < b, "lteq": a <= b}[cond]
+    return str(left) == value
+
+class _Listing:
+    """searchCriteria trên tập id 1..total, record dựng lười bằng build(id); exists(id) lọc id không có record."""
+    def __init__(self, total, build, to_id=None, exists=None):
+        self.total = total
+        self.build = build
+        self.exists = exists
+        # field -> hàm đổi giá trị filter thành id (increment_id của order)
+        self.to_id = to_id or {}
+
+    def _id_group(self, group):
+        """Group chỉ gồm filter theo id -> (lo, hi, set|None); None nếu cần so sánh trên record."""
+        lo, hi, ids = 1, self.total, None
+        for field, value, cond in group:
+            convert = int if field in _ID_FIELDS else self.to_id.get(field)
+            if convert is None or cond not in ("eq", "in", "gt", "gteq", "lt", "lteq"):
+                return None
+        if len(group) > 1 and any(cond not in ("eq", "in") for _, _, cond in group):
+            return None
+        for field, value, cond in group:
+            convert = int if field in _ID_FIELDS else self.to_id[field]
+            if cond in ("eq", "in"):
+                found = set()
+                for v in value.split(","):
+                    try:
+                        found.add(convert(v))
+                    except ValueError:
+                        continue
+                ids = found if ids is None else ids | found
+            elif cond == "gt":
+                lo = max(lo, convert(value) + 1)
+            elif cond == "gteq":
+                lo = max(lo, convert(value))
+            elif cond == "lt":
+                hi = min(hi, convert(value) - 1)
+            elif cond == "lteq":
+                hi = min(hi, convert(value))
+        return lo, hi, ids
+
+    def search(self, query):
+        criteria = parse_criteria(query)
+        lo, hi, ids, predicates = 1, self.total, None, []
+        for group in criteria["groups"]:
+            narrowed = self._id_group(group)
+            if narrowed is None:
+                predicates.append(group)
+                continue
+            g_lo, g_hi, g_ids = narrowed
+            lo, hi = max(lo, g_lo), min(hi, g_hi)
+            if g_ids is not None:
+                ids = g_ids if ids is None else ids & g_ids
+        candidates = sorted(i for i in ids if lo <= i <= hi) if ids is not None else range(lo, hi + 1)
+        if self.exists is not None:
+            candidates = [i for i in candidates if self.exists(i)]
+        if criteria["desc"]:
+            candidates = candidates[::-1]
+        page, size = criteria["page"], criteria["page_size"]
+
+        if not predicates:
+            # Đường nhanh: chỉ dựng các record của trang được đọc
+            matches = None
+            total_count = len(candidates)
+        else:
+            matches = [r for r in (self.build(i) for i in candidates) if all(
+                any(_compare(r.get(field), value, cond) for field, value, cond in group) for group in predicates)]
+            total_count = len(matches)
+
+        last_page = max(1, -(-total_count // size))
+        # Magento trả lại trang cuối khi currentPage vượt phạm vi
+        page = min(page, last_page)
+        start = (page - 1) * size
+        if matches is not None:
+            items = matches[start:start + size]
+        else:
+            items = [self.build(i) for i in candidates[start:start + size]]
+        return {
+            "items": items,
+            "search_criteria": {"current_page": page, "page_size": size, "filter_groups": criteria["groups"]},
+            "total_count": total_count,
+        }
+
+def create_app(dataset):
+    app = FakeApp()
+    products = _Listing(dataset.products, dataset.product)
+    categories = _Listing(dataset.categories + 2, dataset.category)
+    customers = _Listing(dataset.customers, dataset.customer)
+    orders = _Listing(dataset.orders, dataset.order, {"increment_id": lambda v: int(v) - 100000000})
+    invoices = _Listing(dataset.orders, dataset.invoice, exists=dataset.has_invoice)
+
+    def _order_id(match):
+        order_id = int(match.group(1))
+        if not 1 <= order_id <= dataset.orders:
+            raise HttpError(404, "The entity that was requested doesn't exist.", "not_found")
+        return order_id
+
+    def _listing(listing):
+        def _handler(match, query, body):
+            result = listing.search(query)
+            fields = dict(query).get("fields")
+            return project(result, parse_fields(fields)) if fields else result
+        return _handler
+
+    app.route("GET", r"/rest/V1/products")(_listing(products))
+    app.route("GET", r"/rest/V1/categories/list")(_listing(categories))
+    app.route("GET", r"/rest/V1/customers/search")(_listing(customers))
+    app.route("GET", r"/rest/V1/orders")(_listing(orders))
+    app.route("GET", r"/rest/V1/invoices")(_listing(invoices))
+
+    @app.route("POST", r"/rest/V1/integration/admin/token")
+    def _token(match, query, body):
+        if not (body or {}).get("username") or not (body or {}).get("password"):
+            raise HttpError(401, "The account sign-in was incorrect.", "unauthorized")
+        return "fake-magento-admin-token"
+
+    @app.route("GET", r"/rest/V1/categories")
+    def _category_tree(match, query, body):
+        params = dict(query)
+        root = int(params.get("rootCategoryId") or ROOT_CATEGORY_ID)
+        depth = int(params["depth"]) if params.get("depth") else None
+        return dataset.category_tree(root, depth)
+
+    @app.route("GET", r"/rest/V1/orders/(\d+)/invoices")
+    def _order_invoices(match, query, body):
+        invoice = dataset.invoice(_order_id(match))
+        return {"items": [invoice] if invoice else [], "total_count": 1 if invoice else 0}
+
+    @app.route("GET", r"/rest/V1/orders/(\d+)/payment")
+    def _order_payment(match, query, body):
+        return dataset.order(_order_id(match))["payment"]
+
+    return app
+
+def create_server(dataset, host="127.0.0.1", port=0, faults=None, verbose=False):
+    return FakeServer((host, port), create_app(dataset), faults, verbose)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fake Magento 2 REST API for load testing")
+    add_server_args(parser, default_port=8081)
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--category-depth", type=int, default=5)
+    parser.add_argument("--customers", type=int, default=500)
+    parser.add_argument("--orders", type=int, default=1000)
+    parser.add_argument("--data-seed", type=int, default=0, help="Seed of the generated dataset")
+    parser.add_argument("--fixtures", default=None, help="Serve the dataset of a generate_fixtures.py output directory (manifest.json)")
+    args = parser.parse_args(argv)
+
+    if args.fixtures:
+        dataset = dataset_from_manifest(args.fixtures)
+    else:
+        dataset = Dataset(args.products, args.categories, args.customers, args.orders, args.category_depth, args.data_seed)
+    serve(create_server(dataset, args.host, args.port, Faults.from_args(args), args.verbose), "Fake Magento")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+"""
+Fake Medusa v2 admin API cho load test (chỉ stdlib, dữ liệu trong RAM).
+
+    python loadtest/fake_medusa.py --latency-ms 30 --error-rate 0.01 --throttle-rate 0.02
+
+Phục vụ các endpoint MedusaConnector gọi: products (+ batch, variant inventory links), product-categories,
+collections, customers (+ addresses), regions, sales-channels, shipping-profiles, shipping-options,
+stock-locations, inventory-items (+ location-levels batch), draft-orders (+ convert-to-order, delete),
+orders (+ fulfillments) và /auth/user/emailpass.
+Ràng buộc unique giống Medusa (handle product / category, email customer, SKU inventory item,
+location level trùng) trả 400 "already exists"; Idempotency-Key được tôn trọng (xem FakeApp).
+"""
+import argparse
+import itertools
+import threading
+import time
+from fake_common import FakeApp, FakeServer, Faults, HttpError, add_server_args, serve
+
+def _now():
+    return time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime())
+
+def _page(query, items, key):
+    params = dict(query)
+    offset = int(params.get("offset") or 0)
+    limit = int(params.get("limit") or 50)
+    fields = params.get("fields")
+    page = items[offset:offset + limit]
+    if fields:
+        page = [_project(item, fields) for item in page]
+    return {key: page, "count": len(items), "offset": offset, "limit": limit}
+
+def _project(item, fields):
+    """Medusa `fields`: "id,handle,variants.id,*location_levels" -> giữ field / relation được chọn."""
+    top, nested = {"id"}, {}
+    for field in fields.split(","):
+        field = field.strip().lstrip("+-")
+        if field.startswith("*"):
+            top.add(field[1:])
+        elif "." in field:
+            relation, sub = field.split(".", 1)
+            nested.setdefault(relation, set()).add(sub)
+        elif field:
+            top.add(field)
+    out = {k: v for k, v in item.items() if k in top}
+    for relation, subs in nested.items():
+        value = item.get(relation)
+        if isinstance(value, list):
+            out[relation] = [{k: v for k, v in row.items() if k in subs} for row in value]
+    return out
+
+class MedusaStore:
+    """Trạng thái Medusa trong RAM; mọi thao tác ghi giữ một lock chung (giống ràng buộc unique của DB)."""
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._ids = itertools.count(1)
+        self.products = []
+        self.product_by_id = {}
+        self.handles = set()
+        self.variant_skus = set()
+        self.categories = []
+        self.category_handles = set()
+        self.customers = []
+        self.customer_by_id = {}
+        self.emails = set()
+        self.collections = []
+        self.inventory_items = []
+        self.inventory_by_id = {}
+        self.inventory_skus = set()
+        self.draft_orders = {}
+        self.orders = {}
+        now = _now()
+        self.regions = [{"id": self.new_id("reg"), "name": "Europe", "currency_code": "eur", "created_at": now}]
+        self.sales_channels = [{"id": self.new_id("sc"), "name": "Default Sales Channel", "is_disabled": False}]
+        self.shipping_profiles = [{"id": self.new_id("sp"), "name": "Default Shipping Profile", "type": "default"}]
+        self.stock_locations = [{"id": self.new_id("sloc"), "name": "European Warehouse"}]
+        self.shipping_options = [{"id": self.new_id("so"), "name": "Standard Shipping", "price_type": "flat",
+                                  "shipping_profile_id": self.shipping_profiles[0]["id"]}]
+
+    def new_id(self, prefix):
+        return f"{prefix}_01{next(self._ids):024X}"
+
+    def create_product(self, payload):
+        """Tạo product từ payload; raise HttpError nếu handle / SKU đã tồn tại. Gọi khi đang giữ lock."""
+        if not (payload or {}).get("title"):
+            raise HttpError(400, "Product title is required")
+        handle = payload.get("handle") or payload["title"].lower().replace(" ", "-")
+        if handle in self.handles:
+            raise HttpError(400, f"Product with handle: {handle}, already exists.", "duplicate_error")
+        skus = [v.get("sku") for v in payload.get("variants") or [] if v.get("sku")]
+        for sku in skus:
+            if sku in self.variant_skus:
+                raise HttpError(400, f"Product variant with sku: {sku}, already exists.", "duplicate_error")
+        product_id = self.new_id("prod")
+        now = _now()
+        product = dict(payload, id=product_id, handle=handle, created_at=now, updated_at=now)
+        product["variants"] = [
+            dict(v, id=self.new_id("variant"), product_id=product_id, inventory_items=[], created_at=now)
+            for v in payload.get("variants") or []
+        ]
+        product["options"] = [dict(o, id=self.new_id("opt")) for o in payload.get("options") or []]
+        self.handles.add(handle)
+        self.variant_skus.update(skus)
+        self.products.append(product)
+        self.product_by_id[product_id] = product
+        return product
+
+def create_app(store=None):
+    store = store or MedusaStore()
+    app = FakeApp()
+    app.store = store
+
+    def _get(collection, item_id, name):
+        item = collection.get(item_id)
+        if item is None:
+            raise HttpError(404, f"{name} with id: {item_id} was not found", "not_found")
+        return item
+
+    @app.route("POST", r"/auth/user/emailpass")
+    def _auth(match, query, body):
+        if not (body or {}).get("email") or not (body or {}).get("password"):
+            raise HttpError(401, "Invalid email or password", "unauthorized")
+        return {"token": "fake-medusa-admin-token"}
+
+    # --- Products ---
+
+    @app.route("POST", r"/admin/products")
+    def _create_product(match, query, body):
+        with store.lock:
+            return {"product": store.create_product(body)}
+
+    @app.route("POST", r"/admin/products/batch")
+    def _batch_products(match, query, body):
+        body = body or {}
+        with store.lock:
+            # Workflow Medusa: một record lỗi thì cả batch bị rollback
+            handles = [(p or {}).get("handle") for p in body.get("create") or []]
+            if len(set(h for h in handles if h)) < len([h for h in handles if h]):
+                raise HttpError(400, "Duplicate handle in batch", "duplicate_error")
+            for payload in body.get("create") or []:
+                if payload.get("handle") in store.handles:
+                    raise HttpError(400, f"Product with handle: {payload.get('handle')}, already exists.", "duplicate_error")
+            created = [store.create_product(payload) for payload in body.get("create") or []]
+            updated = []
+            for payload in body.get("update") or []:
+                product = _get(store.product_by_id, payload.get("id"), "Product")
+                product.update({k: v for k, v in payload.items() if k != "variants"})
+                updated.append(product)
+            deleted = [pid for pid in body.get("delete") or [] if store.product_by_id.pop(pid, None)]
+            if deleted:
+                store.products = [p for p in store.products if p["id"] not in set(deleted)]
+        return {"created": created, "updated": updated, "deleted": {"ids": deleted, "object": "product", "deleted": True}}
+
+    @app.route("GET", r"/admin/products")
+    def _list_products(match, query, body):
+        with store.lock:
+            return _page(query, store.products, "products")
+
+    @app.route("POST", r"/admin/products/([^/]+)/variants/inventory-items/batch")
+    def _link_variants(match, query, body):
+        with store.lock:
+            product = _get(store.product_by_id, match.group(1), "Product")
+            variants = {v["id"]: v for v in product["variants"]}
+            created = []
+            for link in (body or {}).get("create") or []:
+                variant = _get(variants, link.get("variant_id"), "Variant")
+                _get(store.inventory_by_id, link.get("inventory_item_id"), "Inventory item")
+                if any(l["inventory_item_id"] == link["inventory_item_id"] for l in variant["inventory_items"]):
+                    raise HttpError(400, "Variant is already linked to inventory item", "duplicate_error")
+                row = {"variant_id": variant["id"], "inventory_item_id": link["inventory_item_id"],
+                       "required_quantity": link.get("required_quantity", 1)}
+                variant["inventory_items"].append(row)
+                created.append(row)
+        return {"created": created, "updated": [], "deleted": []}
+
+    # --- Categories / collections ---
+
+    @app.route("POST", r"/admin/product-categories")
+    def _create_category(match, query, body):
+        body = body or {}
+        if not body.get("name"):
+            raise HttpError(400, "Category name is required")
+        handle = body.get("handle") or body["name"].lower().replace(" ", "-")
+        with store.lock:
+            if handle in store.category_handles:
+                raise HttpError(400, f"Product category with handle: {handle}, already exists.", "duplicate_error")
+            category = dict(body, id=store.new_id("pcat"), handle=handle, created_at=_now())
+            store.category_handles.add(handle)
+            store.categories.append(category)
+        return {"product_category": category}
+
+    @app.route("GET", r"/admin/product-categories")
+    def _list_categories(match, query, body):
+        with store.lock:
+            return _page(query, store.categories, "product_categories")
+
+    @app.route("POST", r"/admin/collections")
+    def _create_collection(match, query, body):
+        with store.lock:
+            collection = dict(body or {}, id=store.new_id("pcol"))
+            store.collections.append(collection)
+        return {"collection": collection}
+
+    # --- Customers ---
+
+    @app.route("POST", r"/admin/customers")
+    def _create_customer(match, query, body):
+        email = ((body or {}).get("email") or "").strip().lower()
+        if not email:
+            raise HttpError(400, "Email is required")
+        with store.lock:
+            if email in store.emails:
+                raise HttpError(400, f"Customer with email: {email}, already exists.", "duplicate_error")
+            customer = dict(body, id=store.new_id("cus"), email=email, addresses=[], created_at=_now())
+            store.emails.add(email)
+            store.customers.append(customer)
+            store.customer_by_id[customer["id"]] = customer
+        return {"customer": customer}
+
+    @app.route("GET", r"/admin/customers")
+    def _list_customers(match, query, body):
+        with store.lock:
+            return _page(query, store.customers, "customers")
+
+    @app.route("POST", r"/admin/customers/([^/]+)/addresses")
+    def _create_address(match, query, body):
+        with store.lock:
+            customer = _get(store.customer_by_id, match.group(1), "Customer")
+            customer["addresses"].append(dict(body or {}, id=store.new_id("cuaddr"), customer_id=customer["id"]))
+        return {"customer": customer}
+
+    # --- Store setup ---
+
+    for path, key in (("regions", "regions"), ("sales-channels", "sales_channels"), ("shipping-profiles", "shipping_profiles"),
+                      ("shipping-options", "shipping_options"), ("stock-locations", "stock_locations")):
+        app.route("GET", rf"/admin/{path}")(lambda match, query, body, key=key: _page(query, getattr(store, key), key))
+
+    # --- Inventory ---
+
+    @app.route("POST", r"/admin/inventory-items")
+    def _create_inventory_item(match, query, body):
+        sku = (body or {}).get("sku")
+        with store.lock:
+            if sku and sku in store.inventory_skus:
+                raise HttpError(400, f"Inventory item with sku: {sku}, already exists.", "duplicate_error")
+            item = dict(body or {}, id=store.new_id("iitem"), location_levels=[], created_at=_now())
+            if sku:
+                store.inventory_skus.add(sku)
+            store.inventory_items.append(item)
+            store.inventory_by_id[item["id"]] = item
+        return {"inventory_item": item}
+
+    @app.route("GET", r"/admin/inventory-items")
+    def _list_inventory_items(match, query, body):
+        sku = dict(query).get("sku")
+        with store.lock:
+            items = [i for i in store.inventory_items if i.get("sku") == sku] if sku else store.inventory_items
+            return _page(query, items, "inventory_items")
+
+    def _write_levels(rows_create, rows_update, item_id=None):
+        created, updated = [], []
+        for row in rows_create or []:
+            item = _get(store.inventory_by_id, item_id or row.get("inventory_item_id"), "Inventory item")
+            if any(l["location_id"] == row.get("location_id") for l in item["location_levels"]):
+                raise HttpError(400, f"Inventory level for item {item['id']} and location {row.get('location_id')} already exists", "duplicate_error")
+            level = {"id": store.new_id("ilev"), "inventory_item_id": item["id"], "location_id": row.get("location_id"),
+                     "stocked_quantity": row.get("stocked_quantity", 0), "reserved_quantity": 0}
+            item["location_levels"].append(level)
+            created.append(level)
+        for row in rows_update or []:
+            item = _get(store.inventory_by_id, item_id or row.get("inventory_item_id"), "Inventory item")
+            for level in item["location_levels"]:
+                if level["location_id"] == row.get("location_id"):
+                    level["stocked_quantity"] = row.get("stocked_quantity", level["stocked_quantity"])
+                    updated.append(level)
+        return {"created": created, "updated": updated, "deleted": []}
+
+    @app.route("POST", r"/admin/inventory-items/location-levels/batch")
+    def _batch_levels(match, query, body):
+        with store.lock:
+            return _write_levels((body or {}).get("create"), (body or {}).get("update"))
+
+    @app.route("POST", r"/admin/inventory-items/([^/]+)/location-levels/batch")
+    def _item_levels(match, query, body):
+        with store.lock:
+            return _write_levels((body or {}).get("create"), (body or {}).get("update"), match.group(1))
+
+    # --- Orders ---
+
+    def _order_document(body, status):
+        items = [dict(item, id=store.new_id("ordli")) for item in (body or {}).get("items") or []]
+        return dict(body or {}, id=store.new_id("order"), items=items, status=status, created_at=_now(), fulfillments=[])
+
+    @app.route("POST", r"/admin/draft-orders")
+    def _create_draft_order(match, query, body):
+        if not (body or {}).get("region_id"):
+            raise HttpError(400, "region_id is required")
+        with store.lock:
+            draft = _order_document(body, "draft")
+            store.draft_orders[draft["id"]] = draft
+        return {"draft_order": draft}
+
+    @app.route("POST", r"/admin/draft-orders/([^/]+)/convert-to-order")
+    def _convert_draft(match, query, body):
+        with store.lock:
+            draft = _get(store.draft_orders, match.group(1), "Draft order")
+            draft["status"] = "pending"
+            store.orders[draft["id"]] = draft
+        return {"order": draft}
+
+    @app.route("DELETE", r"/admin/draft-orders/([^/]+)")
+    def _delete_draft(match, query, body):
+        with store.lock:
+            _get(store.draft_orders, match.group(1), "Draft order")
+            del store.draft_orders[match.group(1)]
+        return {"id": match.group(1), "object": "draft-order", "deleted": True}
+
+    @app.route("POST", r"/admin/orders")
+    def _create_order(match, query, body):
+        with store.lock:
+            order = _order_document(body, "pending")
+            store.orders[order["id"]] = order
+        return {"order": order}
+
+    @app.route("POST", r"/admin/orders/([^/]+)/fulfillments")
+    def _create_fulfillment(match, query, body):
+        with store.lock:
+            order = _get(store.orders, match.group(1), "Order")
+            order["fulfillments"].append({"id": store.new_id("ful"), "items": (body or {}).get("items") or []})
+        return {"order": order}
+
+    return app
+
+def create_server(host="127.0.0.1", port=0, faults=None, verbose=False, store=None):
+    return FakeServer((host, port), create_app(store), faults, verbose)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fake Medusa v2 admin API for load testing")
+    add_server_args(parser, default_port=9001)
+    args = parser.parse_args(argv)
+    serve(create_server(args.host, args.port, Faults.from_args(args), args.verbose), "Fake Medusa")
+
+if __name__ == "__main__":
+    main()
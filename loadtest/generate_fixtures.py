@@ -0,0 +1,134 @@
+"""
+Sinh dataset Magento tổng hợp ra JSONL (streaming, bộ nhớ không tăng theo quy mô).
+
+    python loadtest/generate_fixtures.py --scale large --out fixtures/large --gzip --jobs 4
+    python loadtest/generate_fixtures.py --products 20000 --orders 5000 --out fixtures/custom
+
+Mỗi entity một file (categories / products / customers / orders / invoices .jsonl[.gz]), mỗi dòng một
+document đúng định dạng Magento REST trả về; payment nằm trong order như API thật.
+manifest.json ghi lại tham số của Dataset: cùng manifest luôn cho cùng dữ liệu,
+và `fake_magento.py --fixtures DIR` phục vụ đúng dataset đó mà không cần đọc file.
+"""
+import argparse
+import gzip
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataset import Dataset
+
+SCALES = {
+    "small": {"products": 1000, "categories": 50, "customers": 500, "orders": 1000},
+    "medium": {"products": 100_000, "categories": 1000, "customers": 50_000, "orders": 200_000},
+    "large": {"products": 1_000_000, "categories": 5000, "customers": 500_000, "orders": 2_000_000},
+}
+ENTITIES = ("categories", "products", "customers", "orders", "invoices")
+MANIFEST = "manifest.json"
+
+def _open(path, mode, compress=None):
+    if path.endswith(".gz") if compress is None else compress:
+        return gzip.open(path, mode + "t", encoding="utf-8", compresslevel=5)
+    return open(path, mode, encoding="utf-8")
+
+def fixture_path(directory, entity, compress=False):
+    return os.path.join(directory, f"{entity}.jsonl" + (".gz" if compress else ""))
+
+def iter_documents(dataset, entity):
+    """Document của một entity theo thứ tự id (invoice: bỏ qua order chưa xuất hoá đơn)."""
+    if entity == "categories":
+        return (dataset.category(i) for i in dataset.category_ids())
+    if entity == "products":
+        return (dataset.product(i) for i in range(1, dataset.products + 1))
+    if entity == "customers":
+        return (dataset.customer(i) for i in range(1, dataset.customers + 1))
+    if entity == "orders":
+        return (dataset.order(i) for i in range(1, dataset.orders + 1))
+    if entity == "invoices":
+        return (dataset.invoice(i) for i in range(1, dataset.orders + 1) if dataset.has_invoice(i))
+    raise ValueError(f"Unknown entity: {entity}")
+
+def write_entity(params, entity, directory, compress=False, progress_every=100_000):
+    """Ghi một entity ra JSONL; chạy được trong process riêng (params là kwargs của Dataset)."""
+    dataset = Dataset(**params)
+    path = fixture_path(directory, entity, compress)
+    tmp = path + ".tmp"
+    started = time.monotonic()
+    count = 0
+    with _open(tmp, "w", compress) as fh:
+        for doc in iter_documents(dataset, entity):
+            fh.write(json.dumps(doc, ensure_ascii=False, separators=(",", ":")))
+            fh.write("\n")
+            count += 1
+            if progress_every and count % progress_every == 0:
+                print(f"  {entity}: {count} written ({count / (time.monotonic() - started):.0f}/s)", flush=True)
+    os.replace(tmp, path)
+    return entity, path, count, time.monotonic() - started
+
+def read_fixtures(directory, entity):
+    """Đọc lần lượt document của một entity từ thư mục fixtures (.jsonl hoặc .jsonl.gz)."""
+    for compress in (False, True):
+        path = fixture_path(directory, entity, compress)
+        if os.path.exists(path):
+            with _open(path, "r") as fh:
+                for line in fh:
+                    if line.strip():
+                        yield json.loads(line)
+            return
+    raise FileNotFoundError(f"No {entity} fixtures in {directory}")
+
+def load_manifest(directory):
+    with open(os.path.join(directory, MANIFEST), encoding="utf-8") as fh:
+        return json.load(fh)
+
+def dataset_from_manifest(directory):
+    return Dataset(**load_manifest(directory)["dataset"])
+
+def generate(directory, params, entities=ENTITIES, compress=False, jobs=1):
+    os.makedirs(directory, exist_ok=True)
+    results = {}
+    if jobs > 1 and len(entities) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(write_entity, params, entity, directory, compress) for entity in entities]
+            for future in futures:
+                entity, path, count, elapsed = future.result()
+                results[entity] = {"path": os.path.basename(path), "count": count, "seconds": round(elapsed, 2)}
+    else:
+        for entity in entities:
+            entity, path, count, elapsed = write_entity(params, entity, directory, compress)
+            results[entity] = {"path": os.path.basename(path), "count": count, "seconds": round(elapsed, 2)}
+    manifest = {"dataset": params, "files": results, "generated_at": time.strftime("%Y-%m-%d %H:%M:%S")}
+    with open(os.path.join(directory, MANIFEST), "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=2)
+    return manifest
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic Magento dataset as streamed JSONL")
+    parser.add_argument("--out", required=True, help="Output directory")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small", help="Preset sizes (overridden by explicit counts)")
+    parser.add_argument("--products", type=int, default=None)
+    parser.add_argument("--categories", type=int, default=None)
+    parser.add_argument("--category-depth", type=int, default=5)
+    parser.add_argument("--customers", type=int, default=None)
+    parser.add_argument("--orders", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--entities", default=",".join(ENTITIES), help=f"Comma separated subset of {','.join(ENTITIES)}")
+    parser.add_argument("--gzip", action="store_true", help="Write .jsonl.gz")
+    parser.add_argument("--jobs", type=int, default=1, help="Generate entities in parallel processes")
+    args = parser.parse_args(argv)
+
+    params = dict(SCALES[args.scale], category_depth=args.category_depth, seed=args.seed)
+    for key in ("products", "categories", "customers", "orders"):
+        if getattr(args, key) is not None:
+            params[key] = getattr(args, key)
+    entities = [e.strip() for e in args.entities.split(",") if e.strip()]
+    unknown = set(entities) - set(ENTITIES)
+    if unknown:
+        parser.error(f"Unknown entities: {', '.join(sorted(unknown))}")
+
+    print(f"Generating {params} into {args.out}")
+    manifest = generate(args.out, params, entities, args.gzip, args.jobs)
+    for entity, info in manifest["files"].items():
+        print(f"  {entity}: {info['count']} documents -> {info['path']} ({info['seconds']}s)")
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ import warnings
 import sys
 import logging
 import os
+import signal
 import requests
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -24,6 +25,13 @@ from migrators.category_migrator import migrate_categories
 from migrators.customer_migrator import migrate_customers
 from migrators.order_migrator import migrate_orders
 from migrators.product_migrator import migrate_products
+from migrators.utils import log_connection_report, check_stop_signal, request_stop, start_file_signal_adapter
+from connectors.control import migration_control, MigrationStopped, listen_stdin
+from connectors.cassette import Cassette, use_cassette
+from migrators.id_map import DEFAULT_ID_MAP_PATH, close_id_maps
+from migrators.checkpoint import CHECKPOINT_DIR, new_run_id, close_checkpoints
+from migrators.payload_export import close_payload_writers
+from migrators.phases import run_parallel_phases
 
 def _configure_stdio():
     try:
@@ -68,7 +76,19 @@ def _parse_args():
     parser.add_argument(
         "--dry-run-file",
         action="store_true",
-        help="Save dry-run results to JSON file",
+        help="Stream dry-run payloads to exports/payloads_<run-id>.jsonl "
+             "(legacy JSON array: python -m migrators.payload_export <run-id>)",
+    )
+    parser.add_argument(
+        "--dry-run-gzip",
+        action="store_true",
+        help="Gzip the dry-run export (.jsonl.gz)",
+    )
+    parser.add_argument(
+        "--dry-run-max-mb",
+        type=int,
+        default=0,
+        help="Rotate the dry-run export to a new file after this many MB (0 = single file)",
     )
     parser.add_argument(
         "--finalize-orders",
@@ -102,6 +122,12 @@ def _parse_args():
     )
  
     parser.add_argument("--run-id", default=None, help="Mã ID cho lần chạy (dùng cho tên file export)")
+    parser.add_argument(
+        "--resume",
+        default=None,
+        metavar="RUN_ID",
+        help=f"Tiếp tục run đã bị dừng / crash: bỏ qua record đã ghi trong {CHECKPOINT_DIR}/<RUN_ID>.jsonl",
+    )
     parser.add_argument("--product-ids", default=None, help="Comma separated list of product IDs to sync")
     parser.add_argument("--category-ids", default=None, help="Comma separated list of category IDs to sync")
     parser.add_argument("--order-ids", default=None, help="Comma separated list of order IDs to sync")
@@ -112,6 +138,77 @@ def _parse_args():
         default=10,
         help="Max workers for concurrent processing (default: 10)",
     )
+    parser.add_argument(
+        "--product-batch-size",
+        type=int,
+        default=0,
+        help="Create products in batches of N via Medusa admin/products/batch (0 = one request per product)",
+    )
+    parser.add_argument(
+        "--inventory-batch-size",
+        type=int,
+        default=200,
+        help="SKUs per inventory flush (location-levels/batch) in the product phase (default: 200)",
+    )
+    parser.add_argument(
+        "--inventory-workers",
+        type=int,
+        default=2,
+        help="Concurrent inventory batches, independent of --max-workers (default: 2)",
+    )
+    parser.add_argument(
+        "--extract-fanout",
+        type=int,
+        default=4,
+        help="Number of Magento pages fetched concurrently during extraction (default: 4)",
+    )
+    parser.add_argument(
+        "--pagination",
+        default="offset",
+        choices=["offset", "cursor"],
+        help="Magento pagination: 'offset' (currentPage, parallel pages) or 'cursor' (entity_id keyset, flat cost on deep catalogs)",
+    )
+    parser.add_argument(
+        "--engine",
+        default="threads",
+        choices=["threads", "async"],
+        help="Execution engine: 'threads' (ThreadPoolExecutor) or 'async' (asyncio + aiohttp)",
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=500,
+        help="Max concurrent in-flight records per phase for --engine async (default: 500)",
+    )
+    parser.add_argument(
+        "--magento-pool-size",
+        type=int,
+        default=None,
+        help="Keep-alive connection pool size for Magento (default: --max-workers)",
+    )
+    parser.add_argument(
+        "--medusa-pool-size",
+        type=int,
+        default=None,
+        help="Keep-alive connection pool size for Medusa (default: --max-workers)",
+    )
+    parser.add_argument(
+        "--magento-rate-limit",
+        type=float,
+        default=0,
+        help="Max requests/second to Magento, adapted down on 429/503 (0 = unlimited)",
+    )
+    parser.add_argument(
+        "--medusa-rate-limit",
+        type=float,
+        default=0,
+        help="Max requests/second to Medusa, adapted down on 429/503 (0 = unlimited)",
+    )
+    parser.add_argument(
+        "--id-map",
+        default=DEFAULT_ID_MAP_PATH,
+        help=f"SQLite file storing Magento -> Medusa ID mappings across phases and runs (default: {DEFAULT_ID_MAP_PATH}, '' = disabled)",
+    )
     parser.add_argument(
         "--category-strategy",
         default="list",
@@ -127,6 +224,42 @@ def _parse_args():
     parser.add_argument("--medusa-base-url", default=None)
     parser.add_argument("--medusa-email", default=None)
     parser.add_argument("--medusa-password", default=None)
+    parser.add_argument(
+        "--parallel-phases",
+        action="store_true",
+        help="Run entity phases concurrently: customers independently, products once category mappings exist, "
+             "orders as soon as their SKUs are mapped",
+    )
+    parser.add_argument(
+        "--control-stdin",
+        action="store_true",
+        help="Read 'pause' / 'resume' / 'stop' commands from stdin (used by the desktop GUI)",
+    )
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument(
+        "--record-cassette",
+        default=None,
+        metavar="PATH",
+        help="Record every Magento/Medusa request and response to a gzip JSONL cassette",
+    )
+    cassette.add_argument(
+        "--replay-cassette",
+        default=None,
+        metavar="PATH",
+        help="Serve Magento/Medusa responses from a recorded cassette instead of the network (no login)",
+    )
+    parser.add_argument(
+        "--replay-latency-ms",
+        type=float,
+        default=0,
+        help="Simulated latency per replayed request in ms (default: 0)",
+    )
+    parser.add_argument(
+        "--replay-jitter-ms",
+        type=float,
+        default=0,
+        help="Extra random latency per replayed request, uniform in [0, N] ms (default: 0)",
+    )
     parser.add_argument(
         "--skip-init-log",
         action="store_true",
@@ -134,11 +267,69 @@ def _parse_args():
     )
     return parser.parse_args()
 
+def _install_control(args):
+    """Ctrl+C lần đầu: dừng êm (ngừng giao việc, chờ request đang chạy); lần hai: thoát ngay."""
+    def _on_sigint(signum, frame):
+        if check_stop_signal():
+            raise KeyboardInterrupt
+        print("\n[STOP] Stop requested (Ctrl+C again to abort immediately)...")
+        request_stop()
+
+    signal.signal(signal.SIGINT, _on_sigint)
+    if args.control_stdin:
+        listen_stdin(migration_control, sys.stdin)
+    # Tương thích: script cũ vẫn có thể tạo .stop_signal / .pause_signal
+    start_file_signal_adapter()
+
+def _open_cassette(args):
+    """
+    --record-cassette / --replay-cassette: bật cassette cho mọi connector.
+    ID map mặc định được tắt để lần replay đi đúng chuỗi request đã ghi (không bị mapping cũ làm lệch);
+    truyền --id-map tường minh để giữ lại.
+    """
+    path = args.record_cassette or args.replay_cassette
+    if not path:
+        return None
+    mode = "record" if args.record_cassette else "replay"
+    cassette = Cassette(path, mode=mode, latency_ms=args.replay_latency_ms, jitter_ms=args.replay_jitter_ms)
+    use_cassette(cassette)
+    if args.id_map == DEFAULT_ID_MAP_PATH:
+        args.id_map = ""
+    print(f"[CASSETTE] {mode.capitalize()} {path}")
+    return cassette
+
 def main():
     _configure_stdio()
     args = _parse_args()
+    if args.resume:
+        args.run_id = args.resume
+    elif not args.run_id and not args.dry_run:
+        args.run_id = new_run_id()
     entities = {e.strip().lower() for e in (args.entities or "").split(",") if e.strip()}
+    _install_control(args)
+    cassette = _open_cassette(args)
+
+    # Store / journal / writer / cassette luôn được đóng, kể cả khi migration ném exception:
+    # mapping chưa commit, journal và payload chưa flush không bị mất, cassette ghi đủ cuối file gzip
+    try:
+        finished = _run(args, entities, cassette)
+    finally:
+        close_id_maps()
+        close_checkpoints()
+        close_payload_writers()
+        if cassette is not None:
+            cassette.close()
+            print(f"[CASSETTE] {cassette.stats()}")
+    if not finished:
+        return
 
+    if check_stop_signal():
+        print(f"\nMigration stopped. Resume with --resume {args.run_id}" if args.run_id else "\nMigration stopped.")
+        return
+    print("\nMigration completed!")
+
+def _run(args, entities, cassette):
+    """Login, tạo connector và chạy các phase. Trả về False nếu không kết nối được."""
     magento_cfg = dict(MAGENTO)
     medusa_cfg = dict(MEDUSA)
 
@@ -162,6 +353,15 @@ def main():
     magento_token = _env("MAGENTO_TOKEN")
     medusa_token = _env("MEDUSA_TOKEN")
     is_gui = magento_token is not None and medusa_token is not None
+    if cassette is not None and cassette.replaying:
+        # Replay không gửi gì ra mạng: bỏ qua login
+        magento_token = magento_token or "replay"
+        medusa_token = medusa_token or "replay"
+
+    if args.resume:
+        print(f"[RESUME] Resuming run {args.run_id} from {CHECKPOINT_DIR}/{args.run_id}.jsonl")
+    elif args.run_id and not args.dry_run and not is_gui:
+        print(f"[RUN] Run ID {args.run_id} (resume with --resume {args.run_id})")
 
     if not args.skip_init_log and not is_gui:
         print(f"Magento base_url={magento_cfg.get('BASE_URL')} verify_ssl={magento_cfg.get('VERIFY_SSL')} user={magento_cfg.get('ADMIN_USERNAME')}")
@@ -193,7 +393,13 @@ def main():
             if not args.skip_init_log:
                 print(f"[SESSION] Magento: Session authenticated.")
 
-        magento = MagentoConnector(base_url=magento_cfg["BASE_URL"], token=magento_token, verify_ssl=magento_cfg["VERIFY_SSL"])
+        magento = MagentoConnector(
+            base_url=magento_cfg["BASE_URL"],
+            token=magento_token,
+            verify_ssl=magento_cfg["VERIFY_SSL"],
+            pool_size=args.magento_pool_size or args.max_workers,
+            rate_limit=args.magento_rate_limit,
+        )
 
         if not medusa_token:
             if current_stage == 0:
@@ -205,10 +411,15 @@ def main():
             if not args.skip_init_log:
                 print(f"[SESSION] Medusa: Session authenticated.")
 
-        medusa = MedusaConnector(base_url=medusa_cfg["BASE_URL"], api_token=medusa_token)
+        medusa = MedusaConnector(
+            base_url=medusa_cfg["BASE_URL"],
+            api_token=medusa_token,
+            pool_size=args.medusa_pool_size or args.max_workers,
+            rate_limit=args.medusa_rate_limit,
+        )
         
     except Exception:
-        return
+        return False
 
     print_stage("CONFIGURATION & READINESS")
     if not args.skip_init_log:
@@ -216,21 +427,29 @@ def main():
 
     mg_to_medusa_map = {}
 
-    if "categories" in entities:
-        mg_to_medusa_map = migrate_categories(magento, medusa, args)
-
-    if "customers" in entities:
-        migrate_customers(magento, medusa, args)
-
-    if "products" in entities:
-        migrate_products(magento, medusa, args, mg_to_medusa_map=mg_to_medusa_map)
-
-    if "orders" in entities:
-        migrate_orders(magento, medusa, args, migration_state=None)
-
-
-
-    print("\nMigration completed!")
+    try:
+        if args.parallel_phases:
+            run_parallel_phases(magento, medusa, args, entities)
+        else:
+            if "categories" in entities and not check_stop_signal():
+                mg_to_medusa_map = migrate_categories(magento, medusa, args)
+
+            if "customers" in entities and not check_stop_signal():
+                migrate_customers(magento, medusa, args)
+
+            if "products" in entities and not check_stop_signal():
+                migrate_products(magento, medusa, args, mg_to_medusa_map=mg_to_medusa_map)
+
+            if "orders" in entities and not check_stop_signal():
+                migrate_orders(magento, medusa, args, migration_state=None)
+    except MigrationStopped:
+        print("\n[STOP] Migration stopped.")
+    finally:
+        log_connection_report("Magento", magento)
+        log_connection_report("Medusa", medusa)
+        magento.close()
+        medusa.close()
+    return True
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,84 @@
+import asyncio
+import time
+from connectors.async_connector import AsyncMagentoConnector, AsyncMedusaConnector
+from connectors.control import migration_control, MigrationStopped
+from migrators.utils import check_stop_signal, check_pause_signal, log_warning, log_connection_report
+from migrators.scheduler import notify_item
+
+_END = object()
+
+def use_async_engine(args) -> bool:
+    return getattr(args, "engine", "threads") == "async"
+
+def run_async_pool(items, worker, magento, medusa, args, on_result, on_error=None, label="tasks"):
+    """
+    Chạy coroutine `worker(item, async_magento, async_medusa)` cho từng item trên một event loop.
+    Số record đang xử lý đồng thời bị giới hạn bởi asyncio.Semaphore(args.max_in_flight),
+    pool kết nối aiohttp có cùng kích thước.
+    on_result(item, result) / on_error(item, exc) được gọi theo thứ tự hoàn thành.
+    Trả về False nếu bị dừng bởi stop signal.
+    """
+    return asyncio.run(_run_pool(items, worker, magento, medusa, args, on_result, on_error, label))
+
+async def _run_pool(items, worker, magento, medusa, args, on_result, on_error, label):
+    max_in_flight = max(1, int(getattr(args, "max_in_flight", 0) or 500))
+    a_magento = AsyncMagentoConnector.from_connector(magento, pool_size=max_in_flight)
+    a_medusa = AsyncMedusaConnector.from_connector(medusa, pool_size=max_in_flight)
+    sem = asyncio.Semaphore(max_in_flight)
+    pending = set()
+    stopped = False
+
+    def _done(task, item, started):
+        pending.discard(task)
+        sem.release()
+        if task.cancelled():
+            return
+        notify_item(label, item, time.perf_counter() - started)
+        exc = task.exception()
+        if isinstance(exc, MigrationStopped):
+            # Request bị huỷ bởi lệnh stop: record chưa xong nhưng không phải lỗi, lần resume chạy lại
+            return
+        if exc is not None:
+            if on_error:
+                on_error(item, exc)
+            return
+        on_result(item, task.result())
+
+    it = iter(items)
+    # Stream (generator extract) được đọc trên thread phụ để không chặn event loop khi chờ trang kế tiếp
+    blocking = not isinstance(items, (list, tuple))
+
+    try:
+        while True:
+            try:
+                item = await asyncio.to_thread(next, it, _END) if blocking else next(it, _END)
+            except MigrationStopped:
+                item = _END
+            if item is _END:
+                stopped = check_stop_signal()
+                if stopped:
+                    log_warning(f"🛑 Stop signal detected. Cancelling remaining {label}...", indent=1)
+                break
+            await sem.acquire()
+            # Chờ pause trên thread phụ để các request đang chạy trên event loop vẫn hoàn tất
+            paused_stop = await asyncio.to_thread(check_pause_signal) if migration_control.is_paused() else False
+            if paused_stop or check_stop_signal():
+                sem.release()
+                log_warning(f"🛑 Stop signal detected. Cancelling remaining {label}...", indent=1)
+                stopped = True
+                break
+            task = asyncio.ensure_future(worker(item, a_magento, a_medusa))
+            pending.add(task)
+            task.add_done_callback(lambda t, i=item, s=time.perf_counter(): _done(t, i, s))
+
+        if stopped:
+            for task in list(pending):
+                task.cancel()
+        if pending:
+            await asyncio.gather(*list(pending), return_exceptions=True)
+    finally:
+        log_connection_report(f"Medusa (async, {label})", a_medusa)
+        await a_magento.aclose()
+        await a_medusa.aclose()
+
+    return not stopped
@@ -1,8 +1,8 @@
 import json
 import requests
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from connectors.magento_connector import MagentoConnector
 from connectors.medusa_connector import MedusaConnector
+from connectors.control import MigrationStopped
 from extractors.categories import extract_categories
 from transformers.category_transformer import (
     transform_category_as_collection,
@@ -11,6 +11,7 @@ from transformers.category_transformer import (
 from migrators.utils import (
     _limit_iter,
     _fetch_all_product_categories,
+    _load_category_mappings,
     _is_duplicate_http,
     _resp_json_or_text,
     _is_http_status,
@@ -19,8 +20,16 @@ from migrators.utils import (
     get_timestamp, log_info, log_success, log_warning, log_error, log_section, log_summary,
     check_stop_signal, check_pause_signal
 )
+from migrators.async_engine import use_async_engine, run_async_pool
+from migrators.scheduler import BoundedScheduler
+from migrators.id_map import get_id_map
+from migrators.checkpoint import get_checkpoint, log_resume
 
-def _sync_single_category(cat, medusa: MedusaConnector, args, mg_to_medusa_map, handle_to_id_map):
+def _prepare_category(cat, args, mg_to_medusa_map, handle_to_id_map):
+    """
+    Bước chung của bản sync / async trước khi POST: chờ parent, transform, dry-run, skip nếu đã có.
+    Trả về (result, None) nếu không cần gọi Medusa, ngược lại (None, payload).
+    """
     mg_id = cat.get("id")
     name = cat.get("name") or str(mg_id)
     parent_mg_id = cat.get("parent_id")
@@ -30,7 +39,7 @@ def _sync_single_category(cat, medusa: MedusaConnector, args, mg_to_medusa_map,
         parent_medusa_id = mg_to_medusa_map.get(parent_mg_id) or mg_to_medusa_map.get(str(parent_mg_id))
         if not parent_medusa_id:
             print(f"   Parent category {parent_mg_id} for {name} not found. Deferring.")
-            return mg_id, None, 'defer', None
+            return (mg_id, None, 'defer', None), None
 
     print(f"Syncing category: {name}")
 
@@ -40,45 +49,84 @@ def _sync_single_category(cat, medusa: MedusaConnector, args, mg_to_medusa_map,
 
     log_dry_run(payload_pc, "category", args)
     if args.dry_run:
-        return mg_id, f"(dry-run) {handle}", 'success', handle
+        return (mg_id, f"(dry-run) {handle}", 'success', handle), None
     
-    existing_id = handle_to_id_map.get(handle)
+    existing_id = mg_to_medusa_map.get(str(mg_id)) or handle_to_id_map.get(handle)
     if existing_id:
         print(f"   [SKIP] Category '{name}' handle '{handle}' already exists.")
-        return mg_id, existing_id, 'ignore', handle
+        return (mg_id, existing_id, 'ignore', handle), None
 
-    try:
-        print(f"   [STEP 2] Creating on Medusa API...")
-        res = medusa.create_product_category(payload_pc, idempotency_key=f"category:{mg_id}")
-        created = res.get("product_category") or res.get("productCategory") or res
-        created_id = created.get("id")
-
-        if created_id:
-            print(f"   ✅ [SUCCESS] Created category: {name}")
-            return mg_id, created_id, 'success', handle
-        else:
-            reason = f"No ID returned from API. Response: {json.dumps(res)}"
-            print(f"   ❌ [FAIL] Category {name}: {reason}")
-            return mg_id, None, 'fail', handle
+    print(f"   [STEP 2] Creating on Medusa API...")
+    return None, payload_pc
+
+def _category_created(cat, payload_pc, res):
+    mg_id = cat.get("id")
+    name = cat.get("name") or str(mg_id)
+    handle = payload_pc.get("handle")
+    created = res.get("product_category") or res.get("productCategory") or res
+    created_id = created.get("id")
 
-    except requests.exceptions.HTTPError as e:
+    if created_id:
+        print(f"   ✅ [SUCCESS] Created category: {name}")
+        return mg_id, created_id, 'success', handle
+    else:
+        reason = f"No ID returned from API. Response: {json.dumps(res)}"
+        print(f"   ❌ [FAIL] Category {name}: {reason}")
+        return mg_id, None, 'fail', handle
+
+def _category_failed(cat, payload_pc, e):
+    mg_id = cat.get("id")
+    name = cat.get("name") or str(mg_id)
+    handle = payload_pc.get("handle")
+    if isinstance(e, requests.exceptions.HTTPError):
         status_tuple = handle_medusa_api_error(e, "Category", name)
         status = status_tuple[0] if isinstance(status_tuple, tuple) else status_tuple
         return mg_id, None, status, handle
+    reason = str(e)
+    print(f"   [FAIL] Category {name}: {reason}")
+    return mg_id, None, 'fail', handle
+
+def _sync_single_category(cat, medusa: MedusaConnector, args, mg_to_medusa_map, handle_to_id_map):
+    result, payload_pc = _prepare_category(cat, args, mg_to_medusa_map, handle_to_id_map)
+    if result:
+        return result
+    try:
+        res = medusa.create_product_category(payload_pc, idempotency_key=f"category:{cat.get('id')}")
+        return _category_created(cat, payload_pc, res)
+    except MigrationStopped:
+        raise
     except Exception as e:
-        reason = str(e)
-        print(f"   [FAIL] Category {name}: {reason}")
-        return mg_id, None, 'fail', handle
+        return _category_failed(cat, payload_pc, e)
+
+async def _sync_single_category_async(cat, medusa, args, mg_to_medusa_map, handle_to_id_map):
+    """Bản asyncio của _sync_single_category (dùng AsyncMedusaConnector)."""
+    result, payload_pc = _prepare_category(cat, args, mg_to_medusa_map, handle_to_id_map)
+    if result:
+        return result
+    try:
+        res = await medusa.create_product_category(payload_pc, idempotency_key=f"category:{cat.get('id')}")
+        return _category_created(cat, payload_pc, res)
+    except MigrationStopped:
+        raise
+    except Exception as e:
+        return _category_failed(cat, payload_pc, e)
 
-# Placeholder for build_category_tree, assuming it's defined elsewhere or imported.
-# For the purpose of this edit, we'll define a minimal one to make the code syntactically correct.
 def build_category_tree(categories):
-    # This is a simplified placeholder. A real implementation would build a proper tree.
-    # For this edit, we'll just return a flat list of nodes for demonstration.
-    nodes = []
+    """
+    Dựng cây từ danh sách category phẳng: node có parent trong danh sách thành con của parent đó,
+    còn lại là gốc. migrate_categories xử lý theo từng tầng nên parent luôn được tạo trước con
+    (kể cả khi nhiều worker chạy song song).
+    """
+    nodes = {str(cat.get("id")): {'data': cat, 'children': []} for cat in categories}
+    roots = []
     for cat in categories:
-        nodes.append({'data': cat, 'children': []})
-    return nodes
+        node = nodes[str(cat.get("id"))]
+        parent = nodes.get(str(cat.get("parent_id")))
+        if parent is not None and parent is not node:
+            parent['children'].append(node)
+        else:
+            roots.append(node)
+    return roots
 
 def migrate_categories(magento: MagentoConnector, medusa: MedusaConnector, args):
     print("\n" + "="*50)
@@ -126,21 +174,13 @@ def migrate_categories(magento: MagentoConnector, medusa: MedusaConnector, args)
     count_success = 0
     count_ignore = 0
     count_fail = 0
-    
-    mg_to_medusa = {}
- 
-    try:
-        existing = _fetch_all_product_categories(medusa)
-        handle_to_id = {c.get("handle"): c.get("id") for c in existing if c.get("handle") and c.get("id")}
-        for c in existing:
-            meta = c.get("metadata") or {}
-            mg_id = meta.get("magento_id")
-            if mg_id:
-                mg_to_medusa[str(mg_id)] = c.get("id")
-                mg_to_medusa[int(mg_id)] = c.get("id")
-    except Exception as e:
-        print(f"⚠️ Could not fetch existing categories from Medusa: {e}. Parent mapping might fail.")
-        handle_to_id = {}
+
+    checkpoint = get_checkpoint(args)
+    id_map = get_id_map(args, medusa)
+    mg_to_medusa, handle_to_id, source = _load_category_mappings(medusa, id_map)
+    if source == "store":
+        # Store đầy đủ từ lần chạy trước: không cần liệt kê lại toàn bộ category trên Medusa
+        print(f"[{get_timestamp()}] Loaded {id_map.count('category')} category mappings from {id_map.path}")
 
     # STOP CHECK
     if check_stop_signal(): return {}
@@ -161,45 +201,69 @@ def migrate_categories(magento: MagentoConnector, medusa: MedusaConnector, args)
             
         next_level = []
         
-        with ThreadPoolExecutor(max_workers=args.max_workers or 10) as executor:
-            futures = {
-                executor.submit(_sync_single_category, node['data'], medusa, args, mg_to_medusa, handle_to_id): node
-                for node in current_level
-            }
-
-            for future in as_completed(futures):
-                # STOP CHECK inside parallel loop
-                if check_pause_signal(): pass 
-
-                node = futures[future]
-                cat_data = node['data']
-                try:
-                    mg_id, new_medusa_id, status, handle = future.result()
-                    if status == 'success':
-                        count_success += 1
-                        if new_medusa_id:
-                            mg_to_medusa[mg_id] = new_medusa_id
-                            if handle: handle_to_id[handle] = new_medusa_id
-                        # Add children to next level ONLY if parent succeeded
-                        next_level.extend(node['children'])
-                    elif status == 'ignore':
-                        count_ignore += 1
-                        if new_medusa_id:
-                            mg_to_medusa[mg_id] = new_medusa_id
-                        # Add children to next level
-                        next_level.extend(node['children'])
-                    elif status == 'defer':
-                        # This shouldn't happen with BFS level processing if parents are root
-                        # but keep for safety
-                        deferred_categories.append(cat_data)
-                    else: 
-                        count_fail += 1
-                        # We might still want to try children, or not. 
-                        # Usually if parent fails, children will defer anyway.
-                        next_level.extend(node['children'])
-                except Exception as e:
-                    print(f"\n❌ [CRITICAL] Worker for category '{cat_data.get('name')}' failed: {e}")
-                    count_fail += 1
+        def _record(node, result):
+            nonlocal count_success, count_ignore, count_fail
+            mg_id, new_medusa_id, status, handle = result
+            if checkpoint is not None and status in ('success', 'ignore'):
+                checkpoint.complete("category", mg_id)
+            if status == 'success':
+                count_success += 1
+                if new_medusa_id:
+                    mg_to_medusa[mg_id] = new_medusa_id
+                    if handle: handle_to_id[handle] = new_medusa_id
+                    if id_map:
+                        id_map.put("category", mg_id, new_medusa_id)
+                        if handle: id_map.put("category_handle", handle, new_medusa_id)
+                # Add children to next level ONLY if parent succeeded
+                next_level.extend(node['children'])
+            elif status == 'ignore':
+                count_ignore += 1
+                if new_medusa_id:
+                    mg_to_medusa[mg_id] = new_medusa_id
+                    if id_map: id_map.put("category", mg_id, new_medusa_id)
+                # Add children to next level
+                next_level.extend(node['children'])
+            elif status == 'defer':
+                # This shouldn't happen with BFS level processing if parents are root
+                # but keep for safety
+                deferred_categories.append(node['data'])
+            else: 
+                count_fail += 1
+                # We might still want to try children, or not. 
+                # Usually if parent fails, children will defer anyway.
+                next_level.extend(node['children'])
+
+        def _record_error(node, e):
+            nonlocal count_fail
+            print(f"\n❌ [CRITICAL] Worker for category '{node['data'].get('name')}' failed: {e}")
+            count_fail += 1
+
+        if checkpoint is not None:
+            # Category đã xong trong run trước và đã có mapping: ghi nhận luôn, không cần worker
+            pending_nodes = []
+            for node in current_level:
+                mg_id = node['data'].get("id")
+                known_id = mg_to_medusa.get(str(mg_id))
+                if known_id and checkpoint.is_done("category", mg_id):
+                    checkpoint.skip("category")
+                    _record(node, (mg_id, known_id, 'ignore', None))
+                else:
+                    pending_nodes.append(node)
+            current_level = pending_nodes
+
+        if use_async_engine(args):
+            run_async_pool(
+                current_level,
+                lambda node, a_magento, a_medusa: _sync_single_category_async(node['data'], a_medusa, args, mg_to_medusa, handle_to_id),
+                magento, medusa, args,
+                on_result=_record, on_error=_record_error, label="category tasks",
+            )
+        else:
+            BoundedScheduler(args.max_workers, label="category tasks").run(
+                current_level,
+                lambda node: _sync_single_category(node['data'], medusa, args, mg_to_medusa, handle_to_id),
+                on_result=_record, on_error=_record_error,
+            )
         
         current_level = next_level
 
@@ -208,6 +272,7 @@ def migrate_categories(magento: MagentoConnector, medusa: MedusaConnector, args)
         for cat in deferred_categories:
             print(f"  - {cat.get('name')} (ID: {cat.get('id')})")
     
+    log_resume(checkpoint, "category", "categories")
     print(f"\n--- Category Migration Summary ---")
     log_summary("Category", count_success, count_ignore, count_fail)
     
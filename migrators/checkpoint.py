@@ -0,0 +1,207 @@
+import json
+import os
+import threading
+from collections import deque
+from datetime import datetime
+
+CHECKPOINT_DIR = "exports/checkpoints"
+
+def new_run_id():
+    return datetime.now().strftime("%Y%m%d_%H%M%S")
+
+class _Watermark:
+    """
+    Cursor an toàn của một entity: entity_id lớn nhất mà mọi record đứng trước nó (theo thứ tự
+    extract) đều đã hoàn tất. Record hoàn tất không theo thứ tự nên cần hàng đợi theo thứ tự extract;
+    gặp record lỗi thì watermark dừng lại (lần resume sẽ extract lại từ đó).
+    """
+    def __init__(self):
+        self.value = None
+        self.blocked = False
+        self._order = deque()
+        self._state = {}
+
+    def register(self, record_id):
+        if self.blocked:
+            return
+        self._order.append(record_id)
+        self._state.setdefault(record_id, None)
+
+    def settle(self, record_id, ok):
+        if self.blocked or record_id not in self._state:
+            return False
+        self._state[record_id] = ok
+        advanced = False
+        while self._order:
+            head = self._order[0]
+            state = self._state.get(head)
+            if state is None:
+                break
+            if state is False:
+                self.blocked = True
+                self._order.clear()
+                self._state.clear()
+                break
+            self._order.popleft()
+            self._state.pop(head, None)
+            self.value = head
+            advanced = True
+        return advanced
+
+class CheckpointJournal:
+    """
+    Journal checkpoint theo run (append-only JSONL trong exports/checkpoints/<run_id>.jsonl):
+    - {"entity": ..., "id": ...}      record Magento đã migrate xong (success hoặc đã tồn tại)
+    - {"entity": ..., "cursor": ...}  watermark entity_id cho keyset pagination (--pagination cursor)
+    --resume <run_id> đọc lại journal: record đã xong bị bỏ qua trước transform / POST,
+    và extract theo cursor bắt đầu sau watermark. Record lỗi không được ghi nên sẽ được chạy lại.
+    """
+    CURSOR_EVERY = 100
+
+    def __init__(self, run_id, directory=CHECKPOINT_DIR, resume=False):
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        self.run_id = run_id
+        self.path = os.path.join(directory, f"{run_id}.jsonl")
+        self._lock = threading.Lock()
+        self._done = {}
+        self._cursors = {}
+        self._watermarks = {}
+        self._since_cursor = {}
+        self.skipped = {}
+        self.loaded = False
+        if resume and os.path.exists(self.path):
+            self._load()
+            self.loaded = True
+        self._fh = open(self.path, "a", encoding="utf-8")
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # dòng cuối có thể bị cắt dở khi crash
+                entity = entry.get("entity")
+                if "id" in entry:
+                    self._done.setdefault(entity, set()).add(str(entry["id"]))
+                elif "cursor" in entry:
+                    self._cursors[entity] = entry["cursor"]
+
+    def _write(self, entry):
+        self._fh.write(json.dumps(entry) + "\n")
+        self._fh.flush()
+
+    def done_count(self, entity):
+        with self._lock:
+            return len(self._done.get(entity, ()))
+
+    def is_done(self, entity, record_id):
+        with self._lock:
+            return str(record_id) in self._done.get(entity, ())
+
+    def cursor(self, entity):
+        """Watermark đã lưu cho entity (None nếu chưa có)."""
+        return self._cursors.get(entity)
+
+    def resume_stream(self, entity, items, key, track_cursor=False):
+        """
+        Bỏ qua record đã xong (không transform / POST) trước khi chúng tới worker.
+        track_cursor=True (stream keyset, entity_id tăng dần) thì theo dõi watermark để lưu cursor.
+        """
+        watermark = self._watermarks.setdefault(entity, _Watermark()) if track_cursor else None
+        for item in items:
+            record_id = key(item)
+            with self._lock:
+                if watermark is not None:
+                    watermark.register(record_id)
+                if str(record_id) in self._done.get(entity, ()):
+                    self._count_skip(entity)
+                    if watermark is not None:
+                        self._advance(entity, watermark.settle(record_id, True))
+                    continue
+            yield item
+
+    def _count_skip(self, entity):
+        self.skipped[entity] = self.skipped.get(entity, 0) + 1
+
+    def skip(self, entity):
+        """Ghi nhận một record được bỏ qua nhờ checkpoint (ngoài resume_stream)."""
+        with self._lock:
+            self._count_skip(entity)
+
+    def complete(self, entity, record_id):
+        if record_id is None:
+            return
+        with self._lock:
+            done = self._done.setdefault(entity, set())
+            if str(record_id) not in done:
+                done.add(str(record_id))
+                self._write({"entity": entity, "id": record_id})
+            watermark = self._watermarks.get(entity)
+            if watermark is not None:
+                self._advance(entity, watermark.settle(record_id, True))
+
+    def fail(self, entity, record_id):
+        with self._lock:
+            watermark = self._watermarks.get(entity)
+            if watermark is not None:
+                watermark.settle(record_id, False)
+
+    def _advance(self, entity, advanced, force=False):
+        watermark = self._watermarks.get(entity)
+        if not advanced and not force or watermark is None or watermark.value is None:
+            return
+        self._since_cursor[entity] = self._since_cursor.get(entity, 0) + 1
+        if force or self._since_cursor[entity] >= self.CURSOR_EVERY:
+            self._since_cursor[entity] = 0
+            try:
+                self._cursors[entity] = int(watermark.value)
+            except (TypeError, ValueError):
+                return
+            self._write({"entity": entity, "cursor": self._cursors[entity]})
+
+    def close(self):
+        with self._lock:
+            for entity in list(self._watermarks):
+                self._advance(entity, False, force=True)
+            self._fh.close()
+
+def keyset_start(journal, entity, args, ids=None):
+    """entity_id để extract keyset tiếp tục sau đó khi resume (0 = từ đầu)."""
+    if journal is None or ids or getattr(args, "pagination", "offset") != "cursor":
+        return 0
+    start_after = journal.cursor(entity) or 0
+    if start_after:
+        print(f"♻️  Resume {journal.run_id}: {entity} extract continues after entity_id {start_after}")
+    return start_after
+
+def log_resume(journal, entity, label):
+    if journal is None or not journal.loaded:
+        return
+    skipped = journal.skipped.get(entity, 0)
+    print(f"♻️  Resume {journal.run_id}: skipped {skipped} {label} already migrated")
+
+_journals = {}
+_journals_lock = threading.Lock()
+
+def get_checkpoint(args):
+    """
+    Journal của run hiện tại (theo args.run_id), dùng chung cho mọi phase.
+    None khi dry-run hoặc không có run_id.
+    """
+    run_id = getattr(args, "run_id", None)
+    if not run_id or getattr(args, "dry_run", False):
+        return None
+    with _journals_lock:
+        journal = _journals.get(run_id)
+        if journal is None:
+            journal = CheckpointJournal(run_id, resume=bool(getattr(args, "resume", None)))
+            _journals[run_id] = journal
+        return journal
+
+def close_checkpoints():
+    with _journals_lock:
+        for journal in _journals.values():
+            journal.close()
+        _journals.clear()
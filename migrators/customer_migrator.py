@@ -1,22 +1,46 @@
 import json
 import requests
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from connectors.magento_connector import MagentoConnector
 from connectors.medusa_connector import MedusaConnector
-from extractors.customers import extract_customers
+from connectors.control import MigrationStopped
+from extractors.customers import iter_customers
 from transformers.customer_transformer import transform_customer, transform_address
 from migrators.utils import \
-    _limit_iter, _is_duplicate_http, _resp_json_or_text, \
-    log_dry_run, handle_medusa_api_error, \
+    _limit_iter, _use_cursor, _is_duplicate_http, _resp_json_or_text, \
+    log_dry_run, handle_medusa_api_error, _prefetch, _drive, _drive_async, \
     get_timestamp, log_info, log_success, log_warning, log_error, log_section, log_summary, \
     get_timestamp, log_info, log_success, log_warning, log_error, log_section, log_summary, \
     check_stop_signal, check_pause_signal
-
-def _sync_single_customer(customer, medusa: MedusaConnector, args):
+from migrators.async_engine import use_async_engine, run_async_pool
+from migrators.scheduler import BoundedScheduler
+from migrators.id_map import get_id_map
+from migrators.existing_index import ExistingCustomers
+from migrators.checkpoint import get_checkpoint, keyset_start, log_resume
+
+def _skip_if_existing(customer, existing=None, id_map=None):
+    """Trả về kết quả 'ignore' nếu email đã có trên Medusa (tra index cục bộ, không gọi API)."""
+    medusa_customer_id = existing.match(customer.get("email")) if existing is not None else None
+    if not medusa_customer_id:
+        return None
+    if id_map is not None:
+        id_map.put("customer", customer.get("id"), medusa_customer_id)
+    print(f"   [SKIP] Customer '{customer.get('email')}' already exists.")
+    return ('ignore', "Already exists in Medusa")
+
+def _customer_steps(customer, args, id_map=None, existing=None):
+    """
+    Các bước sync một customer (tạo account rồi từng address), viết một lần cho bản sync và async:
+    mỗi lời gọi Medusa được yield dạng (method, args, kwargs) cho _drive / _drive_async.
+    Giá trị return là result của customer.
+    """
     email = customer.get("email")
     if not email:
         return 'fail'
 
+    skipped = _skip_if_existing(customer, existing, id_map)
+    if skipped:
+        return skipped
+
     print(f"Syncing customer: {email}")
     print(f"   [STEP 1] Preparing info...")
     payload = transform_customer(customer)
@@ -27,22 +51,30 @@ def _sync_single_customer(customer, medusa: MedusaConnector, args):
 
     try:
         print(f"   [STEP 2] Creating customer account...")
-        res = medusa.create_customer(payload, idempotency_key=f"customer:{email}")
+        res = yield ("create_customer", (payload,), {"idempotency_key": f"customer:{email}"})
         created = res.get("customer") or res
         medusa_customer_id = created.get("id") if isinstance(created, dict) else None
         print(f"   [SUCCESS] Customer: {email}")
+        if existing is not None:
+            existing.add(created)
+        if id_map is not None:
+            id_map.put("customer", customer.get("id"), medusa_customer_id)
 
         if medusa_customer_id:
             for addr in customer.get("addresses", []):
                 try:
                     addr_payload = transform_address(addr)
-                    medusa.create_customer_address(medusa_customer_id, addr_payload)
+                    yield ("create_customer_address", (medusa_customer_id, addr_payload), {})
                     print(f"      - Address synced: {addr_payload.get('address_1')}")
+                except MigrationStopped:
+                    raise
                 except Exception as ae:
                     print(f"      Address skip: {ae}")
         
         return ('success', None)
 
+    except MigrationStopped:
+        raise
     except requests.exceptions.HTTPError as e:
         status_tuple = handle_medusa_api_error(e, "Customer", email)
         return status_tuple if isinstance(status_tuple, tuple) else (status_tuple, str(e))
@@ -51,6 +83,13 @@ def _sync_single_customer(customer, medusa: MedusaConnector, args):
         print(f"   [FAIL] Customer '{email}': {reason}")
         return ('fail', reason)
 
+def _sync_single_customer(customer, medusa: MedusaConnector, args, id_map=None, existing=None):
+    return _drive(_customer_steps(customer, args, id_map, existing), medusa)
+
+async def _sync_single_customer_async(customer, medusa, args, id_map=None, existing=None):
+    """Bản asyncio của _sync_single_customer (dùng AsyncMedusaConnector)."""
+    return await _drive_async(_customer_steps(customer, args, id_map, existing), medusa)
+
 def migrate_customers(magento: MagentoConnector, medusa: MedusaConnector, args):
     print("\n" + "="*50)
     print("👤 CUSTOMER MIGRATION PHASE")
@@ -61,16 +100,23 @@ def migrate_customers(magento: MagentoConnector, medusa: MedusaConnector, args):
     if check_pause_signal(): return
     if check_stop_signal(): return
 
-    customers = extract_customers(magento)
-    
+    customer_ids = None
     if getattr(args, "customer_ids", None):
-        customer_ids = {x.strip() for x in str(args.customer_ids).split(",") if x.strip()}
+        customer_ids = [x.strip() for x in str(args.customer_ids).split(",") if x.strip()]
         print(f"   (Filter by IDs: {customer_ids})")
-        customers = [c for c in customers if str(c.get("id")) in customer_ids]
-    
+
+    checkpoint = get_checkpoint(args)
+
+    # Stream: Magento được đọc theo từng trang trong lúc load, không gom hết vào bộ nhớ
+    customers = iter_customers(magento, ids=customer_ids, fanout=getattr(args, "extract_fanout", 4), cursor=_use_cursor(args),
+                               start_after=keyset_start(checkpoint, "customer", args, customer_ids))
+    if checkpoint is not None:
+        # Customer đã xong trong run trước bị bỏ qua ngay tại đây, không transform / POST lại
+        customers = checkpoint.resume_stream("customer", customers, key=lambda c: c.get("id"),
+                                             track_cursor=_use_cursor(args) and not customer_ids)
+
     customers = _limit_iter(customers, args.limit)
-    customer_count = len(customers)
-    print(f"🚀 Migrating {customer_count} customers...\n")
+    print(f"🚀 Migrating customers (streaming from Magento)...\n")
 
     # STOP CHECK
     if check_pause_signal(): return
@@ -82,46 +128,67 @@ def migrate_customers(magento: MagentoConnector, medusa: MedusaConnector, args):
 
     print("Starting transformation & sync process...")
 
-    with ThreadPoolExecutor(max_workers=args.max_workers or 10) as executor:
-        futures = {executor.submit(_sync_single_customer, c, medusa, args): c for c in customers}
-
-        processed_count = 0
-        for future in as_completed(futures):
-            # CHECK STOP SIGNAL
-            if check_pause_signal(): pass 
-
-            if check_stop_signal():
-                log_warning("🛑 Stop signal detected. Cancelling remaining customer tasks...", indent=1)
-                for f in futures:
-                    if not f.done():
-                        f.cancel()
-                break
-                
-            processed_count += 1
-            customer = futures[future]
-            email = customer.get('email', 'N/A')
-            
-            try:
-                res_tuple = future.result()
-                if isinstance(res_tuple, tuple):
-                    status, reason = res_tuple
-                else:
-                    status, reason = res_tuple, None
-                    
-                if status == 'success':
-                    count_success += 1
-                elif status == 'ignore':
-                    count_ignore += 1
-                else: 
-                    count_fail += 1
-            except Exception as e:
-                print(f"   ❌ [CRITICAL] Unexpected error for '{email}': {e}")
-                count_fail += 1
-            
-            if processed_count % 5 == 0 or processed_count == customer_count:
-                print(f"📊 Progress: {processed_count}/{customer_count} customers processed...")
-
-
+    processed_count = 0
+
+    def _record(customer, res_tuple):
+        nonlocal processed_count, count_success, count_ignore, count_fail
+        processed_count += 1
+        if isinstance(res_tuple, tuple):
+            status, reason = res_tuple
+        else:
+            status, reason = res_tuple, None
+
+        if status == 'success':
+            count_success += 1
+        elif status == 'ignore':
+            count_ignore += 1
+        else: 
+            count_fail += 1
+        if checkpoint is not None:
+            if status in ('success', 'ignore'):
+                checkpoint.complete("customer", customer.get("id"))
+            else:
+                checkpoint.fail("customer", customer.get("id"))
+
+        if processed_count % 5 == 0:
+            print(f"📊 Progress: {processed_count} customers processed...")
+
+    def _record_error(customer, e):
+        nonlocal processed_count, count_fail
+        processed_count += 1
+        print(f"   ❌ [CRITICAL] Unexpected error for '{customer.get('email', 'N/A')}': {e}")
+        count_fail += 1
+        if checkpoint is not None:
+            checkpoint.fail("customer", customer.get("id"))
+
+    id_map = get_id_map(args, medusa)
+    existing = None
+    if not args.dry_run:
+        # Email đã có trên Medusa: customer trùng bị bỏ qua cục bộ thay vì POST rồi nhận lỗi duplicate
+        try:
+            print(f"[{get_timestamp()}] Loading existing Medusa customers (email)...")
+            existing = ExistingCustomers.load(medusa)
+            print(f"   Indexed {len(existing)} existing customers.")
+        except Exception as e:
+            log_warning(f"Failed to list existing customers: {e}. Duplicates will be detected on create.", indent=1)
+    customers = _prefetch(customers, maxsize=(args.max_workers or 10) * 20)
+
+    if use_async_engine(args):
+        run_async_pool(
+            customers,
+            lambda c, a_magento, a_medusa: _sync_single_customer_async(c, a_medusa, args, id_map, existing),
+            magento, medusa, args,
+            on_result=_record, on_error=_record_error, label="customer tasks",
+        )
+    else:
+        BoundedScheduler(args.max_workers, label="customer tasks").run(
+            customers,
+            lambda c: _sync_single_customer(c, medusa, args, id_map, existing),
+            on_result=_record, on_error=_record_error,
+        )
+
+    print(f"📊 Progress: {processed_count} customers processed.")
+    log_resume(checkpoint, "customer", "customers")
     print("\n\n--- Customer Migration Summary ---")
     log_summary("Customer", count_success, count_ignore, count_fail)
     
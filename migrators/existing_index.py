@@ -0,0 +1,98 @@
+import threading
+from connectors.medusa_connector import MedusaConnector
+from transformers.product_transformer import _handle_from_magento_product
+
+# Chỉ lấy các field cần để nhận diện record đã tồn tại
+PRODUCT_FIELDS = "id,handle,variants.id,variants.sku"
+CUSTOMER_FIELDS = "id,email"
+
+def _list_all(list_page, key, page_limit):
+    offset = 0
+    while True:
+        res = list_page(page_limit, offset)
+        items = res.get(key) or res.get("data") or []
+        if not items:
+            break
+        yield from items
+        offset += len(items)
+        count = res.get("count")
+        if count is not None and offset >= count:
+            break
+
+class ExistingProducts:
+    """
+    Product đã có trên Medusa, nạp một lần (handle -> product id, SKU -> variant) trước khi load.
+    Worker tra cứu bằng handle / SKU và bỏ qua record trùng mà không cần POST rồi chờ lỗi duplicate.
+    Product tạo trong lần chạy được add() vào index. Thread-safe.
+    """
+    def __init__(self, products=()):
+        self._lock = threading.Lock()
+        self._by_handle = {}
+        self._by_sku = {}
+        for product in products:
+            self.add(product)
+
+    @classmethod
+    def load(cls, medusa: MedusaConnector, page_limit: int = 200):
+        return cls(_list_all(
+            lambda limit, offset: medusa.list_products(limit=limit, offset=offset, fields=PRODUCT_FIELDS),
+            "products", page_limit,
+        ))
+
+    def add(self, product):
+        product_id = (product or {}).get("id")
+        if not product_id:
+            return
+        with self._lock:
+            if product.get("handle"):
+                self._by_handle[product["handle"]] = product_id
+            for variant in product.get("variants") or []:
+                if variant.get("sku"):
+                    self._by_sku[variant["sku"]] = (product_id, variant.get("id"))
+
+    def match(self, mg_product):
+        """(product_id, variants [(sku, variant_id)]) nếu product Magento đã có trên Medusa, ngược lại None."""
+        sku = mg_product.get("sku")
+        with self._lock:
+            product_id = self._by_handle.get(_handle_from_magento_product(mg_product))
+            hit = self._by_sku.get(sku) if sku else None
+            if product_id is None and hit:
+                product_id = hit[0]
+        if product_id is None:
+            return None
+        variants = [(sku, hit[1])] if hit and hit[0] == product_id and hit[1] else []
+        return product_id, variants
+
+    def __len__(self):
+        with self._lock:
+            return len(self._by_handle)
+
+class ExistingCustomers:
+    """Customer đã có trên Medusa theo email (không phân biệt hoa thường) -> customer id. Thread-safe."""
+    def __init__(self, customers=()):
+        self._lock = threading.Lock()
+        self._by_email = {}
+        for customer in customers:
+            self.add(customer)
+
+    @classmethod
+    def load(cls, medusa: MedusaConnector, page_limit: int = 200):
+        return cls(_list_all(
+            lambda limit, offset: medusa.list_customers(limit=limit, offset=offset, fields=CUSTOMER_FIELDS),
+            "customers", page_limit,
+        ))
+
+    def add(self, customer):
+        email = ((customer or {}).get("email") or "").strip().lower()
+        if email and customer.get("id"):
+            with self._lock:
+                self._by_email[email] = customer["id"]
+
+    def match(self, email):
+        email = (email or "").strip().lower()
+        with self._lock:
+            return self._by_email.get(email) if email else None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._by_email)
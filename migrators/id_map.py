@@ -0,0 +1,161 @@
+import os
+import sqlite3
+import threading
+
+DEFAULT_ID_MAP_PATH = "exports/id_map.sqlite"
+ENTITIES = ("category", "category_handle", "product", "variant", "customer", "order")
+
+class IdMappingStore:
+    """
+    Mapping Magento ID -> Medusa ID lưu trên đĩa (SQLite), ghi lại ngay khi từng record được tạo.
+    Các phase sau và các lần chạy sau đọc mapping từ đây thay vì liệt kê lại toàn bộ Medusa.
+    Mapping được tách theo `target` (base URL của Medusa) để không dùng nhầm ID của instance khác.
+    Variant được key theo SKU, category_handle theo handle. Thread-safe; commit theo lô `commit_every`
+    lần ghi và khi flush()/close().
+
+    Store chỉ thay được việc liệt kê Medusa khi nó đầy đủ: mark_complete(entity) được gọi sau khi đã
+    đối chiếu với toàn bộ listing. Lần ghi đầu tiên của một phiên xoá dấu "complete" trên đĩa (commit ngay)
+    và close() đặt lại sau khi mọi mapping đã commit, nên store bị bỏ dở (crash, kill) không bao giờ
+    được coi là đầy đủ ở lần chạy sau.
+    """
+    def __init__(self, path=DEFAULT_ID_MAP_PATH, target="", commit_every=100):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.path = path
+        self.target = target or ""
+        self.commit_every = max(1, int(commit_every))
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._listeners = {}
+        # Entity đầy đủ (trong bộ nhớ) và entity đã bị xoá dấu trên đĩa vì có ghi mới trong phiên này
+        self._complete = set()
+        self._reopened = set()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS id_map ("
+            " target TEXT NOT NULL, entity TEXT NOT NULL, magento_id TEXT NOT NULL, medusa_id TEXT NOT NULL,"
+            " updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,"
+            " PRIMARY KEY (target, entity, magento_id))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS id_map_complete ("
+            " target TEXT NOT NULL, entity TEXT NOT NULL,"
+            " updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,"
+            " PRIMARY KEY (target, entity))"
+        )
+        self._conn.commit()
+        self._complete = {row[0] for row in self._conn.execute(
+            "SELECT entity FROM id_map_complete WHERE target = ?", (self.target,))}
+
+    def put(self, entity, magento_id, medusa_id):
+        if magento_id is None or not medusa_id:
+            return
+        self.put_many(entity, [(magento_id, medusa_id)])
+
+    def subscribe(self, entity, fn):
+        """fn(pairs) được gọi (ngoài lock) sau mỗi lần ghi mapping của `entity`, pairs = [(magento_id, medusa_id)]."""
+        with self._lock:
+            self._listeners.setdefault(entity, []).append(fn)
+
+    def put_many(self, entity, pairs):
+        rows = [(self.target, entity, str(mg_id), str(md_id)) for mg_id, md_id in pairs if mg_id is not None and md_id]
+        if not rows:
+            return
+        with self._lock:
+            if entity in self._complete and entity not in self._reopened:
+                # Ghi mới chưa commit: trên đĩa store không còn được coi là đầy đủ cho tới close()
+                self._conn.execute("DELETE FROM id_map_complete WHERE target = ? AND entity = ?", (self.target, entity))
+                self._conn.commit()
+                self._reopened.add(entity)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO id_map (target, entity, magento_id, medusa_id) VALUES (?, ?, ?, ?)", rows
+            )
+            self._pending += len(rows)
+            if self._pending >= self.commit_every:
+                self._conn.commit()
+                self._pending = 0
+            listeners = list(self._listeners.get(entity, ()))
+        for fn in listeners:
+            fn([(row[2], row[3]) for row in rows])
+
+    def get(self, entity, magento_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT medusa_id FROM id_map WHERE target = ? AND entity = ? AND magento_id = ?",
+                (self.target, entity, str(magento_id)),
+            ).fetchone()
+        return row[0] if row else None
+
+    def all(self, entity):
+        """Toàn bộ mapping của một entity dưới dạng dict {magento_id (str): medusa_id}."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT magento_id, medusa_id FROM id_map WHERE target = ? AND entity = ?", (self.target, entity)
+            ).fetchall()
+        return dict(rows)
+
+    def count(self, entity):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM id_map WHERE target = ? AND entity = ?", (self.target, entity)
+            ).fetchone()[0]
+
+    def is_complete(self, entity):
+        """True nếu store chứa mọi mapping của entity trên Medusa (đã đối chiếu listing, không bị bỏ dở)."""
+        with self._lock:
+            return entity in self._complete
+
+    def mark_complete(self, *entities):
+        """Đánh dấu entity đầy đủ sau khi đã ghi toàn bộ listing Medusa vào store."""
+        with self._lock:
+            self._mark(entities)
+            self._complete.update(entities)
+            self._reopened.difference_update(entities)
+
+    def _mark(self, entities):
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO id_map_complete (target, entity) VALUES (?, ?)",
+            [(self.target, entity) for entity in entities],
+        )
+        self._conn.commit()
+        self._pending = 0
+
+    def flush(self):
+        with self._lock:
+            self._conn.commit()
+            self._pending = 0
+
+    def close(self):
+        with self._lock:
+            # Mọi ghi mới đã commit: entity vẫn đầy đủ như trước phiên này
+            self._mark(sorted(self._reopened))
+            self._reopened.clear()
+            self._conn.close()
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_id_map(args, medusa):
+    """
+    Store dùng chung cho mọi phase của một lần chạy (theo đường dẫn --id-map và Medusa base URL).
+    Trả về None nếu bị tắt (--id-map "") hoặc đang dry-run (không có ID thật để lưu).
+    """
+    path = getattr(args, "id_map", DEFAULT_ID_MAP_PATH)
+    if not path or getattr(args, "dry_run", False):
+        return None
+    key = (os.path.abspath(path), medusa.base_url)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = IdMappingStore(path, target=medusa.base_url)
+            _stores[key] = store
+        return store
+
+def close_id_maps():
+    with _stores_lock:
+        for store in _stores.values():
+            store.close()
+        _stores.clear()
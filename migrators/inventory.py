@@ -0,0 +1,292 @@
+import asyncio
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from connectors.medusa_connector import MedusaConnector
+from connectors.control import MigrationStopped
+from migrators.utils import log_success, log_warning
+
+# location_levels đi kèm để biết SKU nào đã có tồn kho tại location (create vs update)
+INVENTORY_FIELDS = "id,sku,*location_levels"
+
+def _is_benign_inventory_error(err) -> bool:
+    err_str = str(err).lower()
+    return "already exists" in err_str or "duplicate" in err_str or "400" in err_str or "409" in err_str
+
+class InventoryIndex:
+    """
+    Index SKU -> inventory item của Medusa, nạp một lần bằng cách phân trang list_inventory_items.
+    Worker tra cứu bằng dict thay vì một request get_inventory_item_by_sku cho mỗi variant;
+    item / location level mới tạo được ghi lại vào index. Thread-safe.
+    """
+    def __init__(self, items=()):
+        self._lock = threading.Lock()
+        self._by_sku = {}
+        for item in items:
+            self.add(item)
+
+    @classmethod
+    def load(cls, medusa: MedusaConnector, page_limit: int = 200):
+        index = cls()
+        offset = 0
+        while True:
+            res = medusa.list_inventory_items(params={"limit": page_limit, "offset": offset, "fields": INVENTORY_FIELDS})
+            items = res.get("inventory_items") or res.get("data") or []
+            if not items:
+                break
+            for item in items:
+                index.add(item)
+            offset += len(items)
+            count = res.get("count")
+            if count is not None and offset >= count:
+                break
+        return index
+
+    def add(self, item):
+        sku = (item or {}).get("sku")
+        inv_id = (item or {}).get("id")
+        if not sku or not inv_id:
+            return
+        locations = {l.get("location_id") for l in item.get("location_levels") or [] if l.get("location_id")}
+        with self._lock:
+            entry = self._by_sku.setdefault(sku, {"id": inv_id, "locations": set()})
+            entry["locations"].update(locations)
+
+    def get_id(self, sku):
+        with self._lock:
+            entry = self._by_sku.get(sku)
+            return entry["id"] if entry else None
+
+    def has_level(self, sku, location_id) -> bool:
+        with self._lock:
+            entry = self._by_sku.get(sku)
+            return bool(entry) and location_id in entry["locations"]
+
+    def mark_level(self, sku, location_id):
+        with self._lock:
+            entry = self._by_sku.get(sku)
+            if entry:
+                entry["locations"].add(location_id)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._by_sku)
+
+def _inventory_item_payload(product, sku):
+    product_name = product.get('name', 'N/A')
+    return {
+        "sku": sku,
+        "title": f"Inventory for {product_name} - {sku}",
+        "description": f"Inventory for {product_name} - {sku}",
+        "metadata": {"magento_id": str(product.get("id"))}
+    }
+
+def _product_qty(product) -> int:
+    stock_item = (product.get("extension_attributes") or {}).get("stock_item") or {}
+    return int(stock_item.get("qty", 0))
+
+def _is_linked(variant, inv_id) -> bool:
+    existing_links = variant.get("inventory_items") or variant.get("inventory") or []
+    return any(l.get("inventory_item_id") == inv_id or l.get("id") == inv_id for l in existing_links)
+
+def _split_levels(index: InventoryIndex, levels, location_id):
+    """levels: list (sku, inventory_item_id, qty) -> (create, update) cho location-levels/batch."""
+    create, update = [], []
+    for sku, inv_id, qty in levels:
+        row = {"inventory_item_id": inv_id, "location_id": location_id, "stocked_quantity": qty}
+        (update if index.has_level(sku, location_id) else create).append(row)
+    return create, update
+
+def _log_levels_written(index: InventoryIndex, levels, location_id):
+    for sku, _, qty in levels:
+        index.mark_level(sku, location_id)
+        log_success(f"Inventory synced for variant {sku}: {qty} units at location {location_id}", indent=2)
+
+def write_location_levels(medusa: MedusaConnector, index: InventoryIndex, levels, location_id):
+    """
+    Ghi tồn kho của nhiều SKU trong một request admin/inventory-items/location-levels/batch.
+    Trả về False nếu request thất bại.
+    """
+    if not levels:
+        return True
+    create, update = _split_levels(index, levels, location_id)
+    try:
+        medusa.batch_inventory_location_levels(create=create, update=update)
+    except MigrationStopped:
+        raise
+    except Exception as loc_e:
+        if not _is_benign_inventory_error(loc_e):
+            log_warning(f"Location levels failed for {len(levels)} SKU(s): {loc_e}", indent=2)
+            return False
+        return True
+    _log_levels_written(index, levels, location_id)
+    return True
+
+class InventoryLoader:
+    """
+    Stage tồn kho tách khỏi product worker. Worker chỉ gọi submit() với response tạo product;
+    loader gom các (variant, SKU, qty) thành lô `batch_size` và flush trên pool riêng
+    (`max_workers` lô song song), nên endpoint inventory chậm không kìm throughput tạo product.
+    Mỗi lô: tạo inventory item còn thiếu trong index, link variant theo product, rồi ghi toàn bộ
+    location level bằng một request location-levels/batch. close() flush phần còn lại và chờ xong.
+    """
+    _END = object()
+
+    def __init__(self, medusa: MedusaConnector, index: InventoryIndex, location_id, batch_size=200, max_workers=2, flush_interval=2.0):
+        self.medusa = medusa
+        self.index = index
+        self.location_id = location_id
+        self.batch_size = max(1, int(batch_size or 1))
+        self.flush_interval = flush_interval
+        self.max_workers = max(1, int(max_workers or 1))
+        # Queue có giới hạn: khi stage tồn kho tụt lại, submit() chặn product worker (backpressure)
+        self._queue = queue.Queue(maxsize=self.batch_size * (self.max_workers * 2 + 1))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        # Giới hạn số lô đang chờ flush; phần dư nằm lại trong queue dưới dạng tuple nhỏ
+        self._slots = threading.Semaphore(self.max_workers * 2)
+        self._stats_lock = threading.Lock()
+        self.submitted = 0
+        self.synced = 0
+        self.failed = 0
+        self.batches = 0
+        self._thread = threading.Thread(target=self._collect, name="inventory-loader", daemon=True)
+        self._thread.start()
+
+    def _entries(self, product, created_product):
+        qty = _product_qty(product)
+        for variant in created_product.get("variants") or []:
+            v_sku = variant.get("sku")
+            if not v_sku:
+                continue
+            yield {
+                "product": {"id": product.get("id"), "name": product.get("name")},
+                "product_id": created_product.get("id"),
+                "variant": variant,
+                "sku": v_sku,
+                "qty": qty,
+            }
+
+    def _count_submitted(self):
+        with self._stats_lock:
+            self.submitted += 1
+
+    def submit(self, product, created_product):
+        """Đưa các variant của một product vừa tạo vào stage tồn kho (chỉ chặn khi stage đã đầy)."""
+        for entry in self._entries(product, created_product):
+            self._queue.put(entry)
+            self._count_submitted()
+
+    async def submit_async(self, product, created_product):
+        """
+        Bản asyncio của submit(): queue còn chỗ thì đưa vào ngay, khi đầy thì chờ trên thread riêng
+        để backpressure không chặn event loop (các coroutine khác vẫn chạy).
+        """
+        for entry in self._entries(product, created_product):
+            try:
+                self._queue.put_nowait(entry)
+            except queue.Full:
+                await asyncio.to_thread(self._queue.put, entry)
+            self._count_submitted()
+
+    def _collect(self):
+        batch = []
+        while True:
+            try:
+                entry = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                if batch:
+                    self._dispatch(batch)
+                    batch = []
+                continue
+            if entry is self._END:
+                break
+            batch.append(entry)
+            if len(batch) >= self.batch_size:
+                self._dispatch(batch)
+                batch = []
+        if batch:
+            self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        self._slots.acquire()
+        future = self._executor.submit(self._flush, batch)
+        future.add_done_callback(lambda f: self._slots.release())
+
+    def _resolve_item(self, entry):
+        """Inventory item id của SKU (tạo nếu chưa có); None nếu thất bại, chỉ SKU này bị tính lỗi."""
+        v_sku = entry["sku"]
+        inv_id = self.index.get_id(v_sku)
+        if inv_id:
+            return inv_id
+        try:
+            inv_res = self.medusa.create_inventory_item(_inventory_item_payload(entry["product"], v_sku))
+            self.index.add(inv_res.get("inventory_item") or inv_res)
+        except MigrationStopped:
+            raise
+        except Exception as e:
+            # Có thể vừa được tạo bởi lô khác: tra lại trên Medusa
+            try:
+                self.index.add(self.medusa.get_inventory_item_by_sku(v_sku))
+            except MigrationStopped:
+                raise
+            except Exception as lookup_e:
+                log_warning(f"Failed to create inventory item for SKU {v_sku}: {e}; lookup failed: {lookup_e}", indent=2)
+                return None
+            if not self.index.get_id(v_sku):
+                log_warning(f"Failed to create inventory item for SKU {v_sku}: {e}", indent=2)
+        return self.index.get_id(v_sku)
+
+    def _flush(self, batch):
+        levels = []
+        links = {}
+        failed = 0
+        try:
+            for entry in batch:
+                try:
+                    inv_id = self._resolve_item(entry)
+                except MigrationStopped:
+                    raise
+                except Exception as item_e:
+                    log_warning(f"Inventory item for SKU {entry['sku']} failed: {item_e}", indent=2)
+                    inv_id = None
+                if not inv_id:
+                    failed += 1
+                    continue
+                if not _is_linked(entry["variant"], inv_id):
+                    links.setdefault(entry["product_id"], []).append({
+                        "variant_id": entry["variant"].get("id"),
+                        "inventory_item_id": inv_id,
+                        "required_quantity": 1,
+                    })
+                levels.append((entry["sku"], inv_id, entry["qty"]))
+
+            for product_id, rows in links.items():
+                try:
+                    self.medusa.link_variants_to_inventory_items(product_id, rows)
+                except MigrationStopped:
+                    raise
+                except Exception as link_e:
+                    if not _is_benign_inventory_error(link_e):
+                        log_warning(f"Link failed for {len(rows)} variant(s) of product {product_id}: {link_e}", indent=2)
+
+            written = write_location_levels(self.medusa, self.index, levels, self.location_id)
+            if not written:
+                failed += len(levels)
+                levels = []
+        except MigrationStopped:
+            # Lệnh stop: phần còn lại của lô chưa được xử lý, không phải lỗi (chỉ giữ các SKU đã lỗi thật)
+            levels = []
+        except Exception as inv_e:
+            log_warning(f"Inventory batch of {len(batch)} SKU(s) failed: {inv_e}", indent=2)
+            failed, levels = len(batch), []
+        with self._stats_lock:
+            self.batches += 1
+            self.synced += len(levels)
+            self.failed += failed
+
+    def close(self):
+        """Flush các SKU còn lại, chờ mọi lô hoàn tất và trả về thống kê."""
+        self._queue.put(self._END)
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+        return {"submitted": self.submitted, "synced": self.synced, "failed": self.failed, "batches": self.batches}
@@ -1,20 +1,23 @@
 import json
+import itertools
 import requests
-import time
 from datetime import datetime, timedelta
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from connectors.magento_connector import MagentoConnector
 from connectors.medusa_connector import MedusaConnector
-from extractors.orders import extract_orders, extract_order_invoices, extract_order_payments
+from connectors.control import MigrationStopped
+from extractors.orders import iter_orders, iter_invoices, order_payments, PAGE_SIZE as ORDER_PAGE_SIZE
 from transformers.order_transformer import transform_order, calculate_checksum
 from transformers.invoice_payment_transformer import transform_invoice, transform_payment
 from migrators.utils import (
-    _limit_iter, _fetch_all_variants, _is_duplicate_http, 
-    _resp_json_or_text, log_dry_run, handle_medusa_api_error,
-    get_timestamp, log_info, log_success, log_warning, log_error, log_section, log_summary,
+    _limit_iter, _use_cursor, _fetch_all_variants, _is_duplicate_http, _drive, _drive_async,
+    _resp_json_or_text, _resp_text, log_dry_run, handle_medusa_api_error, _prefetch,
     get_timestamp, log_info, log_success, log_warning, log_error, log_section, log_summary,
     check_stop_signal, check_pause_signal
 )
+from migrators.async_engine import use_async_engine, run_async_pool
+from migrators.scheduler import BoundedScheduler
+from migrators.id_map import get_id_map
+from migrators.checkpoint import get_checkpoint, keyset_start, log_resume
 
 
 def _validate_checksum(payload, mg_order):
@@ -46,16 +49,9 @@ def _validate_checksum(payload, mg_order):
     return is_valid, calculated_total, grand_total, details
 
 
-def _sync_single_order_with_retry(order, magento: MagentoConnector, medusa: MedusaConnector, args, region_id, sku_map, shipping_option, max_retries=3):
-    """
-    Sync single order with retry mechanism and rollback support
-    """
+def _prepare_order_payload(order, region_id, sku_map, shipping_option):
     inc = order.get("increment_id") or order.get("entity_id")
-    order_id = order.get("entity_id")
-    
-    log_info(f"Syncing order: {inc}")
-    
-    # STEP 1: Transform order
+
     log_info(f"   [STEP 1] Mapping data & SKUs...", indent=1)
     payload = transform_order(order, region_id, sku_map, shipping_option)
     
@@ -69,168 +65,203 @@ def _sync_single_order_with_retry(order, magento: MagentoConnector, medusa: Medu
         payload["metadata"]["magento_checksum_warning"] = "true"
     else:
         log_success(f"   ✅ Checksum validated: {calc_total} = {exp_total}", indent=1)
-    
-    log_dry_run(payload, "order", args)
-    if args.dry_run:
-        return ('ignore', "Dry run enabled")
-    
-    # STEP 2: Extract invoices and payments (optional)
-    invoice_metadata = {}
-    payment_metadata = {}
-    
-    if getattr(args, 'migrate_invoices', False):
-        try:
-            log_info(f"   [STEP 1.5] Extracting invoices...", indent=1)
-            invoices = extract_order_invoices(magento, order_id)
-            if invoices:
-                # Lấy invoice đầu tiên hoặc merge tất cả
-                invoice = invoices[0]
-                invoice_metadata = transform_invoice(invoice, order_id)
-                log_success(f"   ✅ Found {len(invoices)} invoice(s)", indent=1)
-        except Exception as e:
-            log_warning(f"   ⚠️ Failed to extract invoices: {e}", indent=1)
-    
-    if getattr(args, 'migrate_payments', False):
-        try:
-            log_info(f"   [STEP 1.6] Extracting payments...", indent=1)
-            payments = extract_order_payments(magento, order_id)
-            if payments:
-                # Lấy payment đầu tiên hoặc merge tất cả
-                payment = payments[0] if isinstance(payments, list) else payments
-                payment_metadata = transform_payment(payment, order_id)
-                log_success(f"   ✅ Found payment data", indent=1)
-        except Exception as e:
-            log_warning(f"   ⚠️ Failed to extract payments: {e}", indent=1)
-    
-    # Merge invoice và payment metadata vào order metadata
-    if invoice_metadata:
-        payload["metadata"].update(invoice_metadata)
-    if payment_metadata:
-        payload["metadata"].update(payment_metadata)
-    
-    # STEP 3: Create draft order with retry
-    draft_id = None
-    last_error = None
-    
-    for attempt in range(1, max_retries + 1):
+    return payload
+
+
+# Key nội bộ chứa invoices đã join vào order document (không phải field của Magento)
+_INVOICES_KEY = "_magento_invoices"
+
+
+def _attach_invoices(orders, magento: MagentoConnector, args):
+    """
+    Join invoices vào stream orders theo lô: mỗi trang order chỉ tốn một search /V1/invoices
+    (order_id in (...)) thay vì một request get_order_invoices cho từng order.
+    """
+    orders = iter(orders)
+    while True:
+        batch = list(itertools.islice(orders, ORDER_PAGE_SIZE))
+        if not batch:
+            return
+        by_order = {}
+        order_ids = [o.get("entity_id") for o in batch if o.get("entity_id") is not None]
         try:
-            if attempt > 1:
-                log_info(f"   [RETRY {attempt}/{max_retries}] Creating Draft Order...", indent=1)
-                time.sleep(1 * attempt)  # Exponential backoff
-            else:
-                log_info(f"   [STEP 2] Creating Draft Order...", indent=1)
-            
-            res = medusa.create_draft_order(payload, idempotency_key=f"order:{inc}")
-            draft = res.get("draft_order") or res.get("draftOrder") or res
-            draft_id = draft.get("id") if isinstance(draft, dict) else None
-            
-            if draft_id:
-                log_success(f"   ✅ Draft Order created: {draft_id}", indent=1)
-                break
-                
-        except requests.exceptions.HTTPError as e:
-            last_error = e
-            resp = getattr(e, "response", None)
-            
-            # Nếu là duplicate, không retry
-            if _is_duplicate_http(resp):
-                status_tuple = handle_medusa_api_error(e, "Draft Order", inc)
-                return status_tuple if isinstance(status_tuple, tuple) else (status_tuple, str(e))
-            
-            # Nếu là lỗi client (4xx), không retry
-            if resp and 400 <= resp.status_code < 500:
-                log_error(f"   ❌ Client error (HTTP {resp.status_code}), skipping retry", indent=1)
-                status_tuple = handle_medusa_api_error(e, "Draft Order", inc)
-                return status_tuple if isinstance(status_tuple, tuple) else (status_tuple, str(e))
-            
-            # Server error (5xx), retry
-            if attempt < max_retries:
-                log_warning(f"   ⚠️ Server error (HTTP {resp.status_code if resp else 'unknown'}), retrying...", indent=1)
-            else:
-                log_error(f"   ❌ Failed after {max_retries} attempts", indent=1)
-                status_tuple = handle_medusa_api_error(e, "Draft Order", inc)
-                return status_tuple if isinstance(status_tuple, tuple) else (status_tuple, str(e))
-                
+            for invoice in iter_invoices(magento, order_ids, fanout=getattr(args, "extract_fanout", 4)):
+                by_order.setdefault(str(invoice.get("order_id")), []).append(invoice)
         except Exception as e:
-            last_error = e
-            if attempt < max_retries:
-                log_warning(f"   ⚠️ Error: {str(e)}, retrying...", indent=1)
-                time.sleep(1 * attempt)
-            else:
-                log_error(f"   ❌ Failed after {max_retries} attempts: {str(e)}", indent=1)
-                return ('fail', str(e))
-    
+            log_warning(f"⚠️ Failed to extract invoices for {len(batch)} orders: {e}", indent=1)
+        for order in batch:
+            order[_INVOICES_KEY] = by_order.get(str(order.get("entity_id")), [])
+            yield order
+
+
+def _order_invoices_and_payments(order, args):
+    """Invoices (đã join bởi _attach_invoices) và payment (nhúng sẵn trong order document)."""
+    invoices = (order.get(_INVOICES_KEY) or []) if getattr(args, 'migrate_invoices', False) else []
+    payments = order_payments(order) if getattr(args, 'migrate_payments', False) else []
+    return invoices, payments
+
+
+def _merge_invoice_payment_metadata(payload, order_id, invoices=None, payments=None):
+    """Merge invoice và payment metadata (bản đầu tiên) vào order metadata."""
+    if invoices:
+        # Lấy invoice đầu tiên hoặc merge tất cả
+        payload["metadata"].update(transform_invoice(invoices[0], order_id))
+        log_success(f"   ✅ Found {len(invoices)} invoice(s)", indent=1)
+    if payments:
+        # Lấy payment đầu tiên hoặc merge tất cả
+        payment = payments[0] if isinstance(payments, list) else payments
+        payload["metadata"].update(transform_payment(payment, order_id))
+        log_success(f"   ✅ Found payment data", indent=1)
+
+
+def _prepare_order(order, args, region_id, sku_map, shipping_option):
+    """
+    Bước chung của bản sync / async trước khi gọi Medusa: transform + checksum, dry-run,
+    merge invoice / payment. Trả về (result, None) nếu không cần gọi Medusa, ngược lại (None, payload).
+    """
+    inc = order.get("increment_id") or order.get("entity_id")
+    log_info(f"Syncing order: {inc}")
+
+    # STEP 1: Transform order + validate checksum
+    payload = _prepare_order_payload(order, region_id, sku_map, shipping_option)
+
+    log_dry_run(payload, "order", args)
+    if args.dry_run:
+        return ('ignore', "Dry run enabled"), None
+
+    # Invoices và payments (optional) — đã có sẵn trong order, không gọi thêm Magento
+    invoices, payments = _order_invoices_and_payments(order, args)
+    _merge_invoice_payment_metadata(payload, order.get("entity_id"), invoices, payments)
+    return None, payload
+
+
+def _draft_order_failed(inc, e):
+    if isinstance(e, requests.exceptions.HTTPError):
+        status_tuple = handle_medusa_api_error(e, "Draft Order", inc)
+        return status_tuple if isinstance(status_tuple, tuple) else (status_tuple, str(e))
+    log_error(f"   ❌ Failed to create Draft Order: {str(e)}", indent=1)
+    return ('fail', str(e))
+
+
+def _record_draft(order, res, id_map=None):
+    """Lấy draft order từ response và lưu mapping. Trả về (draft, None) hoặc (None, result lỗi)."""
+    draft = res.get("draft_order") or res.get("draftOrder") or res
+    draft_id = draft.get("id") if isinstance(draft, dict) else None
     if not draft_id:
-        return ('fail', f"Failed to create draft order after {max_retries} attempts: {str(last_error)}")
-    
-    # STEP 4: Finalize order (if enabled)
-    if draft_id and getattr(args, 'finalize_orders', False):
-        try:
-            log_info(f"   [STEP 3] Finalizing order...", indent=1)
-            finalized = medusa.finalize_draft_order(draft_id)
-            
-            if finalized is None:
-                log_warning(f"   ⚠️ Draft Order {draft_id} created. Finalize not supported/returned empty.", indent=1)
-            else:
-                log_success(f"   ✅ Finalized Order: {draft_id}", indent=1)
-                
-                # Try to create fulfillment
-                try:
-                    medusa.create_fulfillment(draft_id, draft.get("items") or [])
-                    log_success(f"   ✅ Created fulfillment for order {draft_id}", indent=1)
-                except Exception as fe:
-                    log_warning(f"   ⚠️ Failed to create fulfillment: {fe}", indent=1)
-                    
-        except requests.exceptions.HTTPError as fe:
-            log_warning(f"   ⚠️ Draft Order {draft_id} created, but Finalize failed.", indent=1)
-            resp = getattr(fe, "response", None)
-            if resp and resp.status_code == 500:
-                log_warning("   (Server Error 500 during finalize. Likely an inventory bug. Saved as Draft.)", indent=1)
-            else:
-                status_code = resp.status_code if resp else 'unknown'
-                log_error(f"   Status: {status_code}", indent=1)
-                if resp:
-                    error_text = _resp_text(resp)
-                    log_error(f"   Response: {error_text[:200]}", indent=1)
-                else:
-                    log_error(f"   Error details: {str(fe)}", indent=1)
-            
-            # Rollback: Xóa draft order nếu finalize thất bại và rollback được bật
-            if getattr(args, 'rollback_on_finalize_fail', False):
-                try:
-                    log_warning(f"   [ROLLBACK] Attempting to delete draft order {draft_id}...", indent=1)
-                    medusa.delete_draft_order(draft_id)
-                    log_success(f"   ✅ Rollback successful: Draft order {draft_id} deleted", indent=1)
-                except requests.exceptions.HTTPError as rb_e:
-                    resp = getattr(rb_e, "response", None)
-                    status_code = resp.status_code if resp else 'unknown'
-                    log_error(f"   ❌ Rollback failed (HTTP {status_code}): {str(rb_e)}", indent=1)
-                    if resp:
-                        error_text = _resp_text(resp)
-                        log_error(f"   Response: {error_text[:200]}", indent=1)
-                except Exception as rb_e:
-                    log_error(f"   ❌ Rollback failed: {str(rb_e)}", indent=1)
-            
-            return ('success', f"Draft created but finalize failed: {str(fe)}")
-        except Exception as e:
-            log_error(f"   ❌ Finalize error: {str(e)}", indent=1)
-            log_error(f"   Error type: {type(e).__name__}", indent=1)
-            # Rollback nếu có exception không phải HTTPError
-            if getattr(args, 'rollback_on_finalize_fail', False):
-                try:
-                    log_warning(f"   [ROLLBACK] Exception during finalize. Attempting to delete draft order {draft_id}...", indent=1)
-                    medusa.delete_draft_order(draft_id)
-                    log_success(f"   ✅ Rollback successful: Draft order {draft_id} deleted", indent=1)
-                except Exception as rb_e:
-                    log_error(f"   ❌ Rollback failed: {str(rb_e)}", indent=1)
-            return ('success', f"Draft created but finalize error: {str(e)}")
-    elif draft_id:
+        return None, ('fail', f"No draft order ID returned from API. Response: {json.dumps(res, ensure_ascii=False)[:200]}")
+    log_success(f"   ✅ Draft Order created: {draft_id}", indent=1)
+    if id_map is not None:
+        id_map.put("order", order.get("entity_id"), draft_id)
+    return draft, None
+
+
+def _log_http_error_response(resp, fallback):
+    if resp is not None:
+        log_error(f"   Response: {_resp_text(resp)[:200]}", indent=1)
+    else:
+        log_error(f"   Error details: {fallback}", indent=1)
+
+
+def _finalize_failed(draft_id, fe):
+    """Log lỗi finalize; draft vẫn được giữ nên kết quả là 'success' kèm lý do."""
+    if isinstance(fe, requests.exceptions.HTTPError):
+        log_warning(f"   ⚠️ Draft Order {draft_id} created, but Finalize failed.", indent=1)
+        resp = getattr(fe, "response", None)
+        if resp is not None and resp.status_code == 500:
+            log_warning("   (Server Error 500 during finalize. Likely an inventory bug. Saved as Draft.)", indent=1)
+        else:
+            log_error(f"   Status: {resp.status_code if resp is not None else 'unknown'}", indent=1)
+            _log_http_error_response(resp, str(fe))
+        return ('success', f"Draft created but finalize failed: {str(fe)}")
+    log_error(f"   ❌ Finalize error: {str(fe)}", indent=1)
+    log_error(f"   Error type: {type(fe).__name__}", indent=1)
+    return ('success', f"Draft created but finalize error: {str(fe)}")
+
+
+def _rollback_failed(rb_e):
+    if isinstance(rb_e, requests.exceptions.HTTPError):
+        resp = getattr(rb_e, "response", None)
+        log_error(f"   ❌ Rollback failed (HTTP {resp.status_code if resp is not None else 'unknown'}): {str(rb_e)}", indent=1)
+        if resp is not None:
+            _log_http_error_response(resp, str(rb_e))
+    else:
+        log_error(f"   ❌ Rollback failed: {str(rb_e)}", indent=1)
+
+
+def _order_steps(order, args, region_id, sku_map, shipping_option, id_map=None):
+    """
+    Các bước sync một order (draft -> finalize -> fulfillment, rollback khi finalize lỗi), viết một lần
+    cho cả bản sync và async: mỗi lời gọi Medusa được yield dạng (method, args, kwargs), _drive / _drive_async
+    gửi kết quả về (hoặc throw exception của lời gọi). Giá trị return là result tuple của order.
+    Retry (5xx, lỗi kết nối) được xử lý trong connector, worker không tự retry.
+    """
+    inc = order.get("increment_id") or order.get("entity_id")
+    result, payload = _prepare_order(order, args, region_id, sku_map, shipping_option)
+    if result:
+        return result
+
+    # STEP 2: Create draft order (retry 5xx/kết nối do connector đảm nhận, nhờ Idempotency-Key)
+    try:
+        log_info(f"   [STEP 2] Creating Draft Order...", indent=1)
+        res = yield ("create_draft_order", (payload,), {"idempotency_key": f"order:{inc}"})
+    except MigrationStopped:
+        raise
+    except Exception as e:
+        return _draft_order_failed(inc, e)
+    draft, result = _record_draft(order, res, id_map)
+    if result:
+        return result
+
+    draft_id = draft["id"]
+    if not getattr(args, 'finalize_orders', False):
         log_success(f"   ✅ Created Draft Order: {draft_id} (Not finalized)", indent=1)
-    
+        return ('success', None)
+
+    # STEP 3: Finalize order
+    try:
+        log_info(f"   [STEP 3] Finalizing order...", indent=1)
+        finalized = yield ("finalize_draft_order", (draft_id,), {})
+        if finalized is None:
+            log_warning(f"   ⚠️ Draft Order {draft_id} created. Finalize not supported/returned empty.", indent=1)
+        else:
+            log_success(f"   ✅ Finalized Order: {draft_id}", indent=1)
+            try:
+                yield ("create_fulfillment", (draft_id, draft.get("items") or []), {})
+                log_success(f"   ✅ Created fulfillment for order {draft_id}", indent=1)
+            except MigrationStopped:
+                raise
+            except Exception as fe:
+                log_warning(f"   ⚠️ Failed to create fulfillment: {fe}", indent=1)
+    except MigrationStopped:
+        raise
+    except Exception as fe:
+        result = _finalize_failed(draft_id, fe)
+        # Rollback: Xóa draft order nếu finalize thất bại và rollback được bật
+        if getattr(args, 'rollback_on_finalize_fail', False):
+            try:
+                log_warning(f"   [ROLLBACK] Attempting to delete draft order {draft_id}...", indent=1)
+                yield ("delete_draft_order", (draft_id,), {})
+                log_success(f"   ✅ Rollback successful: Draft order {draft_id} deleted", indent=1)
+            except MigrationStopped:
+                raise
+            except Exception as rb_e:
+                _rollback_failed(rb_e)
+        return result
+
     return ('success', None)
 
 
-def migrate_orders(magento: MagentoConnector, medusa: MedusaConnector, args, migration_state=None):
+def _sync_single_order(order, magento: MagentoConnector, medusa: MedusaConnector, args, region_id, sku_map, shipping_option, id_map=None):
+    """Sync single order with rollback support."""
+    return _drive(_order_steps(order, args, region_id, sku_map, shipping_option, id_map), medusa)
+
+
+async def _sync_single_order_async(order, magento, medusa, args, region_id, sku_map, shipping_option, id_map=None):
+    """Bản asyncio của _sync_single_order (dùng AsyncMedusaConnector)."""
+    return await _drive_async(_order_steps(order, args, region_id, sku_map, shipping_option, id_map), medusa)
+
+
+def migrate_orders(magento: MagentoConnector, medusa: MedusaConnector, args, migration_state=None, sku_gate=None):
     log_section("ORDER MIGRATION PHASE")
     
     # Check stop requested before starting
@@ -248,20 +279,29 @@ def migrate_orders(magento: MagentoConnector, medusa: MedusaConnector, args, mig
         log_info(f"Delta migration enabled: Only migrating orders updated after {updated_at_from}")
     
     log_info("Fetching orders from Magento...")
-    orders = extract_orders(magento, updated_at_from=updated_at_from)
-    
+    order_ids = None
     if getattr(args, "order_ids", None):
-        order_ids = {x.strip() for x in str(args.order_ids).split(",") if x.strip()}
+        order_ids = [x.strip() for x in str(args.order_ids).split(",") if x.strip()]
         log_info(f"Filter by IDs: {order_ids}", indent=1)
-        orders = [o for o in orders if str(o.get("entity_id")) in order_ids or str(o.get("increment_id")) in order_ids]
-    
-    orders = _limit_iter(orders, args.limit)
-    order_count = len(orders)
-    log_info(f"Found {order_count} orders to migrate...\n")
-    
-    if order_count == 0:
+
+    checkpoint = get_checkpoint(args)
+
+    # Stream: Magento được đọc theo từng trang trong lúc load, không gom hết vào bộ nhớ
+    orders = iter_orders(magento, updated_at_from=updated_at_from, ids=order_ids,
+                         fanout=getattr(args, "extract_fanout", 4), cursor=_use_cursor(args),
+                         start_after=keyset_start(checkpoint, "order", args, order_ids))
+    if checkpoint is not None:
+        # Order đã xong trong run trước bị bỏ qua trước transform / POST
+        orders = checkpoint.resume_stream("order", orders, key=lambda o: o.get("entity_id"),
+                                          track_cursor=_use_cursor(args) and not order_ids)
+    
+    orders = iter(_limit_iter(orders, args.limit))
+    first_order = next(orders, None)
+    if first_order is None:
+        log_resume(checkpoint, "order", "orders")
         log_warning("No orders to migrate.")
         return
+    orders = itertools.chain([first_order], orders)
     
     # STOP CHECK
     if check_pause_signal(): return
@@ -286,11 +326,25 @@ def migrate_orders(magento: MagentoConnector, medusa: MedusaConnector, args, mig
     if check_pause_signal(): return
     if check_stop_signal(): return
 
-    # Get SKU map
-    log_info("Fetching existing variants from Medusa...")
-    all_variants = _fetch_all_variants(medusa)
-    sku_map = {v.get("sku"): v.get("id") for v in all_variants if v.get("sku") and v.get("id")}
-    log_success(f"Found {len(sku_map)} variants for mapping.", indent=1)
+    # Get SKU map: ưu tiên mapping đã lưu (product phase / lần chạy trước), tránh liệt kê lại mọi product
+    # Store chỉ được tin khi đầy đủ: store dở dang (crash giữa chừng) sẽ biến variant thiếu thành custom line item
+    id_map = get_id_map(args, medusa)
+    if id_map is not None and id_map.is_complete("variant"):
+        sku_map = id_map.all("variant")
+        log_success(f"Loaded {len(sku_map)} variant mappings from {id_map.path}.", indent=1)
+    else:
+        log_info("Fetching existing variants from Medusa...")
+        all_variants = _fetch_all_variants(medusa)
+        sku_map = id_map.all("variant") if id_map is not None else {}
+        sku_map.update({v.get("sku"): v.get("id") for v in all_variants if v.get("sku") and v.get("id")})
+        if id_map is not None:
+            id_map.put_many("variant", sku_map.items())
+            id_map.mark_complete("variant")
+        log_success(f"Found {len(sku_map)} variants for mapping.", indent=1)
+    if sku_gate is not None:
+        # --parallel-phases: product phase vẫn đang chạy, order chờ tới khi SKU của nó được map
+        sku_gate.attach(sku_map)
+        orders = sku_gate.hold(orders, sku_map)
     
     # STOP CHECK
     if check_pause_signal(): return
@@ -322,57 +376,68 @@ def migrate_orders(magento: MagentoConnector, medusa: MedusaConnector, args, mig
     
     log_info("Starting transformation & sync process...\n")
     
-    with ThreadPoolExecutor(max_workers=args.max_workers or 10) as executor:
-        futures = {
-            executor.submit(_sync_single_order_with_retry, o, magento, medusa, args, region_id, sku_map, shipping_option): o
-            for o in orders
-        }
+    processed_count = 0
+
+    def _record(order, res_tuple):
+        nonlocal processed_count, count_success, count_ignore, count_fail, checksum_mismatches
+        processed_count += 1
+        if isinstance(res_tuple, tuple):
+            status, reason = res_tuple
+        else:
+            status, reason = res_tuple, None
         
-        processed_count = 0
-        processed_count = 0
-        for future in as_completed(futures):
-            # Check pause signal
-            if check_pause_signal(): pass
-
-            # Check stop requested
-            if (migration_state and migration_state.get('stop_requested')) or check_stop_signal():
-                log_warning("🛑 Stop requested by user. Cancelling remaining tasks...")
-                # Cancel pending futures
-                for f in futures:
-                    if not f.done():
-                        f.cancel()
-                log_warning(f"Migration stopped. Processed {processed_count}/{order_count} orders before stop.")
-                break
-            
-            processed_count += 1
-            order = futures[future]
-            inc = order.get("increment_id") or order.get("entity_id")
-            
-            try:
-                res_tuple = future.result()
-                if isinstance(res_tuple, tuple):
-                    status, reason = res_tuple
-                else:
-                    status, reason = res_tuple, None
-                
-                if status == 'success':
-                    count_success += 1
-                    # Check if checksum warning
-                    payload = transform_order(order, region_id, sku_map, shipping_option)
-                    checksum_valid, _, _, _ = _validate_checksum(payload, order)
-                    if not checksum_valid:
-                        checksum_mismatches += 1
-                elif status == 'ignore':
-                    count_ignore += 1
-                else:
-                    count_fail += 1
-            except Exception as e:
-                log_error(f"Unexpected error for '{inc}': {e}")
-                count_fail += 1
-            
-            if processed_count % 5 == 0 or processed_count == order_count:
-                log_info(f"Progress: {processed_count}/{order_count} orders processed...")
-    
+        if status == 'success':
+            count_success += 1
+            # Check if checksum warning
+            payload = transform_order(order, region_id, sku_map, shipping_option)
+            checksum_valid, _, _, _ = _validate_checksum(payload, order)
+            if not checksum_valid:
+                checksum_mismatches += 1
+        elif status == 'ignore':
+            count_ignore += 1
+        else:
+            count_fail += 1
+        if checkpoint is not None:
+            if status in ('success', 'ignore'):
+                checkpoint.complete("order", order.get("entity_id"))
+            else:
+                checkpoint.fail("order", order.get("entity_id"))
+
+        if processed_count % 5 == 0:
+            log_info(f"Progress: {processed_count} orders processed...")
+
+    def _record_error(order, e):
+        nonlocal processed_count, count_fail
+        processed_count += 1
+        inc = order.get("increment_id") or order.get("entity_id")
+        log_error(f"Unexpected error for '{inc}': {e}")
+        count_fail += 1
+        if checkpoint is not None:
+            checkpoint.fail("order", order.get("entity_id"))
+
+    if getattr(args, 'migrate_invoices', False):
+        orders = _attach_invoices(orders, magento, args)
+    orders = _prefetch(orders, maxsize=(args.max_workers or 10) * 20)
+
+    if use_async_engine(args):
+        run_async_pool(
+            orders,
+            lambda o, a_magento, a_medusa: _sync_single_order_async(o, a_magento, a_medusa, args, region_id, sku_map, shipping_option, id_map),
+            magento, medusa, args,
+            on_result=_record, on_error=_record_error, label="order tasks",
+        )
+    else:
+        BoundedScheduler(
+            args.max_workers, label="order tasks",
+            stop_check=lambda: bool(migration_state and migration_state.get('stop_requested')),
+        ).run(
+            orders,
+            lambda o: _sync_single_order(o, magento, medusa, args, region_id, sku_map, shipping_option, id_map),
+            on_result=_record, on_error=_record_error,
+        )
+    
+    log_info(f"Processed {processed_count} orders.")
+    log_resume(checkpoint, "order", "orders")
     log_summary("Order Migration", count_success, count_ignore, count_fail)
     
     if checksum_mismatches > 0:
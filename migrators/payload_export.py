@@ -0,0 +1,168 @@
+import argparse
+import glob
+import gzip
+import json
+import os
+import queue
+import threading
+
+EXPORT_DIR = "exports"
+
+def _open_text(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+class PayloadWriter:
+    """
+    Ghi payload dry-run ra file JSONL (mỗi dòng một {"entity", "payload"}) trên một thread nền duy nhất.
+    Worker serialize payload ngay trong write() (payload có thể bị sửa tiếp sau đó, vd. merge invoice
+    vào metadata) rồi put() dòng JSON vào queue (có giới hạn); thread nền chỉ làm I/O, không cần lock:
+    chi phí I/O tuyến tính theo số record. compress=True ghi .jsonl.gz;
+    max_bytes > 0 thì xoay sang file mới khi phần hiện tại vượt ngưỡng (tính theo byte JSON trước nén).
+    """
+    _END = object()
+
+    def __init__(self, prefix, compress=False, max_bytes=0, queue_size=10000):
+        directory = os.path.dirname(prefix)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.prefix = prefix
+        self.compress = compress
+        self.max_bytes = int(max_bytes or 0)
+        self.paths = []
+        self.written = 0
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._fh = None
+        self._part_bytes = 0
+        self._error = None
+        self.skipped = 0
+        self._skipped_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="payload-writer", daemon=True)
+        self._thread.start()
+
+    def _part_path(self, part):
+        suffix = ".jsonl.gz" if self.compress else ".jsonl"
+        return f"{self.prefix}{suffix}" if part == 0 else f"{self.prefix}.{part}{suffix}"
+
+    def _rotate(self):
+        if self._fh is not None:
+            self._fh.close()
+        path = self._part_path(len(self.paths))
+        self._fh = _open_text(path, "w")
+        self._part_bytes = 0
+        self.paths.append(path)
+
+    def write(self, entity_type, payload):
+        try:
+            line = json.dumps({"entity": entity_type, "payload": payload}, ensure_ascii=False, default=str) + "\n"
+        except Exception as e:
+            # Payload không serialize được chỉ bỏ qua payload đó, không dừng export
+            with self._skipped_lock:
+                self.skipped += 1
+            print(f"⚠️ Payload export skipped a {entity_type} payload: {e}")
+            return
+        self._queue.put(line)
+
+    def _run(self):
+        while True:
+            entry = self._queue.get()
+            if entry is self._END:
+                break
+            if self._error is not None:
+                continue
+            try:
+                line = entry
+                if self._fh is None or (self.max_bytes and self._part_bytes >= self.max_bytes):
+                    self._rotate()
+                self._fh.write(line)
+                self._part_bytes += len(line.encode("utf-8"))
+                self.written += 1
+            except Exception as e:
+                # Lỗi ghi file không được làm hỏng dry-run; báo một lần khi close()
+                self._error = e
+        if self._fh is not None:
+            self._fh.close()
+
+    def close(self):
+        """Ghi nốt các payload đang chờ, đóng file và trả về danh sách file đã tạo."""
+        self._queue.put(self._END)
+        self._thread.join()
+        if self._error is not None:
+            print(f"⚠️ Payload export failed after {self.written} payloads: {self._error}")
+        if self.skipped:
+            print(f"⚠️ Payload export skipped {self.skipped} unserializable payloads")
+        return list(self.paths)
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+def get_payload_writer(args):
+    """Writer dùng chung cho mọi phase của run (exports/payloads_<run_id>.jsonl[.gz])."""
+    run_id = getattr(args, "run_id", None) or "latest"
+    with _writers_lock:
+        writer = _writers.get(run_id)
+        if writer is None:
+            writer = PayloadWriter(
+                os.path.join(EXPORT_DIR, f"payloads_{run_id}"),
+                compress=getattr(args, "dry_run_gzip", False),
+                max_bytes=int(getattr(args, "dry_run_max_mb", 0) or 0) * 1024 * 1024,
+            )
+            _writers[run_id] = writer
+        return writer
+
+def close_payload_writers():
+    with _writers_lock:
+        for writer in _writers.values():
+            paths = writer.close()
+            if paths:
+                print(f"📝 Exported {writer.written} payloads to {', '.join(paths)}")
+        _writers.clear()
+
+def _part_sort_key(path):
+    # payloads_x.jsonl trước payloads_x.1.jsonl, payloads_x.2.jsonl, ...
+    name = os.path.basename(path).split(".jsonl")[0]
+    head, _, part = name.rpartition(".")
+    return (head or name, int(part) if head and part.isdigit() else 0)
+
+def iter_payloads(paths):
+    """Đọc lần lượt các dòng {"entity", "payload"} từ một hoặc nhiều file JSONL (.gz cũng được)."""
+    for path in paths:
+        with _open_text(path, "r") as fh:
+            for line in fh:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+def convert_to_json_array(paths, output):
+    """
+    Chuyển export JSONL sang định dạng cũ (một JSON array, indent=2) theo kiểu streaming,
+    không nạp toàn bộ payload vào bộ nhớ. Trả về số payload đã ghi.
+    """
+    count = 0
+    with open(output, "w", encoding="utf-8") as out:
+        out.write("[")
+        for entry in iter_payloads(paths):
+            out.write(",\n" if count else "\n")
+            body = json.dumps(entry, ensure_ascii=False, indent=2)
+            out.write("\n".join("  " + line for line in body.splitlines()))
+            count += 1
+        out.write("\n]\n" if count else "]\n")
+    return count
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert a JSONL dry-run export to the legacy JSON array format")
+    parser.add_argument("run_id", help="Run ID of the export (exports/payloads_<run_id>*.jsonl[.gz])")
+    parser.add_argument("-o", "--output", default=None, help="Output file (default: exports/payloads_<run_id>.json)")
+    args = parser.parse_args(argv)
+
+    prefix = os.path.join(EXPORT_DIR, f"payloads_{args.run_id}")
+    paths = sorted(set(glob.glob(prefix + ".jsonl*") + glob.glob(prefix + ".*.jsonl*")), key=_part_sort_key)
+    if not paths:
+        parser.error(f"No export found for run {args.run_id} in {EXPORT_DIR}/")
+    output = args.output or prefix + ".json"
+    count = convert_to_json_array(paths, output)
+    print(f"Wrote {count} payloads from {len(paths)} file(s) to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+import threading
+from connectors.control import MigrationStopped, migration_control
+from migrators.category_migrator import migrate_categories
+from migrators.customer_migrator import migrate_customers
+from migrators.product_migrator import migrate_products
+from migrators.order_migrator import migrate_orders
+from migrators.id_map import get_id_map
+from migrators.utils import check_stop_signal, log_info, log_error, log_warning
+
+class PhaseScheduler:
+    """
+    Chạy các phase theo DAG: mỗi phase một thread, bắt đầu ngay khi các phase trong `after` kết thúc
+    (thành công hay lỗi). Phase chưa bắt đầu bị bỏ qua khi có lệnh stop.
+    run() chờ tất cả rồi raise lại lỗi đầu tiên (nếu có), giống chạy tuần tự.
+    """
+    def __init__(self):
+        self._phases = {}
+
+    def add(self, name, fn, after=()):
+        self._phases[name] = (fn, tuple(after))
+
+    def run(self):
+        done = {name: threading.Event() for name in self._phases}
+        results = {}
+        errors = []
+
+        def _run(name):
+            fn, after = self._phases[name]
+            try:
+                for dep in after:
+                    if dep in done:
+                        done[dep].wait()
+                if check_stop_signal():
+                    return
+                results[name] = fn()
+            except MigrationStopped:
+                log_warning(f"🛑 Phase '{name}' stopped.")
+            except Exception as e:
+                log_error(f"Phase '{name}' failed: {e}")
+                errors.append(e)
+            finally:
+                done[name].set()
+
+        threads = [threading.Thread(target=_run, args=(name,), name=f"phase-{name}") for name in self._phases]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+        return results
+
+class SkuGate:
+    """
+    Cho order chạy song song với product phase: order chỉ được đưa vào xử lý khi mọi SKU của nó đã có
+    variant mapping, hoặc khi product phase đã kết thúc (SKU còn thiếu thì không bao giờ có nữa).
+    Product phase publish() mapping mới (qua id_map.subscribe), close() khi xong.
+    Order chưa đủ SKU được giữ trong buffer (theo SKU còn thiếu, tối đa `max_waiting` order) để các order
+    phía sau đã đủ SKU vẫn đi tiếp; buffer đầy thì stream chờ tới khi có order được giải phóng.
+    """
+    MAX_WAITING = 1000
+
+    def __init__(self, max_waiting=None):
+        self.max_waiting = max(1, int(max_waiting or self.MAX_WAITING))
+        self._cond = threading.Condition()
+        self._known = {}
+        self._maps = []
+        self._inboxes = []
+        self._closed = False
+
+    def publish(self, pairs):
+        with self._cond:
+            for sku, variant_id in pairs:
+                self._known[sku] = variant_id
+                for sku_map in self._maps:
+                    sku_map[sku] = variant_id
+                for inbox in self._inboxes:
+                    inbox.append(sku)
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def attach(self, sku_map):
+        """Gắn sku_map của order phase: nhận các mapping đã và sẽ được publish."""
+        with self._cond:
+            sku_map.update(self._known)
+            self._maps.append(sku_map)
+
+    def _wait(self, inbox):
+        # Gọi khi đang giữ lock: chờ SKU mới, gate đóng hoặc lệnh stop
+        while not inbox and not self._closed:
+            if migration_control.is_stopped():
+                raise MigrationStopped("Migration stopped")
+            self._cond.wait(timeout=0.5)
+
+    def hold(self, orders, sku_map):
+        """
+        Stream lại `orders`: order đủ SKU đi qua ngay, order thiếu SKU chờ trong buffer và được trả ra
+        (theo thứ tự stream) ngay khi SKU cuối cùng nó cần được publish, hoặc khi gate đóng.
+        """
+        waiting = {}   # seq -> [order, số SKU còn thiếu]
+        by_sku = {}    # SKU còn thiếu -> [seq của order đang chờ nó]
+        inbox = []
+        with self._cond:
+            self._inboxes.append(inbox)
+
+        def _released():
+            # Gọi khi đang giữ lock: các order vừa đủ SKU (hoặc tất cả nếu gate đã đóng)
+            if self._closed:
+                seqs = list(waiting)
+                by_sku.clear()
+            else:
+                seqs = []
+                arrived, inbox[:] = list(inbox), []
+                for sku in arrived:
+                    for seq in by_sku.pop(sku, ()):
+                        waiting[seq][1] -= 1
+                        if not waiting[seq][1]:
+                            seqs.append(seq)
+            return [waiting.pop(seq)[0] for seq in sorted(seqs)]
+
+        try:
+            for seq, order in enumerate(orders):
+                skus = {it.get("sku") for it in order.get("items") or [] if it.get("sku")}
+                with self._cond:
+                    released = _released()
+                    missing = set() if self._closed else skus.difference(sku_map)
+                    if missing:
+                        log_info(f"Order {order.get('increment_id') or order.get('entity_id')} waiting for product variants...", indent=1)
+                        waiting[seq] = [order, len(missing)]
+                        for sku in missing:
+                            by_sku.setdefault(sku, []).append(seq)
+                        while len(waiting) >= self.max_waiting and not released:
+                            self._wait(inbox)
+                            released = _released()
+                yield from released
+                if not missing:
+                    yield order
+            while waiting:
+                with self._cond:
+                    self._wait(inbox)
+                    released = _released()
+                yield from released
+        finally:
+            with self._cond:
+                self._inboxes.remove(inbox)
+
+def run_parallel_phases(magento, medusa, args, entities, migration_state=None):
+    """
+    --parallel-phases: categories, customers, products và orders chạy đồng thời.
+    - Customer không phụ thuộc phase nào.
+    - Product làm phần chuẩn bị (sales channel, stock location, index) song song với category,
+      rồi chờ category mapping trước khi tạo product.
+    - Order được stream ngay khi SKU của nó đã được map (SkuGate), không chờ hết product phase.
+    """
+    scheduler = PhaseScheduler()
+    category_map = {}
+    categories_ready = threading.Event()
+    id_map = get_id_map(args, medusa)
+    # Mapping variant mới chỉ được công bố qua id_map; không có id_map (dry-run, --id-map "")
+    # thì order phase chờ cả product phase như cạnh DAG thông thường
+    sku_gate = SkuGate() if "orders" in entities and "products" in entities and id_map is not None else None
+
+    if "categories" in entities:
+        def _categories():
+            try:
+                category_map.update(migrate_categories(magento, medusa, args) or {})
+            finally:
+                categories_ready.set()
+        scheduler.add("categories", _categories)
+    else:
+        categories_ready.set()
+
+    if "customers" in entities:
+        scheduler.add("customers", lambda: migrate_customers(magento, medusa, args))
+
+    if "products" in entities:
+        def _products():
+            if sku_gate is not None:
+                id_map.subscribe("variant", sku_gate.publish)
+            try:
+                migrate_products(magento, medusa, args, mg_to_medusa_map=category_map, categories_ready=categories_ready)
+            finally:
+                if sku_gate is not None:
+                    sku_gate.close()
+        scheduler.add("products", _products)
+
+    if "orders" in entities:
+        scheduler.add(
+            "orders",
+            lambda: migrate_orders(magento, medusa, args, migration_state=migration_state, sku_gate=sku_gate),
+            after=() if sku_gate is not None else ("products",),
+        )
+
+    return scheduler.run()
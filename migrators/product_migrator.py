@@ -1,19 +1,26 @@
+import hashlib
 import json
 import requests
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from connectors.magento_connector import MagentoConnector
 from connectors.medusa_connector import MedusaConnector
-from extractors.products import extract_products
+from connectors.control import MigrationStopped
+from extractors.products import iter_products
 from extractors.categories import extract_categories
-from transformers.product_transformer import transform_product
+from transformers.product_transformer import transform_product, transform_products
 from transformers.category_transformer import transform_category_as_product_category
 from migrators.utils import (
-    _limit_iter, _is_duplicate_http, _resp_json_or_text, 
-    _fetch_all_product_categories, _is_http_status, log_dry_run,
+    _limit_iter, _use_cursor, _is_duplicate_http, _resp_json_or_text, 
+    _fetch_all_product_categories, _load_category_mappings, _is_http_status, log_dry_run, _prefetch, _batched,
     handle_medusa_api_error, log_info, log_success, log_warning, 
     log_error, log_step, log_progress, log_section, log_summary, get_timestamp,
     check_stop_signal, check_pause_signal
 )
+from migrators.async_engine import use_async_engine, run_async_pool
+from migrators.scheduler import BoundedScheduler
+from migrators.inventory import InventoryIndex, InventoryLoader
+from migrators.existing_index import ExistingProducts
+from migrators.id_map import get_id_map
+from migrators.checkpoint import get_checkpoint, keyset_start, log_resume
 
 def _fetch_all_magento_categories(magento: MagentoConnector, args):
     log_info("Fetching Magento categories for mapping...", indent=1)
@@ -22,11 +29,7 @@ def _fetch_all_magento_categories(magento: MagentoConnector, args):
     log_success(f"Fetched {len(cat_map)} categories successfully.", indent=1)
     return cat_map
 
-def _sync_single_product(product, magento: MagentoConnector, medusa: MedusaConnector, args, mg_to_medusa_map, mg_category_map, sales_channel_id, shipping_profile_id, stock_location_id=None):
-    product_name = product.get('name', 'N/A')
-    product_sku = product.get('sku', 'N/A')
-    print(f"[{get_timestamp()}] Syncing: {product_name} (SKU: {product_sku})")
-
+def _resolve_product_categories(product, mg_to_medusa_map, mg_category_map):
     product_categories = []
     links = (product.get("extension_attributes") or {}).get("category_links") or []
     
@@ -43,120 +46,185 @@ def _sync_single_product(product, magento: MagentoConnector, medusa: MedusaConne
         
         if medusa_cat_id:
             product_categories.append({"id": medusa_cat_id})
+    return product_categories
 
-    payload = transform_product(
+def _build_product_payload(product, magento_base_url, mg_to_medusa_map, mg_category_map, sales_channel_id, shipping_profile_id):
+    return transform_product(
         product, 
-        magento.base_url, 
-        categories=product_categories,
+        magento_base_url, 
+        categories=_resolve_product_categories(product, mg_to_medusa_map, mg_category_map),
         sales_channel_id=sales_channel_id,
         shipping_profile_id=shipping_profile_id
     )
 
+def _skip_if_existing(product, existing=None, id_map=None):
+    """Trả về kết quả 'ignore' nếu product đã có trên Medusa (tra index cục bộ, không gọi API)."""
+    match = existing.match(product) if existing is not None else None
+    if match is None:
+        return None
+    product_id, variants = match
+    if id_map is not None:
+        id_map.put("product", product.get("id"), product_id)
+        id_map.put_many("variant", variants)
+    log_info(f"[SKIP] Product '{product.get('name', 'N/A')}' (SKU: {product.get('sku')}) already exists.", indent=1)
+    return ('ignore', "Already exists in Medusa")
+
+def _on_product_created(product, created_product, inventory_loader=None, id_map=None, existing=None):
+    """Lưu mapping product / variant (theo SKU) và đẩy variant sang stage tồn kho."""
+    if existing is not None:
+        existing.add(created_product)
+    if id_map is not None:
+        id_map.put("product", product.get("id"), created_product.get("id"))
+        id_map.put_many("variant", [(v.get("sku"), v.get("id")) for v in created_product.get("variants") or [] if v.get("sku")])
+    if inventory_loader is not None:
+        inventory_loader.submit(product, created_product)
+
+def _prepare_product(product, magento_base_url, args, mg_to_medusa_map, mg_category_map, sales_channel_id, shipping_profile_id, id_map=None, existing=None):
+    """
+    Bước chung của bản sync / async trước khi POST: skip nếu đã có, transform, dry-run.
+    Trả về (result, None) nếu không cần gọi Medusa, ngược lại (None, payload).
+    """
+    print(f"[{get_timestamp()}] Syncing: {product.get('name', 'N/A')} (SKU: {product.get('sku', 'N/A')})")
+
+    skipped = _skip_if_existing(product, existing, id_map)
+    if skipped:
+        return skipped, None
+
+    payload = _build_product_payload(product, magento_base_url, mg_to_medusa_map, mg_category_map, sales_channel_id, shipping_profile_id)
+
     log_dry_run(payload, "product", args)
     if args.dry_run:
-        return ('ignore', "Dry run enabled")
+        return ('ignore', "Dry run enabled"), None
+    return None, payload
+
+def _product_created(product, res):
+    log_success(f"Product '{product.get('name', 'N/A')}' synced.", indent=1)
+    return res.get("product") or res
+
+def _product_failed(product, e):
+    product_name = product.get('name', 'N/A')
+    if isinstance(e, requests.exceptions.HTTPError):
+        return handle_medusa_api_error(e, "Product", product_name)
+    reason = str(e)
+    log_error(f"Product '{product_name}': {reason}", indent=1)
+    return ('fail', reason)
 
+def _sync_single_product(product, magento: MagentoConnector, medusa: MedusaConnector, args, mg_to_medusa_map, mg_category_map, sales_channel_id, shipping_profile_id, inventory_loader=None, id_map=None, existing=None):
+    result, payload = _prepare_product(product, magento.base_url, args, mg_to_medusa_map, mg_category_map,
+                                       sales_channel_id, shipping_profile_id, id_map, existing)
+    if result:
+        return result
     try:
         res = medusa.create_product(payload, idempotency_key=f"product:{product.get('id')}")
-        log_success(f"Product '{product_name}' synced.", indent=1)
-        
-        # INVENTORY SYNC
-        if stock_location_id and not args.dry_run:
-            try:
-                # Extract stock quantity from Magento
-                stock_item = (product.get("extension_attributes") or {}).get("stock_item") or {}
-                qty = int(stock_item.get("qty", 0))
-                
-                # Extract variants from Medusa response
-                # Medusa v2 response structure for created product might differ, but usually it's {'product': {...}}
-                created_product = res.get("product") or res
-                product_id = created_product.get("id")
-                variants = created_product.get("variants") or []
-                
-                if not variants and product_id:
-                     # If variants not in response, try to fetch them? 
-                     # For now assume they are there as they were in the payload
-                     pass
-
-                for variant in variants:
-                    v_id = variant.get("id")
-                    v_sku = variant.get("sku")
-                    
-                    if not v_sku:
-                        continue
-
-                    # 1. Check if inventory item already exists
-                    inv_item = medusa.get_inventory_item_by_sku(v_sku)
-                    
-                    if not inv_item:
-                        # Create inventory item if it doesn't exist
-                        inv_payload = {
-                            "sku": v_sku,
-                            "title": f"Inventory for {product_name} - {v_sku}",
-                            "description": f"Inventory for {product_name} - {v_sku}",
-                            "metadata": {"magento_id": str(product.get("id"))}
-                        }
-                        try:
-                            inv_res = medusa.create_inventory_item(inv_payload)
-                            inv_item = inv_res.get("inventory_item") or inv_res
-                        except Exception as e:
-                            # If it still fails, check again (race condition)
-                            inv_item = medusa.get_inventory_item_by_sku(v_sku)
-                            if not inv_item:
-                                log_warning(f"Failed to create inventory item for SKU {v_sku}: {e}", indent=2)
-                                continue
-                    
-                    inv_id = inv_item.get("id")
-                    
-                    if inv_id:
-                        # 2. Link variant to inventory item
-                        try:
-                            # Check if already linked
-                            existing_links = variant.get("inventory_items") or variant.get("inventory") or []
-                            is_linked = any(l.get("inventory_item_id") == inv_id or l.get("id") == inv_id for l in existing_links)
-                            
-                            if not is_linked:
-                                medusa.link_variant_to_inventory_item(product_id, v_id, inv_id, quantity=1)
-                        except Exception as link_e:
-                            # If linked already, ignore (check for common "exists" error strings)
-                            err_str = str(link_e).lower()
-                            if "already exists" not in err_str and "duplicate" not in err_str and "400" not in err_str and "409" not in err_str:
-                                log_warning(f"Link failed for variant {v_sku}: {link_e}", indent=2)
-                        
-                        # 3. Add location level with quantity
-                        try:
-                            medusa.add_inventory_item_location_level(inv_id, stock_location_id, qty)
-                        except Exception as loc_e:
-                            err_str = str(loc_e).lower()
-                            if "already exists" not in err_str and "duplicate" not in err_str and "400" not in err_str and "409" not in err_str:
-                                log_warning(f"Location level failed for SKU {v_sku}: {loc_e}", indent=2)
-                        else:
-                            log_success(f"Inventory synced for variant {v_sku}: {qty} units at location {stock_location_id}", indent=2)
-
-            except Exception as inv_e:
-                log_warning(f"Inventory sync failed for '{product_name}': {inv_e}", indent=2)
+        _on_product_created(product, _product_created(product, res), inventory_loader, id_map, existing)
+        return ('success', None)
+    except MigrationStopped:
+        raise
+    except Exception as e:
+        return _product_failed(product, e)
 
+async def _sync_single_product_async(product, magento_base_url, medusa, args, mg_to_medusa_map, mg_category_map, sales_channel_id, shipping_profile_id, inventory_loader=None, id_map=None, existing=None):
+    """Bản asyncio của _sync_single_product (dùng AsyncMedusaConnector)."""
+    result, payload = _prepare_product(product, magento_base_url, args, mg_to_medusa_map, mg_category_map,
+                                       sales_channel_id, shipping_profile_id, id_map, existing)
+    if result:
+        return result
+    try:
+        res = await medusa.create_product(payload, idempotency_key=f"product:{product.get('id')}")
+        created = _product_created(product, res)
+        _on_product_created(product, created, None, id_map, existing)
+        if inventory_loader is not None:
+            # submit() chặn khi stage tồn kho đầy: trên event loop phải dùng bản async
+            await inventory_loader.submit_async(product, created)
         return ('success', None)
+    except MigrationStopped:
+        raise
+    except Exception as e:
+        return _product_failed(product, e)
+
+def _batch_idempotency_key(products):
+    """Key theo toàn bộ id của lô: hai lô khác nhau (vd. sau khi bỏ qua product ở giữa) không bao giờ trùng key."""
+    digest = hashlib.sha1(",".join(str(p.get("id")) for p in products).encode("utf-8")).hexdigest()
+    return f"product-batch:{len(products)}:{digest}"
+
+def _sync_product_batch(products, magento: MagentoConnector, medusa: MedusaConnector, args, mg_to_medusa_map, mg_category_map, sales_channel_id, shipping_profile_id, inventory_loader=None, id_map=None, existing=None):
+    """
+    Tạo một lô product bằng một request admin/products/batch. Kết quả được map lại theo handle;
+    các item bị batch từ chối (cả lô lỗi hoặc thiếu trong `created`) được tạo lại từng cái qua
+    _sync_single_product. Product đã có trên Medusa (index `existing`) được bỏ qua trước khi gửi.
+    Trả về list (product, result_tuple).
+    """
+    results = []
+    if existing is not None:
+        remaining = []
+        for product in products:
+            skipped = _skip_if_existing(product, existing, id_map)
+            if skipped:
+                results.append((product, skipped))
+            else:
+                remaining.append(product)
+        products = remaining
+        if not products:
+            return results
+
+    payloads = transform_products(
+        products,
+        magento.base_url,
+        resolve_categories=lambda p: _resolve_product_categories(p, mg_to_medusa_map, mg_category_map),
+        sales_channel_id=sales_channel_id,
+        shipping_profile_id=shipping_profile_id,
+    )
+    if args.dry_run:
+        for payload in payloads:
+            log_dry_run(payload, "product", args)
+        return [(p, ('ignore', "Dry run enabled")) for p in products]
+
+    print(f"[{get_timestamp()}] Batch creating {len(products)} products...")
+    created_by_handle = {}
+    try:
+        res = medusa.batch_products(create=payloads, idempotency_key=_batch_idempotency_key(products))
+        for created in res.get("created") or []:
+            created_by_handle[created.get("handle")] = created
+    except MigrationStopped:
+        raise
     except requests.exceptions.HTTPError as e:
-        return handle_medusa_api_error(e, "Product", product_name)
+        resp = getattr(e, "response", None)
+        log_warning(f"Batch of {len(products)} products rejected (HTTP {resp.status_code if resp is not None else 'unknown'}). Falling back to single creates...", indent=1)
     except Exception as e:
-        reason = str(e)
-        log_error(f"Product '{product_name}': {reason}", indent=1)
-        return ('fail', reason)
+        log_warning(f"Batch of {len(products)} products failed: {e}. Falling back to single creates...", indent=1)
+
+    for product, payload in zip(products, payloads):
+        created = created_by_handle.get(payload.get("handle"))
+        if created is None:
+            results.append((product, _sync_single_product(
+                product, magento, medusa, args, mg_to_medusa_map, mg_category_map, sales_channel_id, shipping_profile_id, inventory_loader, id_map, existing
+            )))
+            continue
+        log_dry_run(payload, "product", args)
+        log_success(f"Product '{product.get('name', 'N/A')}' synced (batch).", indent=1)
+        _on_product_created(product, created, inventory_loader, id_map, existing)
+        results.append((product, ('success', None)))
+    return results
 
-def migrate_products(magento: MagentoConnector, medusa: MedusaConnector, args, mg_to_medusa_map=None):
+def migrate_products(magento: MagentoConnector, medusa: MedusaConnector, args, mg_to_medusa_map=None, categories_ready=None):
     log_section("PRODUCT MIGRATION PHASE")
-    print(f"[{get_timestamp()}] Fetching products from Magento...")
+    print(f"[{get_timestamp()}] Preparing product stream from Magento...")
     
     p_ids = None
     if getattr(args, "product_ids", None):
         p_ids = [x.strip() for x in str(args.product_ids).split(",") if x.strip()]
         log_info(f"Filter by IDs: {p_ids}", indent=1)
 
-    products = extract_products(magento, ids=p_ids)
+    checkpoint = get_checkpoint(args)
+
+    # Stream: Magento được đọc theo từng trang trong lúc load, không gom hết vào bộ nhớ
+    products = iter_products(magento, ids=p_ids, fanout=getattr(args, "extract_fanout", 4), cursor=_use_cursor(args),
+                             start_after=keyset_start(checkpoint, "product", args, p_ids))
+    if checkpoint is not None:
+        # Product đã xong trong run trước bị bỏ qua trước transform / POST
+        products = checkpoint.resume_stream("product", products, key=lambda p: p.get("id"),
+                                            track_cursor=_use_cursor(args) and not p_ids)
     products = _limit_iter(products, args.limit)
-    product_count = len(products)
-    print(f"[{get_timestamp()}] Found {product_count} products to migrate...\n")
     
     # 1. STOP CHECK
     if check_pause_signal(): return
@@ -213,26 +281,46 @@ def migrate_products(magento: MagentoConnector, medusa: MedusaConnector, args, m
     except Exception as e:
         log_warning(f"Failed to fetch stock locations: {e}. Inventory sync will be skipped.", indent=1)
 
+    inventory_index = None
+    if stock_location_id and not args.dry_run:
+        # Nạp toàn bộ inventory item một lần: tra cứu SKU trong worker chỉ còn là dict hit
+        try:
+            print(f"[{get_timestamp()}] Loading Medusa inventory items into SKU index...")
+            inventory_index = InventoryIndex.load(medusa)
+            log_success(f"Indexed {len(inventory_index)} inventory items.", indent=1)
+        except Exception as e:
+            log_warning(f"Failed to load inventory items: {e}. Falling back to lookups on create conflicts.", indent=1)
+            inventory_index = InventoryIndex()
+
+    existing_products = None
+    if not args.dry_run:
+        # Handle / SKU đã có trên Medusa: product trùng bị bỏ qua cục bộ thay vì POST rồi nhận lỗi duplicate
+        try:
+            print(f"[{get_timestamp()}] Loading existing Medusa products (handle / SKU)...")
+            existing_products = ExistingProducts.load(medusa)
+            log_success(f"Indexed {len(existing_products)} existing products.", indent=1)
+        except Exception as e:
+            log_warning(f"Failed to list existing products: {e}. Duplicates will be detected on create.", indent=1)
+
     if not mg_category_map:
         mg_category_map = _fetch_all_magento_categories(magento, args)
 
+    if categories_ready is not None and not categories_ready.is_set():
+        # --parallel-phases: phần chuẩn bị ở trên chạy song song với category phase
+        print(f"[{get_timestamp()}] Waiting for category mappings...")
+        categories_ready.wait()
+
     # 4. STOP CHECK
     if check_pause_signal(): return
     if check_stop_signal(): return
 
+    id_map = get_id_map(args, medusa)
     if not mg_to_medusa:
-        existing = _fetch_all_product_categories(medusa)
-        for c in existing:
-             meta = c.get("metadata") or {}
-             mg_id = meta.get("magento_id")
-             if mg_id:
-                 mg_to_medusa[mg_id] = c.get("id")
-                 try:
-                     mg_to_medusa[int(mg_id)] = c.get("id")
-                     mg_to_medusa[str(mg_id)] = c.get("id")
-                 except:
-                     pass
-                     
+        loaded, _, source = _load_category_mappings(medusa, id_map)
+        mg_to_medusa.update(loaded)
+        if source == "store":
+            log_info(f"Loaded {id_map.count('category')} category mappings from {id_map.path}", indent=1)
+
     # 5. STOP CHECK
     if check_pause_signal(): return
     if check_stop_signal(): return
@@ -243,47 +331,86 @@ def migrate_products(magento: MagentoConnector, medusa: MedusaConnector, args, m
 
     print(f"[{get_timestamp()}] Starting transformation & sync process...")
     
-    with ThreadPoolExecutor(max_workers=args.max_workers or 10) as executor:
-        futures = {
-            executor.submit(
-                _sync_single_product,
-                product, magento, medusa, args, mg_to_medusa, mg_category_map, sales_channel_id, shipping_profile_id, stock_location_id
-            ): product for product in products
-        }
-
-        processed_count = 0
-        for future in as_completed(futures):
-            # CHECK STOP SIGNAL
-            if check_pause_signal(): pass # If paused, we just waited. If resumed, we continue.
-            
-            if check_stop_signal():
-                log_warning("🛑 Stop signal detected. Cancelling remaining product tasks...", indent=1)
-                for f in futures:
-                    if not f.done():
-                        f.cancel()
-                break
-                
-            processed_count += 1
-            product = futures[future]
-            product_name = product.get('name', 'N/A')
-            
-            try:
-                res_tuple = future.result()
-                if isinstance(res_tuple, tuple):
-                    status, reason = res_tuple
-                else:
-                    status, reason = res_tuple, None
-                    
-                if status == 'success':
-                    count_success += 1
-                elif status == 'ignore':
-                    count_ignore += 1
-                else: 
-                    count_fail += 1
-            except Exception as e:
-                log_error(f"[CRITICAL] Unexpected error for '{product_name}': {e}", indent=1)
-                count_fail += 1
+    def _record(product, res_tuple):
+        nonlocal count_success, count_ignore, count_fail
+        if isinstance(res_tuple, tuple):
+            status, reason = res_tuple
+        else:
+            status, reason = res_tuple, None
             
+        if status == 'success':
+            count_success += 1
+        elif status == 'ignore':
+            count_ignore += 1
+        else: 
+            count_fail += 1
+        if checkpoint is not None:
+            if status in ('success', 'ignore'):
+                checkpoint.complete("product", product.get("id"))
+            else:
+                checkpoint.fail("product", product.get("id"))
+
+    def _record_error(product, e):
+        nonlocal count_fail
+        log_error(f"[CRITICAL] Unexpected error for '{product.get('name', 'N/A')}': {e}", indent=1)
+        count_fail += 1
+        if checkpoint is not None:
+            checkpoint.fail("product", product.get("id"))
+
+    products = _prefetch(products, maxsize=(args.max_workers or 10) * 20)
+    batch_size = int(getattr(args, "product_batch_size", 0) or 0)
+
+    inventory_loader = None
+    if inventory_index is not None:
+        # Stage tồn kho riêng: product worker chỉ đẩy variant vào loader, loader flush theo lô
+        # với concurrency riêng, nên tạo product và nạp tồn kho chạy theo tốc độ của từng bên
+        inventory_loader = InventoryLoader(
+            medusa, inventory_index, stock_location_id,
+            batch_size=getattr(args, "inventory_batch_size", 200),
+            max_workers=getattr(args, "inventory_workers", 2),
+        )
+
+    try:
+        if batch_size > 0:
+            # Batch mode: mỗi worker gửi một lô qua admin/products/batch (luôn chạy trên thread pool)
+            def _record_batch(batch, results):
+                for product, res_tuple in results:
+                    _record(product, res_tuple)
+
+            def _record_batch_error(batch, e):
+                for product in batch:
+                    _record_error(product, e)
+
+            BoundedScheduler(args.max_workers, label="product batches").run(
+                _batched(products, batch_size),
+                lambda batch: _sync_product_batch(
+                    batch, magento, medusa, args, mg_to_medusa, mg_category_map, sales_channel_id, shipping_profile_id, inventory_loader, id_map, existing_products
+                ),
+                on_result=_record_batch, on_error=_record_batch_error,
+            )
+        elif use_async_engine(args):
+            run_async_pool(
+                products,
+                lambda product, a_magento, a_medusa: _sync_single_product_async(
+                    product, magento.base_url, a_medusa, args, mg_to_medusa, mg_category_map, sales_channel_id, shipping_profile_id, inventory_loader, id_map, existing_products
+                ),
+                magento, medusa, args,
+                on_result=_record, on_error=_record_error, label="product tasks",
+            )
+        else:
+            BoundedScheduler(args.max_workers, label="product tasks").run(
+                products,
+                lambda product: _sync_single_product(
+                    product, magento, medusa, args, mg_to_medusa, mg_category_map, sales_channel_id, shipping_profile_id, inventory_loader, id_map, existing_products
+                ),
+                on_result=_record, on_error=_record_error,
+            )
+    finally:
+        if inventory_loader is not None:
+            print(f"[{get_timestamp()}] Flushing inventory stage...")
+            stats = inventory_loader.close()
+            log_info(f"Inventory: {stats['synced']}/{stats['submitted']} SKUs stocked in {stats['batches']} batches, {stats['failed']} failed.")
 
+    log_resume(checkpoint, "product", "products")
     log_summary("Product", count_success, count_ignore, count_fail)
 
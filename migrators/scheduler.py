@@ -0,0 +1,134 @@
+import queue
+import threading
+import time
+from connectors.control import MigrationStopped
+from migrators.utils import check_stop_signal, check_pause_signal, log_warning
+
+_STOP = object()
+
+# Observer (label, item, seconds) cho thời gian xử lý từng item, dùng bởi benchmark / profiling
+_item_observers = []
+
+def add_item_observer(fn):
+    _item_observers.append(fn)
+
+def remove_item_observer(fn):
+    if fn in _item_observers:
+        _item_observers.remove(fn)
+
+def notify_item(label, item, seconds):
+    for fn in list(_item_observers):
+        fn(label, item, seconds)
+
+class BoundedScheduler:
+    """
+    Producer/consumer dùng chung cho các migrator (engine threads).
+    Thread gọi run() là producer: đọc dần `items` và đẩy vào work queue có giới hạn `queue_size`
+    (mặc định 2 * max_workers); `max_workers` consumer thread cố định lấy việc ra và chạy fn(item).
+    Không tạo Future / closure cho mỗi record: bộ nhớ phẳng theo số record, và khi consumer chậm
+    (ví dụ stage tồn kho đầy) producer bị chặn ở put() -> backpressure thật về tới extract.
+    Pause / stop được kiểm tra trước mỗi lần giao việc: khi dừng, producer ngừng giao việc,
+    các item còn trong queue bị bỏ (không xử lý, không ghi nhận), item đang chạy được chờ xong.
+    on_result(item, result) / on_error(item, exc) luôn chạy trên thread gọi run().
+    """
+    def __init__(self, max_workers=10, queue_size=None, label="tasks", stop_check=None):
+        self.max_workers = max(1, int(max_workers or 10))
+        self.queue_size = max(1, int(queue_size or self.max_workers * 2))
+        self.label = label
+        self.stop_check = stop_check
+
+    def _stopped(self):
+        check_pause_signal()
+        return check_stop_signal() or (self.stop_check is not None and bool(self.stop_check()))
+
+    def run(self, items, fn, on_result, on_error):
+        """Xử lý toàn bộ `items`. Trả về False nếu bị dừng bởi stop signal."""
+        work = queue.Queue(maxsize=self.queue_size)
+        results = queue.Queue()
+        outstanding = 0
+
+        def _consume():
+            while True:
+                item = work.get()
+                if item is _STOP:
+                    return
+                started = time.perf_counter()
+                try:
+                    results.put((item, fn(item), None))
+                except Exception as e:
+                    results.put((item, None, e))
+                if _item_observers:
+                    notify_item(self.label, item, time.perf_counter() - started)
+
+        def _deliver(block):
+            nonlocal outstanding
+            while outstanding:
+                try:
+                    item, result, exc = results.get(block=block, timeout=0.1 if block else None)
+                except queue.Empty:
+                    return
+                outstanding -= 1
+                if isinstance(exc, MigrationStopped):
+                    # Bị huỷ giữa chừng bởi lệnh stop: không tính là lỗi, như item bị bỏ khỏi queue
+                    continue
+                if exc is not None:
+                    on_error(item, exc)
+                    continue
+                try:
+                    on_result(item, result)
+                except Exception as e:
+                    on_error(item, e)
+                block = False
+
+        consumers = [
+            threading.Thread(target=_consume, name=f"{self.label}-{i}", daemon=True)
+            for i in range(self.max_workers)
+        ]
+        for consumer in consumers:
+            consumer.start()
+
+        def _drain():
+            # Bỏ các item chưa được consumer nhận
+            nonlocal outstanding
+            while True:
+                try:
+                    work.get_nowait()
+                except queue.Empty:
+                    return
+                outstanding -= 1
+
+        stopped = False
+        try:
+            try:
+                for item in items:
+                    if self._stopped():
+                        stopped = True
+                        break
+                    while True:
+                        try:
+                            work.put(item, timeout=0.1)
+                            outstanding += 1
+                            break
+                        except queue.Full:
+                            _deliver(block=False)
+                    _deliver(block=False)
+            except MigrationStopped:
+                # Extract (Magento) bị huỷ giữa chừng bởi lệnh stop
+                stopped = True
+
+            while outstanding and not stopped:
+                stopped = self._stopped()
+                if not stopped:
+                    _deliver(block=True)
+            if stopped:
+                log_warning(f"🛑 Stop signal detected. Cancelling remaining {self.label}...", indent=1)
+                _drain()
+                while outstanding:
+                    _deliver(block=True)
+        finally:
+            _drain()
+            for _ in consumers:
+                work.put(_STOP)
+            for consumer in consumers:
+                consumer.join()
+        return not stopped
@@ -1,7 +1,11 @@
 import json
+import queue
+import itertools
+import threading
 import requests
 from datetime import datetime, timedelta
 from connectors.medusa_connector import MedusaConnector
+from connectors.control import migration_control, FileSignalAdapter
 
 def get_timestamp():
     # Force UTC+7 (Vietnam Time)
@@ -19,60 +23,56 @@ def log_warning(msg, indent=0):
 STOP_SIGNAL_FILE = ".stop_signal"
 PAUSE_SIGNAL_FILE = ".pause_signal"
 
+# Pause / stop đi qua migration_control (in-process); file signal chỉ còn là adapter tương thích
+# (xem start_file_signal_adapter) cho script cũ tạo .stop_signal / .pause_signal.
+
 def check_stop_signal():
-    """Returns True if the stop signal file exists."""
-    import os
-    if os.path.exists(STOP_SIGNAL_FILE):
-        return True
-    return False
+    """Returns True if a stop was requested."""
+    return migration_control.is_stopped()
 
 def clean_stop_signal():
-    """Removes the stop signal file if it exists."""
+    """Clears stop / pause state (and a leftover stop signal file) before a new run."""
     import os
     try:
         if os.path.exists(STOP_SIGNAL_FILE):
             os.remove(STOP_SIGNAL_FILE)
     except Exception:
         pass
+    migration_control.reset()
+
+def request_stop():
+    migration_control.stop()
 
 def toggle_pause_signal(active: bool):
-    """Creates or removes the pause signal file."""
+    """Pauses or resumes the migration."""
     import os
+    if active:
+        migration_control.pause()
+        return
     try:
-        if active:
-            with open(PAUSE_SIGNAL_FILE, "w") as f:
-                f.write("pause")
-        else:
-            if os.path.exists(PAUSE_SIGNAL_FILE):
-                os.remove(PAUSE_SIGNAL_FILE)
+        if os.path.exists(PAUSE_SIGNAL_FILE):
+            os.remove(PAUSE_SIGNAL_FILE)
     except Exception:
         pass
+    migration_control.resume()
 
 def check_pause_signal():
     """
-    Checks if pause signal exists. If yes, loops (blocks) until 
-    pause signal is removed or stop signal is detected.
+    Blocks while the migration is paused (no polling: woken directly by resume / stop).
     Returns True if stopped while paused, False if resumed.
     """
-    import os
-    import time
-    
-    paused_once = False
-    while os.path.exists(PAUSE_SIGNAL_FILE):
-        if not paused_once:
-            print(f"[{get_timestamp()}] [INFO] ⏸️ Process PAUSED. Waiting for resume...")
-            paused_once = True
-            
-        if check_stop_signal():
-            return True # Stop detected while paused
-            
-        time.sleep(1)
-        
-    if paused_once:
-        print(f"[{get_timestamp()}] [INFO] ▶️ Process RESUMED.")
-        
+    if not migration_control.is_paused():
+        return migration_control.is_stopped()
+    print(f"[{get_timestamp()}] [INFO] ⏸️ Process PAUSED. Waiting for resume...")
+    if migration_control.wait_if_paused():
+        return True
+    print(f"[{get_timestamp()}] [INFO] ▶️ Process RESUMED.")
     return False
 
+def start_file_signal_adapter():
+    """Chuyển .stop_signal / .pause_signal (nếu có tool cũ tạo) thành lệnh trên migration_control."""
+    return FileSignalAdapter(migration_control, STOP_SIGNAL_FILE, PAUSE_SIGNAL_FILE).start()
+
 
 def log_error(msg, indent=0):
     print(f"[{get_timestamp()}] [ERROR] {msg}")
@@ -99,10 +99,128 @@ def log_summary(entity_type, success, ignored, failed):
     print(f"[{get_timestamp()}] Failed:  {failed}")
     print(f"[{get_timestamp()}] {'-'*35}")
 
+def log_connection_report(name, connector):
+    stats = connector.connection_stats()
+    print(f"[{get_timestamp()}] --- {name} Connection Report ---")
+    print(f"[{get_timestamp()}] Requests sent:      {stats['requests']}")
+    print(f"[{get_timestamp()}] Connections opened: {stats['connections_opened']} (pool size {stats['pool_size']})")
+    print(f"[{get_timestamp()}] Connections reused: {stats['connections_reused']} ({stats['reuse_ratio'] * 100:.1f}%)")
+    limiter = stats.get("limiter") or {}
+    if limiter:
+        rate = f"{limiter['rate']:.1f} req/s" if limiter["rate"] else "unlimited"
+        print(f"[{get_timestamp()}] Throttled (429/503): {limiter['throttled']} | concurrency limit {limiter['concurrency_limit']}/{limiter['max_concurrency']} | rate {rate}")
+    print(f"[{get_timestamp()}] {'-'*35}")
+
+def _use_cursor(args) -> bool:
+    """--pagination cursor: extract bằng keyset (entity_id > last) thay vì currentPage."""
+    return getattr(args, "pagination", "offset") == "cursor"
+
 def _limit_iter(items, limit: int):
     if not limit or limit <= 0:
         return items
-    return items[:limit]
+    if isinstance(items, list):
+        return items[:limit]
+    return itertools.islice(items, limit)
+
+class _PrefetchError:
+    def __init__(self, error):
+        self.error = error
+
+def _batched(items, size: int):
+    """Gom stream thành các list tối đa `size` phần tử (lô cuối có thể ngắn hơn)."""
+    it = iter(items)
+    while True:
+        batch = list(itertools.islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+_PREFETCH_END = object()
+# Thời gian tối đa _prefetch chờ thread nền đóng generator nguồn khi dừng sớm
+_PREFETCH_CLOSE_TIMEOUT = 30.0
+
+def _prefetch(items, maxsize=1000):
+    """
+    Đọc `items` (thường là generator extract từ Magento) trên một thread nền vào queue có giới hạn.
+    Việc load bắt đầu ngay khi có trang đầu tiên; thread nền bị chặn khi queue đầy (backpressure),
+    nên bộ nhớ không tăng theo kích thước catalog.
+    """
+    q = queue.Queue(maxsize=max(1, maxsize))
+    closed = threading.Event()
+
+    def _put(obj):
+        while not closed.is_set():
+            try:
+                q.put(obj, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _producer():
+        try:
+            for item in items:
+                if not _put(item):
+                    return
+        except BaseException as e:
+            _put(_PrefetchError(e))
+            return
+        finally:
+            # Đóng generator nguồn trên chính thread đang đọc nó (generator không close được từ
+            # thread khác khi đang chạy): iter_pages huỷ các trang đang chờ và tắt executor fanout
+            close = getattr(items, "close", None)
+            if close is not None:
+                close()
+        _put(_PREFETCH_END)
+
+    producer = threading.Thread(target=_producer, daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = q.get()
+            if item is _PREFETCH_END:
+                return
+            if isinstance(item, _PrefetchError):
+                raise item.error
+            yield item
+    finally:
+        # Dừng sớm (stop, limit, exception): báo producer dừng, rút queue để nó không kẹt ở put,
+        # và chờ nó đóng nguồn (tối đa thời gian một trang đang tải dở)
+        closed.set()
+        while True:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                break
+        producer.join(timeout=_PREFETCH_CLOSE_TIMEOUT)
+
+def _drive(steps, medusa):
+    """Chạy generator các bước của một record (yield (method, args, kwargs)) với connector đồng bộ."""
+    try:
+        method, call_args, call_kwargs = next(steps)
+        while True:
+            try:
+                value = getattr(medusa, method)(*call_args, **call_kwargs)
+            except Exception as e:
+                method, call_args, call_kwargs = steps.throw(e)
+            else:
+                method, call_args, call_kwargs = steps.send(value)
+    except StopIteration as done:
+        return done.value
+
+async def _drive_async(steps, medusa):
+    """Bản asyncio của _drive (dùng AsyncMedusaConnector)."""
+    try:
+        method, call_args, call_kwargs = next(steps)
+        while True:
+            try:
+                value = await getattr(medusa, method)(*call_args, **call_kwargs)
+            except Exception as e:
+                method, call_args, call_kwargs = steps.throw(e)
+            else:
+                method, call_args, call_kwargs = steps.send(value)
+    except StopIteration as done:
+        return done.value
 
 def _is_http_status(err: Exception, status_code: int) -> bool:
     return f"{status_code} Client Error" in str(err)
@@ -148,6 +266,40 @@ def _fetch_all_product_categories(medusa: MedusaConnector, page_limit: int = 50)
             break
     return out
 
+def _category_map(pairs):
+    """{magento_id: medusa_id} với key cả dạng str lẫn int (category_links của Magento dùng cả hai)."""
+    out = {}
+    for mg_id, medusa_id in pairs:
+        out[str(mg_id)] = medusa_id
+        if str(mg_id).isdigit():
+            out[int(mg_id)] = medusa_id
+    return out
+
+def _load_category_mappings(medusa: MedusaConnector, id_map=None):
+    """
+    Mapping category Magento -> Medusa và handle -> id.
+    Store (--id-map) chỉ thay được listing khi đã được đánh dấu đầy đủ; ngược lại liệt kê toàn bộ category
+    trên Medusa, ghi vào store rồi đánh dấu. Nếu listing lỗi thì dùng tạm mapping đã lưu (có thể thiếu).
+    Trả về (mg_to_medusa, handle_to_id, source) với source là "store" / "medusa" / "partial".
+    """
+    if id_map is not None and id_map.is_complete("category"):
+        return _category_map(id_map.all("category").items()), id_map.all("category_handle"), "store"
+    try:
+        existing = _fetch_all_product_categories(medusa)
+    except Exception as e:
+        log_warning(f"⚠️ Could not fetch existing categories from Medusa: {e}. Parent mapping might fail.")
+        if id_map is None:
+            return {}, {}, "partial"
+        return _category_map(id_map.all("category").items()), id_map.all("category_handle"), "partial"
+    handle_to_id = {c.get("handle"): c.get("id") for c in existing if c.get("handle") and c.get("id")}
+    pairs = [((c.get("metadata") or {}).get("magento_id"), c.get("id")) for c in existing]
+    pairs = [(mg_id, medusa_id) for mg_id, medusa_id in pairs if mg_id and medusa_id]
+    if id_map is not None:
+        id_map.put_many("category", pairs)
+        id_map.put_many("category_handle", handle_to_id.items())
+        id_map.mark_complete("category", "category_handle")
+    return _category_map(pairs), handle_to_id, "medusa"
+
 def _fetch_all_variants(medusa: MedusaConnector, page_limit: int = 50):
     offset = 0
     out = []
@@ -166,35 +318,13 @@ def _fetch_all_variants(medusa: MedusaConnector, page_limit: int = 50):
     return out
 
 def log_dry_run(payload, entity_type, args):
-    import json
-    import os
-    
     if getattr(args, "dry_run", False):
         print(json.dumps(payload, ensure_ascii=False, indent=2))
     
     if getattr(args, "dry_run_file", False):
-        run_id = getattr(args, "run_id", "latest")
-        
-        if not os.path.exists("exports"):
-            os.makedirs("exports")
-            
-        filename = f"exports/payloads_{run_id}.json"
-        
-        data = []
-        if os.path.exists(filename):
-            try:
-                with open(filename, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-            except:
-                data = []
-        
-        data.append({
-            "entity": entity_type,
-            "payload": payload
-        })
-        
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        # Ghi nền, append-only JSONL: exports/payloads_<run_id>.jsonl (xem migrators/payload_export.py)
+        from migrators.payload_export import get_payload_writer
+        get_payload_writer(args).write(entity_type, payload)
 
 def handle_medusa_api_error(e: requests.exceptions.HTTPError, entity_name: str, entity_identifier: str):
     resp = getattr(e, "response", None)
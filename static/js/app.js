@@ -238,6 +238,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 // datetime-local is YYYY-MM-DDTHH:mm -> convert to YYYY-MM-DD HH:mm:ss
                 return val.replace('T', ' ') + ':00';
             })(),
+            resume: document.getElementById('opt_resume_run_id').value.trim() || null,
             max_workers: 10
         };
     }
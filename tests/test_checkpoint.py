@@ -0,0 +1,102 @@
+import json
+from types import SimpleNamespace
+
+from migrators.checkpoint import CheckpointJournal, _Watermark, keyset_start
+
+def _lines(journal):
+    with open(journal.path, encoding="utf-8") as fh:
+        return [json.loads(line) for line in fh]
+
+def test_watermark_advances_only_over_contiguous_completions():
+    wm = _Watermark()
+    for record_id in (1, 2, 3, 4):
+        wm.register(record_id)
+
+    # Hoàn tất không theo thứ tự: watermark chờ record 1
+    assert not wm.settle(3, True)
+    assert not wm.settle(2, True)
+    assert wm.value is None
+    assert wm.settle(1, True)
+    assert wm.value == 3
+    assert wm.settle(4, True)
+    assert wm.value == 4
+
+def test_watermark_stops_at_first_failure():
+    wm = _Watermark()
+    for record_id in (1, 2, 3):
+        wm.register(record_id)
+    wm.settle(1, True)
+    wm.settle(2, False)
+    wm.settle(3, True)
+
+    assert wm.blocked
+    assert wm.value == 1
+    wm.register(4)
+    assert not wm.settle(4, True)
+    assert wm.value == 1
+
+def test_settle_ignores_unregistered_records():
+    wm = _Watermark()
+    wm.register(1)
+    assert not wm.settle(99, True)
+    assert wm.value is None
+
+def test_cursor_is_written_every_n_and_on_close(tmp_path):
+    journal = CheckpointJournal("run", directory=str(tmp_path))
+    journal.CURSOR_EVERY = 2
+    stream = list(journal.resume_stream("product", iter([10, 11, 12]), key=lambda x: x, track_cursor=True))
+    assert stream == [10, 11, 12]
+
+    for record_id in stream:
+        journal.complete("product", record_id)
+    journal.close()
+
+    cursors = [e["cursor"] for e in _lines(journal) if "cursor" in e]
+    assert cursors == [11, 12]
+    assert [e["id"] for e in _lines(journal) if "id" in e] == [10, 11, 12]
+
+def test_failed_record_pins_cursor_before_it(tmp_path):
+    journal = CheckpointJournal("run", directory=str(tmp_path))
+    list(journal.resume_stream("order", iter([1, 2, 3]), key=lambda x: x, track_cursor=True))
+    journal.complete("order", 1)
+    journal.fail("order", 2)
+    journal.complete("order", 3)
+    journal.close()
+
+    resumed = CheckpointJournal("run", directory=str(tmp_path), resume=True)
+    assert resumed.cursor("order") == 1
+    # Record 3 xong nhưng nằm sau record lỗi: không tính vào cursor, vẫn được bỏ qua theo id
+    assert resumed.is_done("order", 3)
+    assert not resumed.is_done("order", 2)
+    resumed.close()
+
+def test_resume_skips_done_records_and_tolerates_truncated_line(tmp_path):
+    journal = CheckpointJournal("run", directory=str(tmp_path))
+    journal.complete("customer", 1)
+    journal.complete("customer", 2)
+    journal.complete("customer", 2)
+    journal.close()
+    with open(journal.path, "a", encoding="utf-8") as fh:
+        fh.write('{"entity": "customer", "id"')  # dòng bị cắt dở khi crash
+
+    resumed = CheckpointJournal("run", directory=str(tmp_path), resume=True)
+    assert resumed.loaded
+    assert resumed.done_count("customer") == 2
+    remaining = list(resumed.resume_stream("customer", iter([1, 2, 3]), key=lambda x: x))
+    assert remaining == [3]
+    assert resumed.skipped == {"customer": 2}
+    resumed.close()
+
+def test_keyset_start_uses_cursor_only_for_cursor_pagination(tmp_path):
+    journal = CheckpointJournal("run", directory=str(tmp_path))
+    list(journal.resume_stream("product", iter([5, 6]), key=lambda x: x, track_cursor=True))
+    journal.complete("product", 5)
+    journal.complete("product", 6)
+    journal.close()
+
+    resumed = CheckpointJournal("run", directory=str(tmp_path), resume=True)
+    assert keyset_start(resumed, "product", SimpleNamespace(pagination="cursor")) == 6
+    assert keyset_start(resumed, "product", SimpleNamespace(pagination="offset")) == 0
+    assert keyset_start(resumed, "product", SimpleNamespace(pagination="cursor"), ids=[1, 2]) == 0
+    assert keyset_start(None, "product", SimpleNamespace(pagination="cursor")) == 0
+    resumed.close()
@@ -0,0 +1,74 @@
+from migrators.id_map import IdMappingStore
+
+def _store(tmp_path, target="https://medusa.a", **kwargs):
+    return IdMappingStore(str(tmp_path / "id_map.sqlite"), target=target, **kwargs)
+
+def test_put_get_all_and_count(tmp_path):
+    store = _store(tmp_path)
+    store.put("product", 1, "prod_1")
+    store.put_many("variant", [("SKU-1", "variant_1"), ("SKU-2", "variant_2"), ("SKU-3", None)])
+    store.put("product", None, "prod_x")
+
+    assert store.get("product", "1") == "prod_1"
+    assert store.get("product", 2) is None
+    assert store.all("variant") == {"SKU-1": "variant_1", "SKU-2": "variant_2"}
+    assert store.count("variant") == 2
+    store.close()
+
+def test_mappings_are_separated_by_target(tmp_path):
+    a = _store(tmp_path, target="https://medusa.a")
+    a.put("product", 1, "prod_a")
+    a.close()
+
+    b = _store(tmp_path, target="https://medusa.b")
+    assert b.get("product", 1) is None
+    assert not b.is_complete("product")
+    b.close()
+
+def test_store_is_not_complete_until_marked(tmp_path):
+    store = _store(tmp_path)
+    store.put_many("category", [(3, "pcat_3")])
+    assert not store.is_complete("category")
+    store.close()
+
+    # Store có dữ liệu nhưng chưa đối chiếu với listing Medusa: chỉ là seed
+    store = _store(tmp_path)
+    assert store.count("category") == 1
+    assert not store.is_complete("category")
+    store.mark_complete("category")
+    assert store.is_complete("category")
+    store.close()
+
+    assert _store(tmp_path).is_complete("category")
+
+def test_clean_close_keeps_marker_after_new_writes(tmp_path):
+    store = _store(tmp_path)
+    store.mark_complete("variant")
+    store.close()
+
+    store = _store(tmp_path)
+    store.put("variant", "SKU-9", "variant_9")
+    assert store.is_complete("variant")
+    store.close()
+
+    store = _store(tmp_path)
+    assert store.is_complete("variant")
+    assert store.get("variant", "SKU-9") == "variant_9"
+    store.close()
+
+def test_abandoned_session_clears_marker(tmp_path):
+    store = _store(tmp_path, commit_every=1000)
+    store.mark_complete("variant", "product")
+    store.close()
+
+    crashed = _store(tmp_path, commit_every=1000)
+    crashed.put("variant", "SKU-1", "variant_1")
+    # Dấu "complete" bị xoá và commit ngay ở lần ghi đầu, trước các mapping còn đang pending
+    assert not _store(tmp_path).is_complete("variant")
+    # Giả lập process bị kill: đóng connection mà không qua close()
+    crashed._conn.close()
+
+    store = _store(tmp_path)
+    assert not store.is_complete("variant")
+    assert store.is_complete("product")
+    store.close()
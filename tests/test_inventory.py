@@ -0,0 +1,86 @@
+import asyncio
+import threading
+
+from migrators.inventory import InventoryIndex, InventoryLoader
+
+class _Medusa:
+    """Medusa admin API tối thiểu cho InventoryLoader; SKU trong `broken` lỗi cả khi tạo lẫn khi tra lại."""
+    def __init__(self, broken=()):
+        self.broken = set(broken)
+        self.levels = []
+        self.links = []
+        self._lock = threading.Lock()
+        self._next = 0
+
+    def create_inventory_item(self, payload):
+        if payload["sku"] in self.broken:
+            raise RuntimeError("500 Server Error")
+        with self._lock:
+            self._next += 1
+            return {"inventory_item": {"id": f"inv_{self._next}", "sku": payload["sku"]}}
+
+    def get_inventory_item_by_sku(self, sku):
+        raise RuntimeError("connection reset")
+
+    def link_variants_to_inventory_items(self, product_id, rows):
+        self.links.append((product_id, rows))
+
+    def batch_inventory_location_levels(self, create=None, update=None):
+        with self._lock:
+            self.levels.extend(create or [])
+            self.levels.extend(update or [])
+
+def _created(product_id, *skus):
+    return {"id": f"prod_{product_id}", "variants": [{"id": f"var_{s}", "sku": s} for s in skus]}
+
+def _product(product_id, qty):
+    return {"id": product_id, "name": f"P{product_id}", "extension_attributes": {"stock_item": {"qty": qty}}}
+
+def test_one_failing_sku_does_not_drop_the_batch():
+    medusa = _Medusa(broken={"B"})
+    loader = InventoryLoader(medusa, InventoryIndex(), "loc_1", batch_size=10, flush_interval=0.05)
+    loader.submit(_product(1, 5), _created(1, "A", "B", "C"))
+    stats = loader.close()
+    assert stats == {"submitted": 3, "synced": 2, "failed": 1, "batches": 1}
+    assert sorted(level["stocked_quantity"] for level in medusa.levels) == [5, 5]
+    assert len(medusa.links[0][1]) == 2
+
+def test_levels_are_updated_for_skus_already_stocked():
+    medusa = _Medusa()
+    index = InventoryIndex([{"id": "inv_a", "sku": "A", "location_levels": [{"location_id": "loc_1"}]}])
+    loader = InventoryLoader(medusa, index, "loc_1", batch_size=2, flush_interval=0.05)
+    loader.submit(_product(1, 3), _created(1, "A", "B"))
+    assert loader.close()["synced"] == 2
+    assert index.has_level("B", "loc_1")
+
+class _SlowMedusa(_Medusa):
+    """Tạo inventory item chờ tới khi `gate` mở: stage tồn kho đầy và submit bị backpressure."""
+    def __init__(self):
+        super().__init__()
+        self.gate = threading.Event()
+
+    def create_inventory_item(self, payload):
+        self.gate.wait(5)
+        return super().create_inventory_item(payload)
+
+def test_submit_async_does_not_block_the_event_loop_when_full():
+    medusa = _SlowMedusa()
+    loader = InventoryLoader(medusa, InventoryIndex(), "loc_1", batch_size=1, max_workers=1, flush_interval=0.05)
+    skus = [f"S{i}" for i in range(12)]
+
+    async def _run():
+        submit = asyncio.create_task(loader.submit_async(_product(1, 1), _created(1, *skus)))
+        ticks = 0
+        while ticks < 10:
+            await asyncio.sleep(0.01)
+            ticks += 1
+        # Event loop vẫn chạy trong khi submit đang chờ chỗ trống trong queue
+        pending = not submit.done()
+        medusa.gate.set()
+        await submit
+        return pending
+
+    assert asyncio.run(_run())
+    stats = loader.close()
+    assert stats["submitted"] == len(skus)
+    assert stats["synced"] == len(skus)
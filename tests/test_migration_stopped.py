@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+import pytest
+
+from connectors.control import MigrationStopped
+from migrators.category_migrator import _sync_single_category
+from migrators.customer_migrator import _sync_single_customer
+from migrators.inventory import InventoryIndex, InventoryLoader
+from migrators.order_migrator import _drive, _order_steps
+from migrators.product_migrator import _sync_single_product
+
+class _StoppingMedusa:
+    """Medusa giả: mọi lời gọi trong `stop_on` raise MigrationStopped như connector khi nhận lệnh stop."""
+    def __init__(self, stop_on=(), responses=None):
+        self.stop_on = set(stop_on)
+        self.responses = responses or {}
+        self.calls = []
+
+    def __getattr__(self, method):
+        def call(*args, **kwargs):
+            self.calls.append(method)
+            if method in self.stop_on:
+                raise MigrationStopped("Migration stopped")
+            return self.responses.get(method, {})
+        return call
+
+def _args(**kwargs):
+    return SimpleNamespace(dry_run=False, **kwargs)
+
+def _order():
+    return {"entity_id": 1, "increment_id": "000000001", "items": [], "grand_total": 0}
+
+def test_customer_worker_propagates_stop():
+    medusa = _StoppingMedusa(stop_on={"create_customer"})
+    with pytest.raises(MigrationStopped):
+        _sync_single_customer({"id": 1, "email": "a@example.com"}, medusa, _args())
+
+def test_customer_address_step_propagates_stop():
+    medusa = _StoppingMedusa(stop_on={"create_customer_address"},
+                             responses={"create_customer": {"customer": {"id": "cus_1"}}})
+    customer = {"id": 1, "email": "a@example.com", "addresses": [{"street": ["1 Main St"]}]}
+    with pytest.raises(MigrationStopped):
+        _sync_single_customer(customer, medusa, _args())
+
+def test_category_worker_propagates_stop():
+    medusa = _StoppingMedusa(stop_on={"create_product_category"})
+    with pytest.raises(MigrationStopped):
+        _sync_single_category({"id": 3, "name": "Shoes", "parent_id": 1}, medusa, _args(), {}, {})
+
+def test_inventory_stage_does_not_count_stopped_skus_as_failed():
+    medusa = _StoppingMedusa(stop_on={"create_inventory_item"})
+    loader = InventoryLoader(medusa, InventoryIndex(), "loc_1", batch_size=10, flush_interval=0.05)
+    loader.submit({"id": 1, "name": "P1"}, {"id": "prod_1", "variants": [{"id": "var_a", "sku": "A"}, {"id": "var_b", "sku": "B"}]})
+    stats = loader.close()
+    assert stats["synced"] == 0
+    assert stats["failed"] == 0
+    # Dừng ở SKU đầu tiên: không gọi tiếp Medusa cho phần còn lại của lô
+    assert medusa.calls == ["create_inventory_item"]
+
+def test_product_worker_propagates_stop():
+    medusa = _StoppingMedusa(stop_on={"create_product"})
+    magento = SimpleNamespace(base_url="https://magento.example.com")
+    product = {"id": 1, "sku": "SKU-1", "name": "P1", "price": 10}
+    with pytest.raises(MigrationStopped):
+        _sync_single_product(product, magento, medusa, _args(), {}, {}, "sc_1", "sp_1")
+
+@pytest.mark.parametrize("stop_on", ["create_draft_order", "finalize_draft_order", "create_fulfillment"])
+def test_order_steps_propagate_stop(stop_on):
+    medusa = _StoppingMedusa(stop_on={stop_on},
+                             responses={"create_draft_order": {"draft_order": {"id": "dord_1", "items": []}},
+                                        "finalize_draft_order": {"order": {"id": "dord_1"}}})
+    args = _args(finalize_orders=True, rollback_on_finalize_fail=True)
+    with pytest.raises(MigrationStopped):
+        _drive(_order_steps(_order(), args, "reg_1", {}, None), medusa)
+    # Không rollback draft order khi dừng: lần resume sẽ tiếp tục từ record này
+    assert "delete_draft_order" not in medusa.calls
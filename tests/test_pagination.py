@@ -0,0 +1,110 @@
+import threading
+
+from extractors.pagination import chunk_ids, iter_id_chunks, iter_keyset, iter_pages
+
+class _Listing:
+    """Magento listing giả: `total` record id 1..total, ghi lại các trang đã được yêu cầu."""
+    def __init__(self, total, with_count=True, repeat_last=False):
+        self.total = total
+        self.with_count = with_count
+        self.repeat_last = repeat_last
+        self.pages = []
+        self._lock = threading.Lock()
+
+    def fetch_page(self, page, page_size=10):
+        with self._lock:
+            self.pages.append(page)
+        last = max(1, -(-self.total // page_size))
+        if page > last:
+            if not self.repeat_last:
+                return {"items": [], **({"total_count": self.total} if self.with_count else {})}
+            page = last
+        start = (page - 1) * page_size
+        items = [{"id": i} for i in range(start + 1, min(self.total, start + page_size) + 1)]
+        return {"items": items, **({"total_count": self.total} if self.with_count else {})}
+
+def _ids(records):
+    return [r["id"] for r in records]
+
+def test_iter_pages_stops_on_total_count_without_extra_request():
+    listing = _Listing(95)
+    assert _ids(iter_pages(listing.fetch_page, 10, fanout=4)) == list(range(1, 96))
+    assert sorted(listing.pages) == list(range(1, 11))
+
+def test_iter_pages_single_page_and_empty_listing():
+    listing = _Listing(7)
+    assert _ids(iter_pages(listing.fetch_page, 10)) == list(range(1, 8))
+    assert listing.pages == [1]
+    empty = _Listing(0)
+    assert list(iter_pages(empty.fetch_page, 10)) == []
+    assert empty.pages == [1]
+
+def test_iter_pages_keeps_page_order_with_fanout():
+    listing = _Listing(200)
+    assert _ids(iter_pages(listing.fetch_page, 10, fanout=8)) == list(range(1, 201))
+
+def test_iter_pages_without_total_count_stops_on_empty_page():
+    listing = _Listing(25, with_count=False)
+    assert _ids(iter_pages(listing.fetch_page, 10)) == list(range(1, 26))
+    assert listing.pages == [1, 2, 3, 4]
+
+def test_iter_pages_without_total_count_stops_when_last_page_repeats():
+    listing = _Listing(25, with_count=False, repeat_last=True)
+    assert _ids(iter_pages(listing.fetch_page, 10)) == list(range(1, 26))
+    assert listing.pages == [1, 2, 3, 4]
+
+def _keyset(ids, page_size=10):
+    calls = []
+
+    def fetch_after(last_id):
+        calls.append(last_id)
+        return {"items": [{"entity_id": i} for i in ids if i > last_id][:page_size]}
+    return fetch_after, calls
+
+def test_iter_keyset_follows_cursor_and_stops_on_short_page():
+    fetch_after, calls = _keyset([3, 8, 15, 21, 22, 40, 41, 57, 60, 61, 70, 99], page_size=5)
+    assert [r["entity_id"] for r in iter_keyset(fetch_after, 5)] == [3, 8, 15, 21, 22, 40, 41, 57, 60, 61, 70, 99]
+    assert calls == [0, 22, 61]
+
+def test_iter_keyset_exact_multiple_needs_one_empty_page():
+    fetch_after, calls = _keyset(list(range(1, 21)))
+    assert len(list(iter_keyset(fetch_after, 10))) == 20
+    assert calls == [0, 10, 20]
+
+def test_iter_keyset_resumes_after_saved_cursor():
+    fetch_after, calls = _keyset(list(range(1, 31)))
+    assert [r["entity_id"] for r in iter_keyset(fetch_after, 10, start_after=25)] == [26, 27, 28, 29, 30]
+    assert calls == [25]
+
+def test_iter_keyset_stops_when_cursor_does_not_advance():
+    calls = []
+
+    def fetch_after(last_id):
+        calls.append(last_id)
+        # Projection thiếu id: cursor không tiến được
+        return {"items": [{"sku": "a"}, {"sku": "b"}]}
+    assert len(list(iter_keyset(fetch_after, 2))) == 2
+    assert calls == [0]
+
+def test_chunk_ids_keeps_joined_value_under_limit():
+    ids = list(range(1, 5000))
+    chunks = chunk_ids(ids, max_chars=100)
+    assert [int(v) for chunk in chunks for v in chunk] == ids
+    assert all(len(",".join(chunk)) <= 100 for chunk in chunks)
+    assert len(chunks) > 1
+
+def test_chunk_ids_small_and_empty_input():
+    assert chunk_ids([1, 2, 3]) == [["1", "2", "3"]]
+    assert chunk_ids([]) == []
+    # Một id dài hơn giới hạn vẫn được gửi (một mình một chunk) thay vì bị bỏ
+    assert chunk_ids(["x" * 50, "y"], max_chars=10) == [["x" * 50], ["y"]]
+
+def test_iter_id_chunks_yields_in_chunk_order():
+    requested = []
+
+    def iter_chunk(chunk):
+        requested.append(tuple(chunk))
+        return ({"id": int(v)} for v in chunk)
+    ids = list(range(1, 400))
+    assert _ids(iter_id_chunks(iter_chunk, ids, fanout=4, max_chars=50)) == ids
+    assert len(requested) == len(chunk_ids(ids, 50))
@@ -0,0 +1,33 @@
+from migrators.payload_export import PayloadWriter, iter_payloads
+
+def test_payload_is_exported_as_it_was_when_written(tmp_path):
+    writer = PayloadWriter(str(tmp_path / "payloads"))
+    payload = {"email": "a@example.com", "metadata": {"magento_id": "1"}}
+    writer.write("order", payload)
+    # Sửa payload sau write() (như merge invoice vào metadata) không được lọt vào export
+    payload["metadata"]["magento_invoice_id"] = "9"
+    paths = writer.close()
+
+    assert [entry["payload"] for entry in iter_payloads(paths)] == [{"email": "a@example.com", "metadata": {"magento_id": "1"}}]
+
+def test_unserializable_payload_is_skipped_without_stopping_export(tmp_path):
+    writer = PayloadWriter(str(tmp_path / "payloads"))
+    circular = {}
+    circular["self"] = circular
+    writer.write("product", {"handle": "a"})
+    writer.write("product", circular)
+    writer.write("product", {"handle": "b"})
+    paths = writer.close()
+
+    assert [entry["payload"]["handle"] for entry in iter_payloads(paths)] == ["a", "b"]
+    assert writer.written == 2
+    assert writer.skipped == 1
+
+def test_rotates_parts_by_size(tmp_path):
+    writer = PayloadWriter(str(tmp_path / "payloads"), compress=True, max_bytes=1)
+    for i in range(3):
+        writer.write("customer", {"i": i})
+    paths = writer.close()
+
+    assert len(paths) == 3 and all(p.endswith(".jsonl.gz") for p in paths)
+    assert [entry["payload"]["i"] for entry in iter_payloads(paths)] == [0, 1, 2]
@@ -0,0 +1,66 @@
+import itertools
+import threading
+import time
+
+import pytest
+
+from extractors.pagination import iter_pages
+from migrators.utils import _prefetch
+
+def _source(closed, n=10_000):
+    try:
+        for i in range(n):
+            yield i
+    finally:
+        closed.set()
+
+def test_prefetch_yields_everything_in_order():
+    closed = threading.Event()
+    assert list(_prefetch(_source(closed, 2500), maxsize=10)) == list(range(2500))
+    assert closed.is_set()
+
+def test_prefetch_closes_source_on_early_exit():
+    closed = threading.Event()
+    # Caller giữ tham chiếu tới nguồn (như biến `products = iter_products(...)` trong migrator)
+    source = _source(closed)
+    stream = _prefetch(source, maxsize=5)
+    assert list(itertools.islice(stream, 3)) == [0, 1, 2]
+    stream.close()
+    assert closed.wait(2)
+
+def test_prefetch_closes_source_when_consumer_raises():
+    closed = threading.Event()
+    source = _source(closed)
+    with pytest.raises(RuntimeError):
+        for item in _prefetch(source, maxsize=5):
+            if item == 7:
+                raise RuntimeError("stop")
+    assert closed.wait(2)
+
+def test_prefetch_reraises_source_error():
+    def _broken():
+        yield 1
+        raise ValueError("page failed")
+    with pytest.raises(ValueError):
+        list(_prefetch(_broken()))
+
+def test_prefetch_close_stops_page_fanout():
+    fetched = []
+    lock = threading.Lock()
+
+    def fetch_page(page):
+        time.sleep(0.01)
+        with lock:
+            fetched.append(page)
+        return {"items": [{"id": (page - 1) * 10 + i} for i in range(10)], "total_count": 10_000}
+
+    pages = iter_pages(fetch_page, 10, fanout=4)
+    stream = _prefetch(pages, maxsize=5)
+    next(stream)
+    stream.close()
+    time.sleep(0.1)
+    count = len(fetched)
+    time.sleep(0.1)
+    # Executor đã tắt: không còn trang nào được tải thêm sau khi đóng
+    assert len(fetched) == count
+    assert count < 1000
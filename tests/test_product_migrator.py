@@ -0,0 +1,12 @@
+from migrators.product_migrator import _batch_idempotency_key
+
+def _products(*ids):
+    return [{"id": i} for i in ids]
+
+def test_batch_key_depends_on_every_id():
+    # Cùng id đầu / cuối / kích thước nhưng khác id ở giữa
+    assert _batch_idempotency_key(_products(1, 2, 5)) != _batch_idempotency_key(_products(1, 3, 5))
+
+def test_batch_key_is_stable_for_the_same_batch():
+    assert _batch_idempotency_key(_products(7, 8, 9)) == _batch_idempotency_key(_products(7, 8, 9))
+    assert _batch_idempotency_key(_products(7, 8, 9)).startswith("product-batch:3:")
@@ -0,0 +1,101 @@
+import asyncio
+import itertools
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+from connectors.base_connector import BaseConnector
+from connectors.async_connector import AsyncBaseConnector
+from connectors.rate_limiter import AdaptiveRateLimiter, get_rate_limiter, parse_retry_after
+
+_hosts = itertools.count()
+
+def _url():
+    return f"http://limiter-test-{next(_hosts)}.local"
+
+def test_restore_capacity_undoes_ensure_capacity():
+    limiter = AdaptiveRateLimiter(max_concurrency=10)
+    previous = limiter.ensure_capacity(100)
+    assert (previous, limiter.max_concurrency, limiter.limit) == (10, 100, 100.0)
+    limiter.restore_capacity(previous)
+    assert (limiter.max_concurrency, limiter.limit) == (10, 10.0)
+
+def test_sync_connector_grows_shared_limiter():
+    url = _url()
+    small = BaseConnector(url, pool_size=4)
+    BaseConnector(url, pool_size=16)
+    assert small.rate_limiter is get_rate_limiter(url)
+    assert small.rate_limiter.max_concurrency == 16
+
+def test_async_connector_raises_capacity_only_until_aclose():
+    sync = BaseConnector(_url(), pool_size=8, rate_limit=5)
+    conn = AsyncBaseConnector.from_connector(sync, pool_size=200)
+    assert conn.rate_limiter is sync.rate_limiter
+    assert conn.rate_limit == 5
+    assert sync.rate_limiter.max_concurrency == 200
+    asyncio.run(conn.aclose())
+    assert sync.rate_limiter.max_concurrency == 8
+    assert sync.rate_limiter.limit <= 8
+
+def test_parse_retry_after_seconds_and_http_date():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after(" 1.5 ") == 1.5
+    assert parse_retry_after("-4") == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("") is None
+    assert parse_retry_after("soon") is None
+    later = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert 25 <= parse_retry_after(later) <= 30
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+def test_throttle_halves_limit_once_per_cooldown():
+    limiter = AdaptiveRateLimiter(max_concurrency=8, decrease_cooldown=60)
+    for _ in range(3):
+        limiter.acquire()
+        limiter.release(429)
+    assert limiter.limit == 4.0
+    assert limiter.throttled == 3
+
+def test_success_increases_limit_additively_up_to_max():
+    limiter = AdaptiveRateLimiter(max_concurrency=4, decrease_cooldown=0)
+    limiter.release(503)
+    assert limiter.limit == 2.0
+    for _ in range(2):
+        limiter.release(200, 0.001)
+    assert 2.0 < limiter.limit < 4.0
+    for _ in range(50):
+        limiter.release(200, 0.001)
+    assert limiter.limit == 4.0
+
+def test_slow_responses_decrease_limit():
+    limiter = AdaptiveRateLimiter(max_concurrency=8, decrease_cooldown=0, latency_factor=3.0)
+    limiter.release(200, 0.02)
+    for _ in range(10):
+        limiter.release(200, 1.0)
+    assert limiter.limit < 8.0
+
+def test_concurrency_limit_blocks_extra_acquire():
+    limiter = AdaptiveRateLimiter(max_concurrency=2)
+    limiter.acquire()
+    limiter.acquire()
+    assert limiter._try_acquire(0) > 0
+    limiter.release(200, 0.001)
+    assert limiter._try_acquire(0) == 0
+
+def test_penalize_blocks_dispatch_until_deadline():
+    limiter = AdaptiveRateLimiter(max_concurrency=4)
+    limiter.penalize(0.2)
+    now = time.monotonic()
+    assert 0.1 < limiter._try_acquire(now) <= 0.2
+    started = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - started >= 0.15
+
+def test_token_bucket_limits_rate():
+    limiter = AdaptiveRateLimiter(rate=20, max_concurrency=100)
+    started = time.monotonic()
+    for _ in range(30):
+        limiter.acquire()
+        limiter.release(None)
+    # 20 token ban đầu, 10 token còn lại cần ~0.5s
+    assert time.monotonic() - started >= 0.4
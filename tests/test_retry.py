@@ -0,0 +1,114 @@
+import asyncio
+import itertools
+import time
+
+import pytest
+
+from connectors.base_connector import BaseConnector, build_response
+from connectors.async_connector import AsyncBaseConnector
+from connectors.retry import CircuitBreaker, CircuitOpenError, RetryPolicy
+
+_hosts = itertools.count()
+
+def _open_breaker(**kwargs):
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=0.05, **kwargs)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    time.sleep(0.06)
+    return breaker
+
+def _connector(cls, breaker, responses):
+    """Connector tới host riêng (limiter / breaker không dùng chung giữa test), _send trả lần lượt `responses`."""
+    conn = cls(f"http://retry-test-{next(_hosts)}.local", max_retries=4, backoff_factor=0.01)
+    conn.circuit_breaker = breaker
+    queue = list(responses)
+
+    def _next(url):
+        item = queue.pop(0)
+        if isinstance(item, BaseException):
+            raise item
+        status, headers = item
+        return build_response(url, status, "", headers, b'{"ok": true}')
+
+    async def _send_async(method, url, headers, params, kwargs):
+        return _next(url)
+
+    conn._send = lambda method, url, headers, kwargs: _next(url)
+    conn._send_async = _send_async
+    return conn, queue
+
+def test_retry_policy_only_retries_idempotent_requests():
+    policy = RetryPolicy(max_attempts=3)
+    assert policy.should_retry("GET", {}, 1, 503)
+    assert not policy.should_retry("POST", {}, 1, 503)
+    assert policy.should_retry("POST", {"Idempotency-Key": "k"}, 1, None)
+    assert not policy.should_retry("GET", {}, 1, 400)
+    assert not policy.should_retry("GET", {}, 3, 503)
+
+def test_backoff_is_capped_and_honours_retry_after():
+    policy = RetryPolicy(backoff_base=1.0, backoff_cap=2.0)
+    assert all(0 <= policy.backoff(10) <= 2.0 for _ in range(50))
+    assert policy.backoff(1, retry_after=7) >= 7
+
+def test_breaker_opens_after_threshold_and_admits_single_probe():
+    breaker = _open_breaker()
+    assert breaker.before_request() is True
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker._try_enter(time.monotonic()) > 0
+
+def test_half_open_probe_success_closes():
+    breaker = _open_breaker()
+    breaker.before_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.before_request() is False
+
+def test_half_open_probe_failure_reopens_with_longer_timeout():
+    breaker = _open_breaker()
+    breaker.before_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.reset_timeout == pytest.approx(0.1)
+
+def test_release_probe_lets_next_request_probe():
+    breaker = _open_breaker()
+    breaker.before_request()
+    breaker.release_probe()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.before_request() is True
+
+def test_circuit_open_error_after_max_wait():
+    breaker = _open_breaker(max_wait=0.2)
+    breaker.before_request()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+@pytest.mark.parametrize("first", [(429, {"Retry-After": "0"}), (200, {})])
+def test_probe_429_or_success_does_not_stall_connector(first):
+    breaker = _open_breaker(max_wait=1.0)
+    conn, queue = _connector(BaseConnector, breaker, [first, (200, {})])
+    started = time.monotonic()
+    assert conn._request("GET", "x") == {"ok": True}
+    assert time.monotonic() - started < 0.5
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_probe_exception_releases_probe():
+    breaker = _open_breaker(max_wait=1.0)
+    conn, _ = _connector(BaseConnector, breaker, [ValueError("boom"), (200, {})])
+    with pytest.raises(ValueError):
+        conn._request("GET", "x")
+    assert conn._request("GET", "x") == {"ok": True}
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_async_probe_429_then_exception_releases_probe():
+    breaker = _open_breaker(max_wait=1.0)
+    conn, _ = _connector(AsyncBaseConnector, breaker, [(429, {"Retry-After": "0"}), ValueError("boom"), (200, {})])
+
+    async def _run():
+        with pytest.raises(ValueError):
+            await conn._request("GET", "x")
+        return await conn._request("GET", "x")
+
+    assert asyncio.run(_run()) == {"ok": True}
+    assert breaker.state == CircuitBreaker.CLOSED
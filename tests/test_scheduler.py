@@ -0,0 +1,111 @@
+import threading
+
+from connectors.control import MigrationStopped
+from migrators.scheduler import BoundedScheduler
+
+def _collect():
+    results, errors = [], []
+    return results, errors, (lambda item, r: results.append((item, r, threading.current_thread()))), \
+        (lambda item, e: errors.append((item, str(e))))
+
+def test_runs_every_item_and_delivers_on_caller_thread():
+    results, errors, on_result, on_error = _collect()
+    ok = BoundedScheduler(max_workers=4, label="t").run(range(50), lambda x: x * 2, on_result, on_error)
+
+    assert ok
+    assert errors == []
+    assert sorted(r for _, r, _ in results) == [x * 2 for x in range(50)]
+    assert {thread for _, _, thread in results} == {threading.current_thread()}
+
+def test_worker_and_on_result_errors_go_to_on_error():
+    def fn(x):
+        if x == 3:
+            raise RuntimeError("boom")
+        return x
+
+    errors = []
+    def on_result(item, result):
+        if item == 5:
+            raise ValueError("bad result")
+
+    ok = BoundedScheduler(max_workers=2).run(range(8), fn, on_result, lambda item, e: errors.append((item, str(e))))
+    assert ok
+    assert sorted(errors) == [(3, "boom"), (5, "bad result")]
+
+def test_producer_is_bounded_by_the_work_queue():
+    release = threading.Event()
+    pulled = []
+    seen_while_blocked = []
+
+    def items():
+        for i in range(100):
+            pulled.append(i)
+            yield i
+
+    def unblock():
+        seen_while_blocked.append(len(pulled))
+        release.set()
+
+    timer = threading.Timer(0.3, unblock)
+    timer.start()
+    results, errors, on_result, on_error = _collect()
+    ok = BoundedScheduler(max_workers=2, queue_size=3).run(items(), lambda x: release.wait(2) and x, on_result, on_error)
+    timer.join()
+
+    assert ok
+    # Consumer bị chặn: producer chỉ đọc trước max_workers + queue_size (+1 item đang chờ put)
+    assert seen_while_blocked == [2 + 3 + 1]
+    assert len(results) == 100
+
+def test_stop_drops_queued_items_and_waits_for_running_ones():
+    started = threading.Event()
+    release = threading.Event()
+    processed = []
+
+    def fn(x):
+        started.set()
+        release.wait(2)
+        processed.append(x)
+        return x
+
+    def stop_check():
+        # Dừng ngay khi item đầu tiên đang chạy; item đó vẫn phải được chờ xong và ghi nhận
+        if started.is_set():
+            release.set()
+            return True
+        return False
+
+    delivered = []
+    ok = BoundedScheduler(max_workers=1, queue_size=4, stop_check=stop_check).run(
+        range(20), fn, lambda item, r: delivered.append(item), lambda item, e: None)
+
+    assert not ok
+    assert processed and sorted(delivered) == sorted(processed)
+    assert len(processed) < 20
+
+def test_migration_stopped_from_extract_stops_the_run():
+    def items():
+        yield 1
+        yield 2
+        raise MigrationStopped("Migration stopped")
+
+    results, errors, on_result, on_error = _collect()
+    ok = BoundedScheduler(max_workers=2).run(items(), lambda x: x, on_result, on_error)
+
+    assert not ok
+    # Item còn trong queue khi dừng bị bỏ, không được ghi nhận
+    assert {item for item, _, _ in results} <= {1, 2}
+    assert errors == []
+
+def test_migration_stopped_from_worker_is_not_an_error():
+    def fn(x):
+        if x == 2:
+            raise MigrationStopped("Migration stopped")
+        return x
+
+    results, errors, on_result, on_error = _collect()
+    BoundedScheduler(max_workers=1).run(range(4), fn, on_result, on_error)
+
+    # Record bị huỷ không được ghi nhận là lỗi (không checkpoint.fail, không đếm fail)
+    assert errors == []
+    assert sorted(item for item, _, _ in results) == [0, 1, 3]
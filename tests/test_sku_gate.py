@@ -0,0 +1,116 @@
+import threading
+import time
+
+from connectors.control import MigrationStopped, migration_control
+from migrators.phases import SkuGate
+
+def _order(entity_id, *skus):
+    return {"entity_id": entity_id, "items": [{"sku": sku} for sku in skus]}
+
+def _consume(gate, orders, sku_map):
+    """Chạy hold() trên thread riêng; trả về (list entity_id đã ra, list exception, thread)."""
+    out = []
+    errors = []
+
+    def run():
+        try:
+            for order in gate.hold(orders, sku_map):
+                out.append(order["entity_id"])
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return out, errors, thread
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+def test_ready_orders_overtake_orders_waiting_for_skus():
+    gate = SkuGate()
+    sku_map = {}
+    gate.attach(sku_map)
+    gate.publish([("A", "var_a")])
+
+    out, errors, thread = _consume(gate, [_order(1, "B"), _order(2, "A"), _order(3, "A", "C")], sku_map)
+    assert _wait_for(lambda: out == [2])
+
+    gate.publish([("C", "var_c")])
+    assert _wait_for(lambda: out == [2, 3])
+
+    gate.publish([("B", "var_b")])
+    thread.join(2)
+    assert out == [2, 3, 1]
+    assert errors == []
+
+def test_order_waits_for_every_missing_sku():
+    gate = SkuGate()
+    sku_map = {}
+    gate.attach(sku_map)
+
+    out, errors, thread = _consume(gate, [_order(1, "A", "B"), _order(2, "B")], sku_map)
+    gate.publish([("A", "var_a")])
+    time.sleep(0.05)
+    assert out == []
+
+    gate.publish([("B", "var_b")])
+    thread.join(2)
+    # Cùng được giải phóng bởi SKU B: giữ thứ tự stream
+    assert out == [1, 2]
+
+def test_close_releases_all_waiting_orders_in_stream_order():
+    gate = SkuGate()
+    sku_map = {}
+    gate.attach(sku_map)
+
+    out, errors, thread = _consume(gate, [_order(1, "X"), _order(2, "Y"), _order(3)], sku_map)
+    assert _wait_for(lambda: out == [3])
+    gate.close()
+    thread.join(2)
+    assert out == [3, 1, 2]
+
+def test_buffer_is_bounded():
+    gate = SkuGate(max_waiting=2)
+    sku_map = {}
+    gate.attach(sku_map)
+    pulled = []
+
+    def orders():
+        for i, sku in enumerate(["X", "Y", "Z", "W"], 1):
+            pulled.append(i)
+            yield _order(i, sku)
+
+    out, errors, thread = _consume(gate, orders(), sku_map)
+    time.sleep(0.1)
+    # Buffer đầy (2 order): stream không đọc thêm cho tới khi có order được giải phóng
+    assert pulled == [1, 2]
+
+    gate.publish([("X", "var_x")])
+    assert _wait_for(lambda: out == [1] and pulled == [1, 2, 3])
+    gate.close()
+    thread.join(2)
+    assert out == [1, 2, 3, 4]
+
+def test_stop_interrupts_waiting():
+    gate = SkuGate()
+    sku_map = {}
+    gate.attach(sku_map)
+    out, errors, thread = _consume(gate, [_order(1, "X")], sku_map)
+    try:
+        time.sleep(0.05)
+        migration_control.stop()
+        thread.join(2)
+    finally:
+        migration_control.reset()
+    assert out == []
+    assert len(errors) == 1 and isinstance(errors[0], MigrationStopped)
+
+def test_pending_skus_published_before_attach_are_known():
+    gate = SkuGate()
+    gate.publish([("A", "var_a")])
+    sku_map = {}
+    gate.attach(sku_map)
+    assert list(gate.hold([_order(1, "A")], sku_map)) == [_order(1, "A")]
@@ -0,0 +1,75 @@
+import asyncio
+from types import SimpleNamespace
+
+import requests
+
+from connectors.base_connector import build_response
+from migrators.category_migrator import _sync_single_category, _sync_single_category_async
+from migrators.customer_migrator import _sync_single_customer, _sync_single_customer_async
+
+class _Medusa:
+    """Medusa giả ghi lại các lời gọi; `fail` = {method: exception} cho lời gọi lỗi."""
+    def __init__(self, responses=None, fail=None):
+        self.responses = responses or {}
+        self.fail = fail or {}
+        self.calls = []
+
+    def __getattr__(self, method):
+        def call(*args, **kwargs):
+            self.calls.append((method, args, kwargs))
+            if method in self.fail:
+                raise self.fail[method]
+            return self.responses.get(method, {})
+        return call
+
+class _AsyncMedusa(_Medusa):
+    def __getattr__(self, method):
+        sync_call = super().__getattr__(method)
+
+        async def call(*args, **kwargs):
+            return sync_call(*args, **kwargs)
+        return call
+
+def _both(sync_fn, async_fn, item, *args, **medusa_kwargs):
+    """Chạy bản sync và async trên cùng input; trả về [(result, calls)] của từng bản."""
+    sync_medusa, async_medusa = _Medusa(**medusa_kwargs), _AsyncMedusa(**medusa_kwargs)
+    sync_result = sync_fn(item, sync_medusa, *args)
+    async_result = asyncio.run(async_fn(item, async_medusa, *args))
+    return (sync_result, sync_medusa.calls), (async_result, async_medusa.calls)
+
+def _http_error(status):
+    response = build_response("http://medusa.local/admin", status, "", {}, b'{"message": "bad"}')
+    return requests.exceptions.HTTPError(f"{status} Client Error", response=response)
+
+_args = SimpleNamespace(dry_run=False)
+_customer = {"id": 7, "email": "a@example.com", "firstname": "A", "lastname": "B",
+             "addresses": [{"street": ["1 Main St"], "city": "X", "country_id": "VN"}]}
+_category = {"id": 5, "name": "Shoes", "parent_id": 2}
+
+def test_customer_sync_and_async_make_the_same_calls():
+    sync, async_ = _both(_sync_single_customer, _sync_single_customer_async, _customer, _args,
+                         responses={"create_customer": {"customer": {"id": "cus_1"}}})
+    assert sync == async_
+    assert sync[0] == ('success', None)
+    assert [method for method, _, _ in sync[1]] == ["create_customer", "create_customer_address"]
+
+def test_customer_failures_are_reported_the_same_way():
+    sync, async_ = _both(_sync_single_customer, _sync_single_customer_async, _customer, _args,
+                         fail={"create_customer": RuntimeError("boom")})
+    assert sync == async_
+    assert sync[0] == ('fail', "boom")
+
+def test_category_sync_and_async_make_the_same_calls():
+    sync, async_ = _both(_sync_single_category, _sync_single_category_async, _category, _args, {"2": "pcat_2"}, {},
+                         responses={"create_product_category": {"product_category": {"id": "pcat_5"}}})
+    assert sync == async_
+    assert sync[0][:3] == (5, "pcat_5", 'success')
+
+def test_category_waits_for_parent_and_reports_http_errors_the_same_way():
+    sync, async_ = _both(_sync_single_category, _sync_single_category_async, _category, _args, {}, {})
+    assert sync == async_ == ((5, None, 'defer', None), [])
+
+    sync, async_ = _both(_sync_single_category, _sync_single_category_async, _category, _args, {"2": "pcat_2"}, {},
+                         fail={"create_product_category": _http_error(400)})
+    assert sync[0] == async_[0]
+    assert sync[0][2] == 'fail'
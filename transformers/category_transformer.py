@@ -2,17 +2,23 @@ import re
 import unicodedata
 
 
+# Magento fields đọc bởi transform_category_as_product_category / transform_category_as_collection
+MAGENTO_FIELDS = "items[id,name,is_active,position,parent_id,level,description],total_count"
+
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
 def _slugify(text: str) -> str:
     if not text:
         return ""
 
-    text = unicodedata.normalize("NFKD", text)
-    text = "".join([c for c in text if not unicodedata.combining(c)])
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join([c for c in text if not unicodedata.combining(c)])
+        text = text.replace("đ", "d").replace("Đ", "d")
     text = text.lower().strip()
-    text = text.replace("đ", "d")
-    text = re.sub(r"[^a-z0-9]+", "-", text)
-    text = re.sub(r"-{2,}", "-", text).strip("-")
-    return text
+    return _NON_ALNUM.sub("-", text).strip("-")
 
 
 def transform_category_as_product_category(mg_category: dict, parent_category_id=None) -> dict:
@@ -42,6 +48,19 @@ def transform_category_as_product_category(mg_category: dict, parent_category_id
     return payload
 
 
+def transform_categories_as_product_categories(mg_categories, parent_ids=None) -> list:
+    """
+    Transform nhiều category một lần (list hoặc iterator).
+    parent_ids: Magento parent_id (str) -> Medusa category id, tra một dict cho cả batch thay vì
+    truyền parent_category_id từng record; category có parent chưa map được tạo ở gốc.
+    """
+    transform = transform_category_as_product_category
+    if not parent_ids:
+        return [transform(cat) for cat in mg_categories]
+    lookup = parent_ids.get
+    return [transform(cat, lookup(str(cat.get("parent_id")))) for cat in mg_categories]
+
+
 def transform_category_as_collection(mg_category: dict) -> dict:
     name = mg_category.get("name") or f"Category {mg_category.get('id')}"
     handle = _slugify(name) or f"category-{mg_category.get('id')}"
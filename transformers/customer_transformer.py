@@ -1,3 +1,11 @@
+# Magento fields đọc bởi transform_customer và transform_address
+MAGENTO_FIELDS = (
+    "items[id,email,firstname,lastname,group_id,created_at,updated_at,"
+    "addresses[id,firstname,lastname,company,street,city,region[region],country_id,postcode,telephone,"
+    "default_shipping,default_billing]],"
+    "total_count"
+)
+
 def transform_customer(mg_customer: dict) -> dict:
     email = (mg_customer.get("email") or "").strip()
     first_name = (mg_customer.get("firstname") or "").strip()
@@ -25,6 +33,11 @@ def transform_customer(mg_customer: dict) -> dict:
 
     return payload
 
+def transform_customers(mg_customers) -> list:
+    """Transform nhiều customer một lần (list hoặc iterator); payload giống transform_customer từng cái."""
+    transform = transform_customer
+    return [transform(c) for c in mg_customers]
+
 def transform_address(mg_address: dict) -> dict:
     street = mg_address.get("street") or []
     full_address = ", ".join(street) if isinstance(street, list) else str(street)
@@ -1,3 +1,9 @@
+# Magento fields đọc bởi transform_invoice (order_id dùng để join invoice vào order)
+MAGENTO_INVOICE_FIELDS = (
+    "items[entity_id,order_id,increment_id,state,grand_total,subtotal,tax_amount,shipping_amount,"
+    "created_at,updated_at],total_count"
+)
+
 def _to_cents(value) -> int:
     try:
         return int(float(value))
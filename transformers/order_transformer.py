@@ -1,3 +1,16 @@
+_ADDRESS_FIELDS = "firstname,lastname,telephone,street,city,region,region_code,postcode,country_id"
+
+# Magento fields đọc bởi transform_order và order migrator
+MAGENTO_FIELDS = (
+    "items[entity_id,increment_id,status,customer_email,order_currency_code,created_at,updated_at,"
+    "grand_total,base_grand_total,tax_amount,base_tax_amount,shipping_amount,base_shipping_amount,"
+    "items[item_id,parent_item_id,sku,name,qty_ordered,price,base_price],"
+    f"billing_address[{_ADDRESS_FIELDS}],"
+    "payment[method,last_trans_id,amount_ordered,amount_paid,additional_information],"
+    f"extension_attributes[shipping_assignments[shipping[address[{_ADDRESS_FIELDS}]]]]],"
+    "total_count"
+)
+
 def _to_cents(value) -> int:
 
     try:
@@ -72,12 +85,29 @@ def calculate_checksum(items, tax_amount, shipping_amount):
     return calculated_total, line_total
 
 
+def _shipping_method(shipping_option):
+    """(id, name) của shipping option, tính một lần cho cả batch."""
+    if not shipping_option:
+        return None
+    return shipping_option.get("id"), shipping_option.get("name")
+
+
 def transform_order(mg_order: dict, region_id: str, sku_map: dict = None, shipping_option: dict = None) -> dict:
+    return _build_order(mg_order, region_id, (sku_map or {}).get, _shipping_method(shipping_option))
 
-    if sku_map is None:
 
-        sku_map = {}
+def transform_orders(mg_orders, region_id: str, sku_map: dict = None, shipping_option: dict = None) -> list:
+    """
+    Transform nhiều order một lần (list hoặc iterator), kết quả giống gọi transform_order từng cái.
+    Lookup sku -> variant và shipping option được chuẩn bị một lần cho cả batch.
+    """
+    build = _build_order
+    sku_lookup = (sku_map or {}).get
+    shipping_method = _shipping_method(shipping_option)
+    return [build(order, region_id, sku_lookup, shipping_method) for order in mg_orders]
+
 
+def _build_order(mg_order: dict, region_id: str, sku_lookup, shipping_method) -> dict:
 
     email = mg_order.get("customer_email") or ""
 
@@ -100,7 +130,7 @@ def transform_order(mg_order: dict, region_id: str, sku_map: dict = None, shippi
         line_total = unit_price * quantity
         line_total_sum += line_total
         
-        variant_id = sku_map.get(sku) if sku else None
+        variant_id = sku_lookup(sku) if sku else None
 
         if variant_id:
             items.append({
@@ -143,16 +173,17 @@ def transform_order(mg_order: dict, region_id: str, sku_map: dict = None, shippi
     shipping_amount = _to_cents(mg_order.get("shipping_amount") or mg_order.get("base_shipping_amount") or 0)
     grand_total = _to_cents(mg_order.get("grand_total") or mg_order.get("base_grand_total") or 0)
     
-    # Tính checksum
-    calculated_total, calculated_line_total = calculate_checksum(items, tax_amount, shipping_amount)
+    # Tính checksum (line_total_sum đã cộng dồn ở vòng lặp item, không duyệt lại items)
+    calculated_line_total = line_total_sum
+    calculated_total = line_total_sum + tax_amount + shipping_amount
     checksum_valid = abs(calculated_total - grand_total) <= 1  # Cho phép sai số 1 cent
     
     shipping_methods = []
-    if shipping_option:
+    if shipping_method:
         shipping_methods.append({
-            "shipping_option_id": shipping_option.get("id"),
+            "shipping_option_id": shipping_method[0],
             "amount": shipping_amount,
-            "name": shipping_option.get("name")
+            "name": shipping_method[1]
         })
 
     payload = {
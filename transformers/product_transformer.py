@@ -1,17 +1,27 @@
 import re
 import unicodedata
 
+# Magento fields đọc bởi transform_product và _sync_single_product (category_links, stock_item)
+MAGENTO_FIELDS = (
+    "items[id,sku,name,price,weight,media_gallery_entries[file],"
+    "extension_attributes[category_links[category_id],stock_item[qty]]],"
+    "total_count"
+)
+
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
 
 def _slugify(text: str) -> str:
     if not text:
         return ""
-    text = unicodedata.normalize("NFKD", text)
-    text = "".join([c for c in text if not unicodedata.combining(c)])
+    # SKU / tên ASCII (phần lớn catalog) không cần chuẩn hoá unicode
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join([c for c in text if not unicodedata.combining(c)])
+        text = text.replace("đ", "d").replace("Đ", "d")
     text = text.lower().strip()
-    text = text.replace("đ", "d")
-    text = re.sub(r"[^a-z0-9]+", "-", text)
-    text = re.sub(r"-{2,}", "-", text).strip("-")
-    return text
+    return _NON_ALNUM.sub("-", text).strip("-")
 
 
 def _handle_from_magento_product(mg_product: dict) -> str:
@@ -22,29 +32,29 @@ def _handle_from_magento_product(mg_product: dict) -> str:
     return _slugify(name) or f"product-{mg_product.get('id')}"
 
 
-def extract_images(mg_product, magento_base_url):
-    images = []
+def _media_prefix(magento_base_url):
+    return f"{magento_base_url}/pub/media/catalog/product"
 
-    for entry in mg_product.get("media_gallery_entries", []):
-        file_path = entry.get("file")
-        if not file_path:
-            continue
 
-        images.append({
-            "url": f"{magento_base_url}/pub/media/catalog/product{file_path}"
-        })
+def extract_images(mg_product, magento_base_url):
+    return _extract_images(mg_product, _media_prefix(magento_base_url))
 
-    return images
 
+def _extract_images(mg_product, media_prefix):
+    return [
+        {"url": media_prefix + entry["file"]}
+        for entry in mg_product.get("media_gallery_entries") or ()
+        if entry.get("file")
+    ]
 
-def transform_product(mg_product, magento_base_url, categories=None, sales_channel_id=None, shipping_profile_id=None):
+
+def _build_product(mg_product, media_prefix, categories, sales_channel_id, shipping_profile_id, currency_code):
     name = mg_product["name"]
-    price = int(float(mg_product["price"]) )
-    handle = _handle_from_magento_product(mg_product)
+    price = int(float(mg_product["price"]))
 
     payload = {
         "title": name,
-        "handle": handle,
+        "handle": _handle_from_magento_product(mg_product),
         "description": name,
         "status": "published",
         "discountable": True,
@@ -68,7 +78,7 @@ def transform_product(mg_product, magento_base_url, categories=None, sales_chann
                 },
                 "prices": [
                     {
-                        "currency_code": "eur",
+                        "currency_code": currency_code,
                         "amount": price
                     }
                 ]
@@ -77,17 +87,39 @@ def transform_product(mg_product, magento_base_url, categories=None, sales_chann
 
         "sales_channels": [
             {
-                "id": sales_channel_id or "",
+                "id": sales_channel_id,
             }
         ],
-        "shipping_profile_id": shipping_profile_id or ""
-
-
+        "shipping_profile_id": shipping_profile_id
     }
 
-    images = extract_images(mg_product, magento_base_url)
+    images = _extract_images(mg_product, media_prefix)
     if images:
         payload["images"] = images
 
-    return payload 
-
+    return payload
+
+
+def transform_product(mg_product, magento_base_url, categories=None, sales_channel_id=None, shipping_profile_id=None, currency_code="eur"):
+    return _build_product(
+        mg_product, _media_prefix(magento_base_url), categories,
+        sales_channel_id or "", shipping_profile_id or "", currency_code,
+    )
+
+
+def transform_products(mg_products, magento_base_url, resolve_categories=None, sales_channel_id=None, shipping_profile_id=None, currency_code="eur"):
+    """
+    Transform nhiều product một lần (list hoặc iterator), kết quả giống gọi transform_product từng cái.
+    URL media, sales channel, shipping profile và currency được tính một lần cho cả batch;
+    resolve_categories(product) -> list category của product (None: không gắn category).
+    """
+    media_prefix = _media_prefix(magento_base_url)
+    sales_channel_id = sales_channel_id or ""
+    shipping_profile_id = shipping_profile_id or ""
+    build = _build_product
+    if resolve_categories is None:
+        return [build(p, media_prefix, None, sales_channel_id, shipping_profile_id, currency_code) for p in mg_products]
+    return [
+        build(p, media_prefix, resolve_categories(p), sales_channel_id, shipping_profile_id, currency_code)
+        for p in mg_products
+    ]